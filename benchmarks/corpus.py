@@ -0,0 +1,126 @@
+"""Synthetic meme corpus and a local HTTP server to download it from"""
+import asyncio
+import random
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from aiohttp import web
+from PIL import Image, ImageDraw, ImageFont
+
+SIZES = [(320, 240), (500, 500), (640, 800), (1024, 768), (1280, 720), (1920, 1080)]
+FORMATS = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp', 'GIF': 'image/gif'}
+TEXT_LAYOUTS = ['no_text', 'top', 'bottom', 'top_bottom', 'middle', 'scattered']
+CAPTIONS = ['WHEN THE CODE', 'WORKS ON THE FIRST TRY', 'NOBODY:', 'ME AT 3AM', 'ONE DOES NOT SIMPLY', 'SUCH WOW']
+
+
+@dataclass
+class CorpusImage:
+    name: str
+    content_type: str
+    data: bytes
+    size: tuple
+    layout: str
+
+
+def _draw_caption(draw: ImageDraw.ImageDraw, font, width: int, y: int, text: str):
+    x = max((width - draw.textlength(text, font=font)) / 2, 0)
+    # Outlined impact-style text gives MSER realistic regions to find
+    for dx, dy in ((-2, 0), (2, 0), (0, -2), (0, 2)):
+        draw.text((x + dx, y + dy), text, font=font, fill='black')
+    draw.text((x, y), text, font=font, fill='white')
+
+
+def render_image(rng: random.Random, size: tuple, layout: str) -> Image.Image:
+    """Render one synthetic meme: a noisy background plus captions"""
+    width, height = size
+    image = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+
+    for _ in range(rng.randrange(5, 25)):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(20, width // 2), y0 + rng.randrange(20, height // 2)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        if rng.random() < 0.5:
+            draw.rectangle((x0, y0, x1, y1), fill=color)
+        else:
+            draw.ellipse((x0, y0, x1, y1), fill=color)
+
+    font = ImageFont.load_default(size=max(height // 12, 12))
+    rows = {
+        'no_text': [],
+        'top': [0.05],
+        'bottom': [0.85],
+        'top_bottom': [0.05, 0.85],
+        'middle': [0.45],
+        'scattered': [rng.random() * 0.9 for _ in range(4)]
+    }[layout]
+    for row in rows:
+        _draw_caption(draw, font, width, int(row * height), rng.choice(CAPTIONS))
+
+    return image
+
+
+def generate_corpus(count: int = 50, seed: int = 0) -> List[CorpusImage]:
+    """Deterministic corpus cycling through sizes, formats and text layouts"""
+    rng = random.Random(seed)
+    corpus = []
+    formats = list(FORMATS)
+    for i in range(count):
+        size = SIZES[i % len(SIZES)]
+        fmt = formats[(i // len(SIZES)) % len(formats)]
+        layout = TEXT_LAYOUTS[i % len(TEXT_LAYOUTS)]
+
+        image = render_image(rng, size, layout)
+        buffer = BytesIO()
+        image.save(buffer, format=fmt, **({'quality': 85} if fmt in ('JPEG', 'WEBP') else {}))
+
+        corpus.append(CorpusImage(
+            name=f"meme_{i:05d}.{fmt.lower()}",
+            content_type=FORMATS[fmt],
+            data=buffer.getvalue(),
+            size=size,
+            layout=layout
+        ))
+    return corpus
+
+
+class ImageServer:
+    """Local aiohttp server for the corpus with injectable per-request latency"""
+
+    def __init__(self, corpus: List[CorpusImage], latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.images: Dict[str, CorpusImage] = {image.name: image for image in corpus}
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ''
+        self.requests = 0
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        delay = self.latency + self._rng.random() * self.jitter
+        if delay:
+            await asyncio.sleep(delay)
+        image = self.images.get(request.match_info['name'])
+        if image is None:
+            return web.Response(status=404)
+        return web.Response(body=image.data, content_type=image.content_type)
+
+    def url_for(self, name: str) -> str:
+        return f"{self.base_url}/images/{name}"
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get('/images/{name}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,184 @@
+"""Microbenchmarks for ImageTemplateDetector and similarity search.
+
+Usage:
+    python -m benchmarks.detector_microbench
+    python -m benchmarks.detector_microbench --search-sizes 10000,100000 --compare benchmarks/results/old.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Callable, Dict, List
+
+from PIL import Image
+
+from src.processors.image_analyzer import ImageTemplateDetector
+
+from .corpus import FORMATS, SIZES, render_image
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def time_call(fn: Callable[[], Any], min_repeats: int = 5, min_seconds: float = 0.5,
+              warmup: bool = True) -> Dict[str, float]:
+    """Run fn until both minimums are met; report min/median/mean seconds per call"""
+    if warmup:
+        fn()  # first calls pay lazy imports (e.g. scipy in phash) and cold caches
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_repeats or time.perf_counter() - started < min_seconds:
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+        if len(timings) >= 1000:
+            break
+    return {
+        'calls': len(timings),
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings)
+    }
+
+
+def bench_feature_extraction(detector: ImageTemplateDetector, sizes, formats, seed: int,
+                             min_repeats: int, min_seconds: float) -> List[Dict[str, Any]]:
+    """Per-function timings for every resolution x format"""
+    rng = random.Random(seed)
+    results = []
+
+    for size in sizes:
+        image = render_image(rng, size, 'top_bottom')
+        for fmt in formats:
+            buffer = BytesIO()
+            image.save(buffer, format=fmt, **({'quality': 85} if fmt in ('JPEG', 'WEBP') else {}))
+            data = buffer.getvalue()
+            decoded = Image.open(BytesIO(data)).convert('RGB')
+
+            cases = {
+                'extract_features_from_bytes': lambda: detector.extract_features_from_bytes(data),
+                'decode': lambda: Image.open(BytesIO(data)).convert('RGB'),
+                '_detect_text_regions': lambda: detector._detect_text_regions(decoded),
+            }
+            for name, hash_func in detector.hash_functions.items():
+                cases[name] = lambda hash_func=hash_func: hash_func(decoded)
+
+            for function, fn in cases.items():
+                timing = time_call(fn, min_repeats, min_seconds)
+                results.append({
+                    'function': function,
+                    'width': size[0],
+                    'height': size[1],
+                    'format': fmt,
+                    'bytes': len(data),
+                    **timing
+                })
+                print(f"{function:<28} {size[0]:>5}x{size[1]:<5} {fmt:<5} {timing['median_s'] * 1000:9.2f} ms")
+
+    return results
+
+
+def _random_features(rng: random.Random) -> Dict[str, str]:
+    return {
+        'phash': f"{rng.getrandbits(64):016x}",
+        'dhash': f"{rng.getrandbits(64):016x}",
+        'whash': f"{rng.getrandbits(64):016x}",
+        'colorhash': f"{rng.getrandbits(42):011x}",  # 14 bins x 3 bits
+        'template_structure': rng.choice(['top', 'bottom', 'top_bottom', 'middle', 'no_text'])
+    }
+
+
+def bench_similarity_search(detector: ImageTemplateDetector, search_sizes, seed: int,
+                            min_repeats: int) -> List[Dict[str, Any]]:
+    """find_similar_templates latency against growing stored-hash sets"""
+    rng = random.Random(seed)
+    target = _random_features(rng)
+    db_features: List[Dict[str, str]] = []
+    results = []
+
+    for size in sorted(search_sizes):
+        db_features.extend(_random_features(rng) for _ in range(size - len(db_features)))
+        # Warm up on a single item; a full warm-up pass at 1M would double the cost
+        detector.find_similar_templates(target, db_features[:1])
+        timing = time_call(lambda: detector.find_similar_templates(target, db_features),
+                           min_repeats=min_repeats, min_seconds=0, warmup=False)
+        results.append({
+            'function': 'find_similar_templates',
+            'stored_hashes': size,
+            'per_item_us': timing['median_s'] / size * 1e6,
+            **timing
+        })
+        print(f"find_similar_templates {size:>9} hashes {timing['median_s']:9.3f} s")
+
+    return results
+
+
+def compare_results(current: Dict[str, Any], previous: Dict[str, Any]):
+    """Print median-time ratios for cases present in both runs"""
+    def key(entry):
+        return (entry['function'], entry.get('width'), entry.get('height'),
+                entry.get('format'), entry.get('stored_hashes'))
+
+    previous_by_key = {key(e): e for e in previous['results']}
+    for entry in current['results']:
+        old = previous_by_key.get(key(entry))
+        if not old or not old['median_s']:
+            continue
+        ratio = entry['median_s'] / old['median_s']
+        label = ' '.join(str(part) for part in key(entry) if part is not None)
+        print(f"{label:<50} {ratio:6.2f}x {'slower' if ratio > 1 else 'faster'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ImageTemplateDetector microbenchmarks")
+    parser.add_argument('--sizes', default=','.join(f"{w}x{h}" for w, h in SIZES),
+                        help="Comma-separated WxH resolutions")
+    parser.add_argument('--formats', default=','.join(FORMATS), help="Comma-separated PIL formats")
+    parser.add_argument('--search-sizes', default='10000,100000,1000000',
+                        help="Stored-hash counts for similarity search (empty to skip)")
+    parser.add_argument('--min-repeats', type=int, default=5)
+    parser.add_argument('--min-seconds', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON output path (default: benchmarks/results/detector-<time>.json)")
+    parser.add_argument('--compare', help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [tuple(int(v) for v in s.split('x')) for s in args.sizes.split(',') if s]
+    formats = [f.upper() for f in args.formats.split(',') if f]
+    search_sizes = [int(s) for s in args.search_sizes.split(',') if s]
+
+    detector = ImageTemplateDetector()
+    results = bench_feature_extraction(detector, sizes, formats, args.seed, args.min_repeats, args.min_seconds)
+    if search_sizes:
+        results += bench_similarity_search(detector, search_sizes, args.seed, min_repeats=1)
+
+    report = {
+        'benchmark': 'detector',
+        'created_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"detector-{datetime.now().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""In-process stand-ins for Reddit and Supabase with injectable latency"""
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from src.scrapers.base_scraper import BaseScraper, ScrapedPost
+
+SUBREDDITS = ['memes', 'dankmemes', 'wholesomememes', 'ProgrammerHumor', 'HistoryMemes']
+
+
+class FakeScraper(BaseScraper):
+    """BaseScraper serving posts that point at a local ImageServer"""
+
+    def __init__(self, image_urls: List[str], latency: float = 0.0, seed: int = 0):
+        super().__init__({'platform_name': 'reddit', 'rate_limit': 60, 'daily_limit': 10000})
+        self.image_urls = image_urls
+        self.latency = latency
+        self._rng = random.Random(seed)
+        self._next_id = 0
+
+    def authenticate(self) -> bool:
+        return True
+
+    def scrape_posts(self, source: str, limit: int = 100, **kwargs) -> List[ScrapedPost]:
+        if self.latency:
+            time.sleep(self.latency)
+        now = datetime.now()
+        posts = []
+        for _ in range(limit):
+            url = self.image_urls[self._next_id % len(self.image_urls)]
+            subreddit = self._rng.choice(SUBREDDITS)
+            posts.append(ScrapedPost(
+                platform='reddit',
+                post_id=f"bench{self._next_id:07d}",
+                title=f"Benchmark meme {self._next_id}",
+                url=url,
+                score=self._rng.randrange(0, 20000),
+                timestamp=now - timedelta(minutes=self._rng.randrange(0, 1440)),
+                author='bench',
+                tags=[subreddit],
+                metadata={
+                    'subreddit': subreddit,
+                    'num_comments': self._rng.randrange(0, 500),
+                    'upvote_ratio': round(self._rng.uniform(0.5, 1.0), 2),
+                    'post_hint': 'image'
+                }
+            ))
+            self._next_id += 1
+        return posts
+
+    def get_post_details(self, post_id: str) -> Optional[ScrapedPost]:
+        return None
+
+    def is_media_post(self, post_data: Any) -> bool:
+        return True
+
+
+class FakeStorage:
+    """Dict-backed implementation of the SupabaseClient surface used by the pipeline"""
+
+    def __init__(self, latency: float = 0.0, per_row_latency: float = 0.0):
+        self.latency = latency
+        self.per_row_latency = per_row_latency
+        self.posts: Dict[tuple, Dict[str, Any]] = {}
+        self.template_clusters: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _wait(self, rows: int = 0):
+        delay = self.latency + rows * self.per_row_latency
+        if delay:
+            time.sleep(delay)
+
+    def bulk_upsert_posts(self, posts_data: list, raise_errors: bool = False) -> int:
+        self._wait(len(posts_data))
+        with self._lock:
+            for post in posts_data:
+                self.posts[(post['platform'], post['post_id'])] = dict(post)
+        return len(posts_data)
+
+    def get_known_post_ids(self, platform: str, post_ids: list) -> set:
+        self._wait()
+        with self._lock:
+            return {post_id for post_id in post_ids if (platform, post_id) in self.posts}
+
+    def ensure_partitions(self, months_ahead: int = 3) -> int:
+        return 0
+
+    def get_template_clusters(self, page_size: int = 1000) -> list:
+        self._wait()
+        return [{'phash': p, 'cluster_id': c} for p, c in self.template_clusters.items()]
+
+    def save_template_clusters(self, assignments: list, raise_errors: bool = False) -> int:
+        self._wait(len(assignments))
+        for row in assignments:
+            self.template_clusters[row['phash']] = row['cluster_id']
+        return len(assignments)
+
+    def refresh_subreddit_rollups(self, hours_back: int = 48) -> int:
+        self._wait()
+        return 0
+
+    def get_subreddit_stats(self, hours=24):
+        self._wait()
+        return []
+
+    def get_emerging_templates(self, k=20, window_hours=48):
+        self._wait()
+        return []
+
+    def get_recent_posts(self, hours=24):
+        self._wait()
+        cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
+        return [p for p in self.posts.values() if p['timestamp'] and p['timestamp'] >= cutoff]
+
+    def get_posts_by_template(self, template_hash):
+        self._wait()
+        return [p for p in self.posts.values() if p.get('template_cluster_id') == template_hash]
+
+    def get_stats(self):
+        self._wait()
+        top = sorted(self.posts.values(), key=lambda p: p['score'] or 0, reverse=True)[:5]
+        return {'total_posts': len(self.posts), 'top_posts': top, 'templates': []}
+
+    def export_data(self):
+        self._wait(len(self.posts))
+        return len(self.posts)
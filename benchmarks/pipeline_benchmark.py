@@ -0,0 +1,288 @@
+"""End-to-end pipeline benchmark against local stand-ins for Reddit and Supabase.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark --posts 200 --concurrency 1,5,10,20
+    python -m benchmarks.pipeline_benchmark --download-latency 0.05 --db-latency 0.2 --output bench.json
+    python -m benchmarks.pipeline_benchmark --replay archives/2026-10-19 --concurrency 5,10
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List
+
+from src.core.archive import RunArchive
+from src.core.async_processor import AsyncProcessor
+from src.core.post_batch import PostBatch
+from src.core.run_report import peak_rss_mb
+from src.processors.image_analyzer import ImageTemplateDetector
+
+from .corpus import ImageServer, generate_corpus
+from .fakes import FakeScraper, FakeStorage
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TimedAnalyzer:
+    """Wraps ImageTemplateDetector to record per-post analysis timings"""
+
+    def __init__(self, analyzer: ImageTemplateDetector):
+        self.analyzer = analyzer
+        self.durations: List[float] = []
+        self.completed_at: List[float] = []
+
+    def extract_features_from_bytes(self, image_bytes: bytes):
+        start = time.perf_counter()
+        try:
+            return self.analyzer.extract_features_from_bytes(image_bytes)
+        finally:
+            end = time.perf_counter()
+            self.durations.append(end - start)
+            self.completed_at.append(end)
+
+
+def _percentile(values: List[float], q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def bench_process_posts_batch(server: ImageServer, posts: int, concurrency: int,
+                                    db_latency: float, scrape_latency: float,
+                                    trace_memory: bool) -> Dict[str, Any]:
+    """Time AsyncProcessor.process_posts_batch on one batch of posts"""
+    urls = [server.url_for(name) for name in server.images]
+    scraped = FakeScraper(urls, latency=scrape_latency).scrape_posts('memes', limit=posts)
+    storage = FakeStorage(latency=db_latency)
+    analyzer = TimedAnalyzer(ImageTemplateDetector())
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    async with AsyncProcessor(max_workers=max(concurrency, 1), max_concurrent_downloads=concurrency) as processor:
+        stats = await processor.process_posts_batch(scraped, analyzer, storage)
+    wall = time.perf_counter() - start
+    traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+
+    time_to_result = [t - start for t in analyzer.completed_at]
+    return {
+        'scenario': 'process_posts_batch',
+        'concurrency': concurrency,
+        'posts': posts,
+        'successful': stats['successful'],
+        'wall_time_s': wall,
+        'posts_per_second': posts / wall if wall > 0 else 0,
+        'analysis_p50_s': _percentile(analyzer.durations, 0.5),
+        'analysis_p95_s': _percentile(analyzer.durations, 0.95),
+        'time_to_result_p50_s': _percentile(time_to_result, 0.5),
+        'time_to_result_p95_s': _percentile(time_to_result, 0.95),
+        'traced_peak_mb': traced_peak,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+async def bench_replay(archive: RunArchive, concurrency: int, db_latency: float,
+                       trace_memory: bool) -> Dict[str, Any]:
+    """Time every recorded listing of an archive through process_posts_batch, offline"""
+    from src.processors.template_clustering import TemplateClusterer
+    from src.processors.text_similarity import TitleMinHasher
+
+    storage = FakeStorage(latency=db_latency)
+    analyzer = TimedAnalyzer(ImageTemplateDetector())
+    clusterer = TemplateClusterer()
+    title_minhasher = TitleMinHasher()
+    posts = 0
+    successful = 0
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    async with AsyncProcessor(max_workers=max(concurrency, 1), max_concurrent_downloads=concurrency,
+                              archive=archive) as processor:
+        for _, _, listing in archive.iter_listings():
+            batch = PostBatch.from_posts(listing)
+            posts += len(batch)
+            stats = await processor.process_posts_batch(batch, analyzer, storage, clusterer,
+                                                        title_minhasher=title_minhasher)
+            successful += stats['successful']
+    wall = time.perf_counter() - start
+    traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+
+    return {
+        'scenario': 'replay',
+        'concurrency': concurrency,
+        'posts': posts,
+        'successful': successful,
+        'stored': len(storage.posts),
+        'template_clusters': len(clusterer),
+        'wall_time_s': wall,
+        'posts_per_second': posts / wall if wall > 0 else 0,
+        'analysis_p50_s': _percentile(analyzer.durations, 0.5),
+        'analysis_p95_s': _percentile(analyzer.durations, 0.95),
+        'traced_peak_mb': traced_peak,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+async def run_replay(args) -> List[Dict[str, Any]]:
+    archive = RunArchive.open(args.replay)
+    print(f"Replaying {archive.info()}")
+    results = []
+    for concurrency in args.concurrency:
+        for repeat in range(args.repeats):
+            result = await bench_replay(archive, concurrency, args.db_latency, args.memory)
+            result['repeat'] = repeat
+            results.append(result)
+            print(
+                f"replay              | concurrency={concurrency:>3} | "
+                f"{result['posts_per_second']:7.1f} posts/s | "
+                f"p95 analysis {result['analysis_p95_s'] or 0:.3f}s"
+            )
+    return results
+
+
+async def bench_process_new_memes(server: ImageServer, concurrency: int, db_latency: float,
+                                  scrape_latency: float, trace_memory: bool) -> Dict[str, Any]:
+    """Time a full main.process_new_memes run in a scratch directory"""
+    from main import process_new_memes
+
+    urls = [server.url_for(name) for name in server.images]
+    scraper = FakeScraper(urls, latency=scrape_latency)
+    storage = FakeStorage(latency=db_latency)
+
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # The run writes logs, metrics and reports relative to the cwd
+        shutil.copytree(os.path.join(REPO_ROOT, 'config'), os.path.join(workdir, 'config'))
+        os.chdir(workdir)
+        try:
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            await process_new_memes(db=storage, scraper_factory=lambda _: scraper,
+                                    max_workers=max(concurrency, 1), max_concurrent_downloads=concurrency)
+            wall = time.perf_counter() - start
+            traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+        finally:
+            os.chdir(original_cwd)
+
+    posts = len(storage.posts)
+    return {
+        'scenario': 'process_new_memes',
+        'concurrency': concurrency,
+        'posts': posts,
+        'wall_time_s': wall,
+        'posts_per_second': posts / wall if wall > 0 else 0,
+        'traced_peak_mb': traced_peak,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+async def run_benchmarks(args) -> Dict[str, Any]:
+    if args.replay:
+        results = await run_replay(args)
+    else:
+        results = await run_synthetic(args)
+
+    summary = {}
+    for result in results:
+        key = f"{result['scenario']}@{result['concurrency']}"
+        summary.setdefault(key, []).append(result['posts_per_second'])
+
+    return {
+        'benchmark': 'pipeline',
+        'created_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count()
+        },
+        'parameters': {
+            'posts': args.posts,
+            'corpus_size': args.corpus_size,
+            'download_latency_s': args.download_latency,
+            'download_jitter_s': args.download_jitter,
+            'db_latency_s': args.db_latency,
+            'scrape_latency_s': args.scrape_latency,
+            'seed': args.seed,
+            'replay': args.replay
+        },
+        'summary': {key: statistics.median(values) for key, values in summary.items()},
+        'results': results
+    }
+
+
+async def run_synthetic(args) -> List[Dict[str, Any]]:
+    corpus = generate_corpus(args.corpus_size, seed=args.seed)
+    results = []
+
+    async with ImageServer(corpus, latency=args.download_latency, jitter=args.download_jitter,
+                           seed=args.seed) as server:
+        for concurrency in args.concurrency:
+            for repeat in range(args.repeats):
+                result = await bench_process_posts_batch(
+                    server, args.posts, concurrency, args.db_latency, args.scrape_latency, args.memory
+                )
+                result['repeat'] = repeat
+                results.append(result)
+                print(
+                    f"process_posts_batch | concurrency={concurrency:>3} | "
+                    f"{result['posts_per_second']:7.1f} posts/s | "
+                    f"p95 analysis {result['analysis_p95_s'] or 0:.3f}s"
+                )
+
+            if args.end_to_end:
+                result = await bench_process_new_memes(
+                    server, concurrency, args.db_latency, args.scrape_latency, args.memory
+                )
+                results.append(result)
+                print(
+                    f"process_new_memes   | concurrency={concurrency:>3} | "
+                    f"{result['posts_per_second']:7.1f} posts/s"
+                )
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MemeDoc pipeline benchmark with local stand-ins")
+    parser.add_argument('--posts', type=int, default=200, help="Posts per process_posts_batch run")
+    parser.add_argument('--corpus-size', type=int, default=48, help="Distinct synthetic images")
+    parser.add_argument('--concurrency', type=lambda v: [int(c) for c in v.split(',')], default=[1, 5, 10, 20])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--download-latency', type=float, default=0.0, help="Seconds added per image request")
+    parser.add_argument('--download-jitter', type=float, default=0.0, help="Random extra seconds per request")
+    parser.add_argument('--db-latency', type=float, default=0.0, help="Seconds per storage call")
+    parser.add_argument('--scrape-latency', type=float, default=0.0, help="Seconds per listing call")
+    parser.add_argument('--end-to-end', action='store_true', help="Also benchmark main.process_new_memes")
+    parser.add_argument('--memory', action='store_true', help="Trace Python allocations (slower)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--replay', metavar='DIR',
+                        help="Replay a recorded run archive (collect --record) instead of the synthetic corpus")
+    parser.add_argument('--output', help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmarks(args))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
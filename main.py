@@ -1,18 +1,122 @@
-import asyncio
-from src.scrapers import get_scraper
-from src.processors.image_analyzer import ImageTemplateDetector
-from src.core.async_processor import AsyncProcessor
-from src.core.logging_config import MemeDocLogger
-from src.core.config_manager import config_manager
-from supabase_setup import SupabaseClient
-
-async def process_new_memes():
-    """Async version with parallel processing"""
+"""MemeDoc command line.
+
+Heavy dependencies (cv2, imagehash, praw, supabase, aiohttp, NumPy) are
+imported inside the command that needs them, so ``--help`` and the light
+commands start fast. ``python -m src.core.import_budget`` guards this.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+SHARD_REPORT_DIR = os.path.join('reports', 'shards')
+HASH_INDEX_DIR = os.path.join('snapshots', 'hash_index')
+SPOOL_DIR = 'spool'
+
+
+async def process_new_memes(db=None, scraper_factory=None,
+                            max_workers: int = 10, max_concurrent_downloads: int = 5,
+                            shard_index: int = 0, shard_count: int = 1, all_sources: bool = False,
+                            run_id: Optional[str] = None, time_budget: Optional[float] = None,
+                            spool_dir: Optional[str] = SPOOL_DIR, record_dir: Optional[str] = None):
+    """Async version with parallel processing.
+
+    With ``shard_count`` > 1 only the sources hashed to ``shard_index`` are
+    collected, the run report goes to reports/shards/, posts are stored
+    without fuzzy template clusters and the once-per-run finalisation
+    (cluster assignment, rollups, stats, export) is left to the merge step. With
+    ``time_budget`` (seconds) collection stops at the deadline, shedding the
+    lowest-value posts and any sources not reached. Writes go through a
+    local spool in ``spool_dir`` (one file per shard) unless it is None;
+    an unsharded run first replays every spool file there.
+    With ``record_dir`` scraped listings and downloaded media are also
+    recorded into a RunArchive there for offline replay.
+    """
+    import time
+    from src.core.logging_config import MemeDocLogger
+    from src.core.metrics import metrics
+    from src.core.resources import CollectorResources
+    from src.core.run_report import build_run_report, write_run_report
+    from src.core.spool import spool_path
+
     logger = MemeDocLogger('main_optimized')
+    started_at = datetime.now()
+    deadline = time.monotonic() + time_budget if time_budget else None
+    sharded = shard_count > 1
+
+    # Optional live /metrics endpoint; a textfile is always written at the end
+    metrics_port = os.getenv('MEMEDOC_METRICS_PORT')
+    if metrics_port:
+        metrics.serve(int(metrics_port))
+
+    # An injected client (tests, benchmarks) also stands in for partition DDL;
+    # only shard 0 creates partitions
+    partition_db = db if db is not None else _partition_database(logger) if shard_index == 0 else None
+    db = db or _database()
+    shard_suffix = f"-shard-{shard_index}-of-{shard_count}" if sharded else ''
+    spool = spool_path(f"writes{shard_suffix}", spool_dir) if spool_dir else None
+    archive = None
+    if record_dir:
+        from src.core.archive import RunArchive
+        archive = RunArchive.record(record_dir)
+    async with CollectorResources(db, scraper_factory, max_workers, max_concurrent_downloads,
+                                  spool_path=spool, archive=archive, cluster_templates=not sharded,
+                                  partition_db=partition_db, drain_all_spools=not sharded) as resources:
+        total_stats, shard_sources_done = await collect_cycle(
+            resources, logger, shard_index=shard_index, shard_count=shard_count, all_sources=all_sources,
+            deadline=deadline
+        )
+
+    if not sharded:
+        finalize_run(db, logger)
+
+    metrics_file = os.getenv('MEMEDOC_METRICS_FILE', f'logs/metrics{shard_suffix}.prom')
+    metrics.write_textfile(metrics_file)
+    logger.logger.info(f"Wrote stage metrics to {metrics_file}")
+
+    report = build_run_report(total_stats, started_at)
+    if sharded:
+        run_id = run_id or started_at.strftime('%Y%m%dT%H%M%S')
+        report['shard'] = {'index': shard_index, 'count': shard_count, 'run_id': run_id,
+                           'sources': shard_sources_done}
+        report_path = write_run_report(report, SHARD_REPORT_DIR, f"run-{run_id}{shard_suffix}.json")
+    else:
+        report_path = write_run_report(report)
+    logger.logger.info(f"Wrote run report to {report_path}")
+
+
+async def collect_cycle(resources, logger, shard_index: int = 0, shard_count: int = 1,
+                        all_sources: bool = False, stop_event=None, adaptive_window: Optional[float] = None,
+                        deadline: Optional[float] = None):
+    """Scrape and process every source once using already-built ``resources``.
 
-    # Initialize components
-    db = SupabaseClient()
-    image_analyzer = ImageTemplateDetector()
+    Returns the totals and the sources collected per platform. When
+    ``stop_event`` is set the cycle finishes the batch in flight and skips
+    the remaining sources. With ``adaptive_window`` (seconds until the next
+    cycle) only the sources the poll scheduler finds due are collected, at
+    the listing depth it picks, within that window's share of the rate limit.
+    Past ``deadline`` (a ``time.monotonic()`` value) no further source is
+    scraped and in-progress batches shed their lowest-value posts.
+    """
+    import asyncio
+    import functools
+    import time
+    from src.core.config_manager import config_manager
+    from src.core.content_filter import ContentFilter
+    from src.core.metrics import stage_items, track_stage
+    from src.core.post_batch import PostBatch
+    from src.core.sharding import shard_sources
+
+    shard_sources_done: Dict[str, List[str]] = {}
+    db = resources.db
+    loop = asyncio.get_running_loop()
+
+    # Make sure this month's and upcoming partitions exist before inserting;
+    # only one shard does it, so concurrent shards never race to create them
+    if shard_index == 0:
+        resources.ensure_partitions()
 
     # Get enabled platforms
     enabled_platforms = config_manager.get_all_enabled_platforms()
@@ -24,6 +128,9 @@ async def process_new_memes():
     total_stats = {
         'total_processed': 0,
         'total_new': 0,
+        'total_filtered': 0,
+        'total_shed': 0,
+        'sources_skipped': 0,
         'total_time': 0
     }
 
@@ -36,23 +143,75 @@ async def process_new_memes():
 
         logger.log_scraping_start(platform_name, platform_config.daily_limit)
 
+        sources = list(platform_config.supported_subreddits if all_sources else platform_config.default_sources)
+        sources = shard_sources(platform_name, sources or ['memes'], shard_index, shard_count)
+        shard_sources_done[platform_name] = sources
+        if not sources:
+            logger.logger.info(f"No {platform_name} sources hashed to shard {shard_index}/{shard_count}")
+            continue
+        limit = min(platform_config.scraping_config.default_limit, platform_config.daily_limit)
+
         try:
             # Get scraper
-            scraper = get_scraper(platform_name)
+            scraper = resources.scraper(platform_name)
             if not scraper:
                 logger.log_error(Exception(f"Failed to initialize {platform_name} scraper"))
                 continue
 
-            # Scrape posts
-            scraped_posts = scraper.scrape_posts('memes', limit=min(100, platform_config.daily_limit))
+            scheduler = None
+            if adaptive_window:
+                scheduler = resources.poll_scheduler(platform_name, sources, limit)
+                # Every pooled credential has its own per-minute quota
+                pool = getattr(scraper, 'credential_pool', None)
+                credentials = len(pool.credentials) if pool else 1
+                budget = int(platform_config.rate_limit * credentials * adaptive_window / 60)
+                plan = scheduler.plan(time.time(), budget)
+                logger.logger.info(f"Polling {len(plan)}/{len(sources)} due {platform_name} sources")
+            else:
+                plan = [(source, limit) for source in sources]
 
-            if not scraped_posts:
-                logger.logger.info(f"No posts scraped from {platform_name}")
-                continue
+            for position, (source, source_limit) in enumerate(plan):
+                if stop_event is not None and stop_event.is_set():
+                    logger.logger.info(f"Stopping before {platform_name}/{source}")
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    total_stats['sources_skipped'] += len(plan) - position
+                    logger.logger.warning(f"Time budget spent, skipping {len(plan) - position} {platform_name} sources")
+                    break
+
+                # Scrape posts; arrival rates need the chronological 'new' listing. The
+                # blocking API calls (and credential waits) run off the event loop.
+                scrape = functools.partial(scraper.scrape_posts, source, limit=source_limit)
+                if scheduler:
+                    scrape = functools.partial(scrape, sort_type='new')
+                with track_stage('scrape'):
+                    scraped_posts = await loop.run_in_executor(None, scrape)
+                stage_items.inc(len(scraped_posts), stage='scrape', unit='posts')
+
+                if scheduler:
+                    # Count every listed post, including those the content filter dropped
+                    listed = getattr(scraper, 'last_listing_timestamps', None)
+                    if listed is None:
+                        listed = [post.timestamp.timestamp() for post in scraped_posts if post.timestamp]
+                    scheduler.record(source, listed, source_limit, time.time())
 
-            # Process posts with async pipeline
-            async with AsyncProcessor(max_workers=10, max_concurrent_downloads=5) as processor:
-                stats = await processor.process_posts_batch(scraped_posts, image_analyzer, db)
+                if not scraped_posts:
+                    logger.logger.info(f"No posts scraped from {platform_name}/{source}")
+                    continue
+
+                # Columnar batch; the ScrapedPost objects can be released right away
+                batch = PostBatch.from_posts(scraped_posts)
+                del scraped_posts
+
+                # Process posts with async pipeline
+                stats = await resources.processor.process_posts_batch(
+                    batch, resources.image_analyzer, db, resources.template_clusterer,
+                    content_filter=ContentFilter(platform_config.content_filters),
+                    title_minhasher=resources.title_minhasher,
+                    deadline=deadline
+                )
+                if resources.template_clusterer is not None:
+                    db.save_template_clusters(resources.template_clusterer.drain_new_members())
 
                 # Log results
                 logger.log_scraping_result(
@@ -73,6 +232,8 @@ async def process_new_memes():
                 # Update totals
                 total_stats['total_processed'] += stats['total_processed']
                 total_stats['total_new'] += stats['new_posts']
+                total_stats['total_filtered'] += stats['filtered']
+                total_stats['total_shed'] += stats['shed']
                 total_stats['total_time'] += stats['processing_time']
 
         except Exception as e:
@@ -84,11 +245,88 @@ async def process_new_memes():
         f"Session completed | "
         f"Total processed: {total_stats['total_processed']} | "
         f"Total new: {total_stats['total_new']} | "
+        f"Shed: {total_stats['total_shed']} posts, {total_stats['sources_skipped']} sources | "
         f"Overall rate: {overall_rate:.1f} posts/s"
     )
+    return total_stats, shard_sources_done
+
+
+async def run_daemon(interval: float, drain_timeout: float, finalize_interval: float,
+                     all_sources: bool = False, max_cycles: Optional[int] = None,
+                     db=None, scraper_factory=None, adaptive: bool = False,
+                     cycle_budget: Optional[float] = None, spool_dir: Optional[str] = SPOOL_DIR):
+    """Collect every ``interval`` seconds in this process, keeping pools and caches warm.
+
+    With ``adaptive`` each cycle polls only the sources whose estimated
+    arrivals make them due, so ``interval`` becomes the scheduler's tick.
+    ``cycle_budget`` caps each cycle's collection time the way ``collect
+    --time-budget`` caps a one-shot run.
+    """
+    import time
+    import asyncio
+    from src.core.daemon import CollectorDaemon
+    from src.core.logging_config import MemeDocLogger
+    from src.core.metrics import metrics
+    from src.core.resources import CollectorResources
+    from src.core.run_report import build_run_report, write_run_report
+    from src.core.spool import spool_path
+
+    logger = MemeDocLogger('main_optimized')
+    started_at = datetime.now()
+    metrics_port = os.getenv('MEMEDOC_METRICS_PORT')
+    if metrics_port:
+        metrics.serve(int(metrics_port))
+    metrics_file = os.getenv('MEMEDOC_METRICS_FILE', 'logs/metrics.prom')
+
+    partition_db = db if db is not None else _partition_database(logger)
+    db = db or _database()
+    totals: Dict[str, float] = {}
+
+    async with CollectorResources(db, scraper_factory,
+                                  spool_path=spool_path('writes', spool_dir) if spool_dir else None,
+                                  partition_db=partition_db, drain_all_spools=True) as resources:
+        async def cycle(stop_event: asyncio.Event):
+            cycle_stats, _ = await collect_cycle(resources, logger, all_sources=all_sources,
+                                                 stop_event=stop_event,
+                                                 adaptive_window=interval if adaptive else None,
+                                                 deadline=time.monotonic() + cycle_budget if cycle_budget else None)
+            for key, value in cycle_stats.items():
+                totals[key] = totals.get(key, 0) + value
+            metrics.write_textfile(metrics_file)
+
+        daemon = CollectorDaemon(cycle, interval, drain_timeout=drain_timeout,
+                                 finalize=lambda: finalize_run(db, logger),
+                                 finalize_interval=finalize_interval)
+        await daemon.run(max_cycles=max_cycles)
+        poll_schedule = resources.poll_snapshots()
+
+    metrics.write_textfile(metrics_file)
+    # One report for the daemon's lifetime; counters are cumulative across cycles
+    report = build_run_report(totals, started_at)
+    report['daemon'] = {'cycles': daemon.cycles, 'interval_s': interval, 'adaptive': adaptive,
+                        'poll_schedule': poll_schedule}
+    logger.logger.info(f"Wrote run report to {write_run_report(report)}")
+
+
+def finalize_run(db, logger):
+    """Once-per-run work after collection: rollups, stats and the JSON export"""
+    from src.processors.pattern_matcher import MemePatternMatcher
+    from src.core.metrics import stage_items, track_stage
 
     # Get and display stats
     try:
+        rollups = db.refresh_subreddit_rollups()
+        logger.logger.info(f"Refreshed {rollups} subreddit hourly rollups")
+
+        emerging = MemePatternMatcher(db).get_top_emerging(k=5)
+        if emerging:
+            logger.logger.info("Emerging templates:")
+            for pattern in emerging:
+                logger.logger.info(
+                    f"  - {pattern['template_hash']} (Momentum: {pattern['momentum_score']:.2f}, "
+                    f"Platforms: {', '.join(pattern['platforms'])})"
+                )
+
         db_stats = db.get_stats()
         logger.logger.info(f"Database total: {db_stats['total_posts']} posts")
 
@@ -97,12 +335,421 @@ async def process_new_memes():
             for meme in db_stats['top_posts'][:3]:
                 logger.logger.info(f"  - {meme['title'][:50]}... (Score: {meme['score']})")
 
+        # Keep an existing hash index snapshot current; creating one is opt-in
+        if os.path.exists(os.path.join(HASH_INDEX_DIR, 'manifest.json')):
+            from src.processors.hash_index import HashIndex
+            try:
+                logger.logger.info(f"Synced {HashIndex.open(HASH_INDEX_DIR).sync(db)} posts into the hash index")
+            except Exception as e:
+                logger.logger.error(f"Hash index sync failed, snapshot left unchanged: {e}")
+
         # Export data
-        exported = db.export_data()
+        with track_stage('export'):
+            exported = db.export_data()
+        stage_items.inc(exported, stage='export', unit='rows')
         logger.logger.info(f"Exported {exported} records to meme_export.json")
 
     except Exception as e:
         logger.log_error(e, "Getting final stats")
 
+def _database(service_role: bool = False):
+    from supabase_setup import SupabaseClient
+    return SupabaseClient(service_role=service_role)
+
+
+def _partition_database(logger=None):
+    """Service-role client for partition DDL; None (with a warning) without SUPABASE_SERVICE_KEY"""
+    if os.getenv('SUPABASE_SERVICE_KEY'):
+        return _database(service_role=True)
+    message = ("SUPABASE_SERVICE_KEY is not set, so upcoming partitions are not created; "
+               "new months land in meme_posts_default until 'refresh' runs with it")
+    if logger:
+        logger.logger.warning(message)
+    else:
+        print(message)
+    return None
+
+
+def run_local_shards(workers: int, all_sources: bool, time_budget: Optional[float] = None,
+                     spool: bool = True, record_dir: Optional[str] = None) -> int:
+    """Run one collect process per shard, then merge their reports and finalise once.
+
+    Each shard logs to its own file (logs/memedoc-shard-I-of-N.log) so
+    concurrent processes never share a rotating log.
+    """
+    import json
+    import subprocess
+    from src.core.logging_config import MemeDocLogger
+    from src.core.run_report import merge_reports, write_run_report
+
+    run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+    command = [sys.executable, os.path.abspath(__file__), 'collect',
+               '--shard-count', str(workers), '--run-id', run_id]
+    if all_sources:
+        command.append('--all-sources')
+    if time_budget:
+        command += ['--time-budget', str(time_budget)]
+    if not spool:
+        command.append('--no-spool')
+    shard_commands = [command + ['--shard-index', str(i)] for i in range(workers)]
+    if record_dir:
+        # One archive per shard; each process owns its index
+        for i, shard_command in enumerate(shard_commands):
+            shard_command += ['--record', os.path.join(record_dir, f"shard-{i}")]
+    logger = MemeDocLogger('main_optimized')
+    db = _database()
+    partition_db = _partition_database(logger)
+    if partition_db is not None:
+        partition_db.ensure_partitions()  # before any shard inserts
+    if spool:
+        # Spools of an earlier run with another --workers count belong to no shard now
+        from src.core.resources import SPOOL_DRAIN_TIMEOUT
+        from src.core.spool import drain_spool_dir
+        left = drain_spool_dir(db, SPOOL_DIR, SPOOL_DRAIN_TIMEOUT, MemeDocLogger('spool'))
+        if left:
+            logger.logger.warning(f"{left} spooled rows still pending in {SPOOL_DIR}/")
+    shards = [
+        subprocess.Popen(shard_command, env={
+            **os.environ, 'MEMEDOC_LOG_FILE': os.path.join('logs', f"memedoc-shard-{i}-of-{workers}.log")
+        })
+        for i, shard_command in enumerate(shard_commands)
+    ]
+    failed = [i for i, shard in enumerate(shards) if shard.wait() != 0]
+
+    clustering = {'posts_updated': 0, 'error': None}
+    try:
+        clustering['posts_updated'] = db.cluster_new_templates()
+        logger.logger.info(f"Assigned template clusters to {clustering['posts_updated']} shard posts")
+    except Exception as e:
+        clustering['error'] = str(e)
+        logger.logger.error(f"Assigning template clusters to shard posts failed: {e}")
+    reports = []
+    for i in range(workers):
+        path = os.path.join(SHARD_REPORT_DIR, f"run-{run_id}-shard-{i}-of-{workers}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                reports.append(json.load(f))
+    if reports:
+        merged = merge_reports(reports)
+        merged['template_clustering'] = clustering
+        logger.logger.info(f"Wrote merged run report to {write_run_report(merged)}")
+
+    finalize_run(db, logger)
+    if failed:
+        logger.logger.error(f"Shards failed: {failed}")
+    return 1 if failed or clustering['error'] else 0
+
+
+def cmd_collect(args) -> int:
+    import asyncio
+
+    if args.workers > 1:
+        return run_local_shards(args.workers, args.all_sources, args.time_budget, spool=not args.no_spool,
+                                record_dir=args.record)
+
+    def run():
+        asyncio.run(process_new_memes(
+            shard_index=args.shard_index, shard_count=args.shard_count,
+            all_sources=args.all_sources, run_id=args.run_id, time_budget=args.time_budget,
+            spool_dir=None if args.no_spool else SPOOL_DIR, record_dir=args.record
+        ))
+
+    if not args.profile:
+        run()
+        return 0
+
+    from src.core.profiler import StageProfiler
+    profiler = StageProfiler(interval=args.profile_interval)
+    with profiler:
+        run()
+    print(f"Profile written to {profiler.write()}")
+    return 0
+
+
+def cmd_daemon(args) -> int:
+    import asyncio
+
+    asyncio.run(run_daemon(args.interval, args.drain_timeout, args.finalize_interval,
+                           all_sources=args.all_sources, max_cycles=args.max_cycles,
+                           adaptive=args.adaptive, cycle_budget=args.cycle_budget,
+                           spool_dir=None if args.no_spool else SPOOL_DIR))
+    return 0
+
+
+def cmd_refresh(args) -> int:
+    db = _database()
+    partition_db = _partition_database()
+    if partition_db is not None:
+        print(f"Created {partition_db.ensure_partitions()} partitions")
+    status = 0
+    try:
+        print(f"Assigned template clusters to {db.cluster_new_templates()} posts")
+    except Exception as e:
+        print(f"Error assigning template clusters: {e}")
+        status = 1
+    print(f"Refreshed {db.refresh_subreddit_rollups(args.hours_back)} subreddit hourly rollups")
+    return status
+
+
+def cmd_export(args) -> int:
+    print(f"Exported {_database().export_data()} records to meme_export.json")
+    return 0
+
+
+def cmd_stats(args) -> int:
+    from src.processors.pattern_matcher import MemePatternMatcher
+
+    db = _database()
+    db_stats = db.get_stats()
+    print(f"Database total: {db_stats['total_posts']} posts")
+    for meme in db_stats['top_posts'][:args.top]:
+        print(f"  - {meme['title'][:50]} (Score: {meme['score']})")
+
+    emerging = MemePatternMatcher(db).get_top_emerging(k=args.top)
+    if emerging:
+        print("Emerging templates:")
+        for pattern in emerging:
+            print(f"  - {pattern['template_hash']} (Momentum: {pattern['momentum_score']:.2f}, "
+                  f"Platforms: {', '.join(pattern['platforms'])})")
+    return 0
+
+
+def cmd_similar(args) -> int:
+    from src.processors.image_analyzer import ImageTemplateDetector
+
+    detector = ImageTemplateDetector()
+    if args.image.startswith(('http://', 'https://')):
+        features = detector.extract_features(args.image)
+    else:
+        with open(args.image, 'rb') as f:
+            features = detector.extract_features_from_bytes(f.read())
+    if not features:
+        print(f"Could not extract features from {args.image}")
+        return 1
+    if args.title:
+        from src.processors.text_similarity import TitleMinHasher
+        features['title_minhash'] = TitleMinHasher().encode(args.title)
+
+    db = _database()
+    index = None
+    if not args.no_index and features.get('phash'):
+        from src.processors.hash_index import HashIndex
+        index = HashIndex.open(args.index_dir)
+        if not index.segments:
+            index = None
+
+    if index:
+        # Candidates from the mapped snapshot (plus the delta since it was written)
+        try:
+            index.sync(db)
+        except Exception as e:
+            print(f"Warning: hash index sync failed, searching the snapshot as is: {e}")
+        near = index.near(features['phash'], radius=args.radius)
+        candidates = db.get_posts_by_ids([match['id'] for match in near[:args.top * 20]])
+        scope = f"{len(index)} indexed posts"
+        if features.get('title_minhash'):
+            # Re-shares with a different crop only match on the title
+            from src.processors.text_similarity import TitleLSH, TitleMinHasher
+            recent = db.get_recent_posts(args.hours)
+            titles = TitleLSH.from_rows(recent)
+            hits = {key for key, _ in titles.query(TitleMinHasher.decode(features['title_minhash']))}
+            seen = {row['id'] for row in candidates}
+            candidates += [row for row in recent if row['id'] in hits and row['id'] not in seen]
+    else:
+        candidates = [row for row in db.get_recent_posts(args.hours) if row.get('phash')]
+        scope = f"{len(candidates)} posts from the last {args.hours}h"
+
+    matches = detector.find_similar_templates(features, candidates, threshold=args.threshold)
+    for match in matches[:args.top]:
+        item = match['item']
+        print(f"{match['similarity']:5.2f}  {item.get('template_cluster_id') or item['phash']}  "
+              f"{item['title'][:50]}  {item['url']}")
+    if not matches:
+        print(f"No similar templates among {scope}")
+    return 0
+
+
+def cmd_dupes(args) -> int:
+    from src.processors.text_similarity import TitleLSH
+
+    posts = {row['id']: row for row in _database().get_recent_posts(args.hours)}
+    titles = TitleLSH.from_rows(posts.values(), threshold=args.threshold)
+    groups = sorted(titles.near_duplicate_groups(), key=len, reverse=True)
+    for group in groups[:args.top]:
+        print(f"{len(group)} posts:")
+        for key in group[:5]:
+            print(f"  {posts[key]['title'][:60]}  {posts[key]['url']}")
+    if not groups:
+        print(f"No near-duplicate titles among {len(titles)} posts from the last {args.hours}h")
+    return 0
+
+
+def cmd_index(args) -> int:
+    import json
+    from src.processors.hash_index import HashIndex
+
+    index = HashIndex.open(args.dir)
+    if args.action == 'sync':
+        try:
+            print(f"Appended {index.sync(_database())} posts")
+        except Exception as e:
+            print(f"Error syncing the hash index: {e}")
+            return 1
+    elif args.action == 'compact':
+        print(f"Merged {index.compact()} segments")
+    print(json.dumps(index.info()))
+    return 0
+
+
+def cmd_spool(args) -> int:
+    from src.core.logging_config import MemeDocLogger
+    from src.core.spool import SpoolDrainer, WriteSpool, spool_files
+
+    paths = spool_files(args.dir)
+    if not paths:
+        print(f"No spools in {args.dir}/")
+        return 0
+
+    db = _database() if args.action == 'drain' else None
+    failed = False
+    for path in paths:
+        spool = WriteSpool(path)
+        if args.action == 'requeue':
+            print(f"{path}: requeued {spool.requeue()} dead-lettered rows")
+        if db is not None:
+            drainer = SpoolDrainer(spool, db, logger=MemeDocLogger('spool'))
+            failed |= not drainer.drain(timeout=args.timeout)
+            print(f"{path}: wrote {drainer.written} rows")
+        age = spool.oldest_age()
+        pending = ', '.join(f"{kind}={count}" for kind, count in spool.pending().items()) or 'empty'
+        print(f"{path}: {pending}" + (f" (oldest {age:.0f}s)" if age is not None else ''))
+        dead = spool.dead_letters()
+        if dead:
+            print(f"{path}: dead-lettered " + ', '.join(f"{kind}={count}" for kind, count in dead.items()))
+        spool.close()
+    return 1 if failed else 0
+
+
+def cmd_archive(args) -> int:
+    import json
+    from src.core.archive import RunArchive
+
+    print(json.dumps(RunArchive.open(args.dir).info()))
+    return 0
+
+
+def cmd_bench(args) -> int:
+    if args.suite == 'pipeline':
+        from benchmarks.pipeline_benchmark import main as bench_main
+    else:
+        from benchmarks.detector_microbench import main as bench_main
+    bench_main(args.bench_args)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Collect and analyse memes")
+    subparsers = parser.add_subparsers(dest='command')
+
+    collect_parser = subparsers.add_parser('collect', help="Scrape, analyse and store new memes (default)")
+    collect_parser.add_argument('--profile', action='store_true',
+                                help="Sample CPU and allocations per stage into logs/profile-<timestamp>/")
+    collect_parser.add_argument('--profile-interval', type=float, default=0.005,
+                                help="Seconds between CPU samples")
+    collect_parser.add_argument('--all-sources', action='store_true',
+                                help="Collect every supported source instead of default_sources")
+    collect_parser.add_argument('--workers', type=int, default=1,
+                                help="Run this many local shard processes and merge their reports")
+    collect_parser.add_argument('--shard-index', type=int, default=0, help="This worker's shard (0-based)")
+    collect_parser.add_argument('--shard-count', type=int, default=1, help="Total shards, e.g. matrix size")
+    collect_parser.add_argument('--time-budget', type=float,
+                                help="Stop collecting after this many seconds, shedding the lowest-value posts")
+    collect_parser.add_argument('--no-spool', action='store_true',
+                                help="Write straight to the database instead of through the local spool")
+    collect_parser.add_argument('--record', metavar='DIR',
+                                help="Also record listings and media into a replayable archive in DIR")
+    collect_parser.add_argument('--run-id', help="Shared id naming the shard reports of one sharded run")
+    collect_parser.set_defaults(func=cmd_collect)
+
+    daemon_parser = subparsers.add_parser('daemon', help="Collect on a schedule in one long-lived process")
+    daemon_parser.add_argument('--interval', type=float, default=900, help="Seconds between cycle starts")
+    daemon_parser.add_argument('--drain-timeout', type=float, default=120,
+                               help="Seconds the running cycle gets to finish after SIGTERM/SIGINT")
+    daemon_parser.add_argument('--finalize-interval', type=float, default=6 * 3600,
+                               help="Seconds between rollup refreshes and exports")
+    daemon_parser.add_argument('--all-sources', action='store_true',
+                               help="Collect every supported source instead of default_sources")
+    daemon_parser.add_argument('--adaptive', action='store_true',
+                               help="Poll each source when its estimated arrivals make it due")
+    daemon_parser.add_argument('--cycle-budget', type=float,
+                               help="Seconds of collection per cycle before low-value posts are shed")
+    daemon_parser.add_argument('--no-spool', action='store_true',
+                               help="Write straight to the database instead of through the local spool")
+    daemon_parser.add_argument('--max-cycles', type=int, help="Exit after this many cycles")
+    daemon_parser.set_defaults(func=cmd_daemon)
+
+    refresh_parser = subparsers.add_parser('refresh', help="Create upcoming partitions and refresh rollups")
+    refresh_parser.add_argument('--hours-back', type=int, default=48)
+    refresh_parser.set_defaults(func=cmd_refresh)
+
+    export_parser = subparsers.add_parser('export', help="Export all posts to meme_export.json")
+    export_parser.set_defaults(func=cmd_export)
+
+    stats_parser = subparsers.add_parser('stats', help="Show totals, top posts and emerging templates")
+    stats_parser.add_argument('--top', type=int, default=5)
+    stats_parser.set_defaults(func=cmd_stats)
+
+    similar_parser = subparsers.add_parser('similar', help="Find stored posts with a similar template")
+    similar_parser.add_argument('image', help="Image path or URL")
+    similar_parser.add_argument('--hours', type=int, default=168, help="Search posts from this many hours back")
+    similar_parser.add_argument('--threshold', type=float, default=5)
+    similar_parser.add_argument('--top', type=int, default=10)
+    similar_parser.add_argument('--radius', type=int, default=8,
+                                help="Max phash bit distance for index candidates")
+    similar_parser.add_argument('--index-dir', default=HASH_INDEX_DIR)
+    similar_parser.add_argument('--no-index', action='store_true',
+                                help="Scan recent posts even when a hash index snapshot exists")
+    similar_parser.add_argument('--title', help="Also score candidates by title similarity to this text")
+    similar_parser.set_defaults(func=cmd_similar)
+
+    dupes_parser = subparsers.add_parser('dupes', help="Group recent posts with near-duplicate titles")
+    dupes_parser.add_argument('--hours', type=int, default=168)
+    dupes_parser.add_argument('--threshold', type=float, default=0.6, help="Estimated Jaccard similarity")
+    dupes_parser.add_argument('--top', type=int, default=10)
+    dupes_parser.set_defaults(func=cmd_dupes)
+
+    index_parser = subparsers.add_parser('index', help="Maintain the memory-mapped hash index snapshot")
+    index_parser.add_argument('action', choices=['sync', 'compact', 'info'])
+    index_parser.add_argument('--dir', default=HASH_INDEX_DIR)
+    index_parser.set_defaults(func=cmd_index)
+
+    spool_parser = subparsers.add_parser('spool', help="Show or replay writes waiting in the local spool")
+    spool_parser.add_argument('action', choices=['status', 'drain', 'requeue'])
+    spool_parser.add_argument('--dir', default=SPOOL_DIR)
+    spool_parser.add_argument('--timeout', type=float, default=600, help="Seconds to keep draining")
+    spool_parser.set_defaults(func=cmd_spool)
+
+    archive_parser = subparsers.add_parser('archive', help="Describe a recorded run archive")
+    archive_parser.add_argument('dir')
+    archive_parser.set_defaults(func=cmd_archive)
+
+    bench_parser = subparsers.add_parser('bench', help="Run a benchmark suite (extra args are passed through)")
+    bench_parser.add_argument('suite', choices=['pipeline', 'detector'])
+    bench_parser.add_argument('bench_args', nargs=argparse.REMAINDER)
+    bench_parser.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    # Bare `python main.py [--profile]` keeps meaning "collect"
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or (argv[0].startswith('-') and argv[0] not in ('-h', '--help')):
+        argv = ['collect', *argv]
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
 if __name__ == "__main__":
-    asyncio.run(process_new_memes())
\ No newline at end of file
+    sys.exit(main())
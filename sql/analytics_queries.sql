@@ -46,7 +46,7 @@ SELECT
     COUNT(*) as total_memes,
     AVG(score) as avg_score,
     MAX(score) as top_score,
-    COUNT(DISTINCT template_hash) as unique_templates
+    COUNT(DISTINCT COALESCE(template_cluster_id, template_hash)) as unique_templates
 FROM meme_posts
 GROUP BY DATE(timestamp)
 ORDER BY day DESC;
@@ -78,10 +78,10 @@ SELECT
     (SELECT COUNT(*) FROM meme_posts WHERE timestamp > NOW() - INTERVAL '24 hours') as last_24h,
     (SELECT COUNT(*) FROM meme_posts WHERE timestamp > NOW() - INTERVAL '1 hour') as last_hour;
 
--- 7. Template evolution tracking
+-- 7. Template evolution tracking (grouped by fuzzy template cluster)
 CREATE OR REPLACE VIEW template_evolution AS
 SELECT
-    template_hash,
+    COALESCE(template_cluster_id, template_hash) as template_hash,
     COUNT(*) as variations,
     MIN(timestamp) as first_seen,
     MAX(timestamp) as last_seen,
@@ -90,7 +90,7 @@ SELECT
     MAX(score) as max_score
 FROM meme_posts
 WHERE template_hash IS NOT NULL
-GROUP BY template_hash
+GROUP BY COALESCE(template_cluster_id, template_hash)
 HAVING COUNT(*) > 1
 ORDER BY variations DESC;
 
@@ -146,4 +146,28 @@ BEGIN
     ORDER BY velocity DESC
     LIMIT 20;
 END;
-$$ LANGUAGE plpgsql;
\ No newline at end of file
+$$ LANGUAGE plpgsql;
+
+-- 11. Subreddit performance matrix (reads hourly rollups, not meme_posts)
+CREATE OR REPLACE VIEW subreddit_performance AS
+WITH windows AS (
+    SELECT
+        subreddit,
+        SUM(post_count) FILTER (WHERE hour > NOW() - INTERVAL '24 hours') as posts_24h,
+        SUM(post_count) FILTER (WHERE hour <= NOW() - INTERVAL '24 hours') as posts_prev_24h,
+        SUM(post_count) as total_posts,
+        SUM(avg_score * post_count) / NULLIF(SUM(post_count), 0) as avg_score,
+        SUM(velocity * post_count) / NULLIF(SUM(post_count), 0) as velocity
+    FROM subreddit_hourly_stats
+    WHERE hour > NOW() - INTERVAL '48 hours'
+    GROUP BY subreddit
+)
+SELECT
+    subreddit as name,
+    total_posts,
+    ROUND(avg_score, 1) as avg_score,
+    ROUND(velocity, 1) as velocity,
+    ROUND((COALESCE(posts_24h, 0) - COALESCE(posts_prev_24h, 0)) * 100.0
+        / GREATEST(COALESCE(posts_prev_24h, 0), 1), 1) as growth_rate
+FROM windows
+ORDER BY total_posts DESC;
@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..scrapers.base_scraper import BaseScraper, ScrapedPost
+
+FORMAT_VERSION = 1
+INDEX = 'index.json.gz'
+
+
+def _post_to_json(post: ScrapedPost) -> Dict[str, Any]:
+    row = post.to_dict()
+    row['timestamp'] = post.timestamp.isoformat()
+    return row
+
+
+def _post_from_json(row: Dict[str, Any]) -> ScrapedPost:
+    return ScrapedPost(**{**row, 'timestamp': datetime.fromisoformat(row['timestamp'])})
+
+
+class RunArchive:
+    """Content-addressed recording of one or more collection runs.
+
+    Media bytes are stored once per SHA-256 under ``blobs/``, so reposted
+    images cost nothing extra. ``index.json.gz`` holds every scraped
+    listing in call order and maps each downloaded URL to its blob (or to
+    None when the download failed, so replay fails it too). The index is
+    replaced atomically on ``save``; blobs are written before the index
+    names them.
+    """
+
+    def __init__(self, directory: str, replay: bool = False):
+        self.directory = directory
+        self.replay = replay
+        self.created_at = datetime.now().isoformat()
+        self.listings: List[Dict[str, Any]] = []
+        self.media: Dict[str, Optional[str]] = {}
+        self._cursors: Dict[tuple, int] = {}
+
+    @classmethod
+    def open(cls, directory: str) -> 'RunArchive':
+        """Load a recorded archive for replay"""
+        with gzip.open(os.path.join(directory, INDEX), 'rt') as f:
+            index = json.load(f)
+        if index.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"{directory} has archive format {index.get('format_version')}, "
+                             f"expected {FORMAT_VERSION}")
+        archive = cls(directory, replay=True)
+        archive.created_at = index['created_at']
+        archive.listings = index['listings']
+        archive.media = index['media']
+        return archive
+
+    @classmethod
+    def record(cls, directory: str) -> 'RunArchive':
+        """Start recording, appending to an existing archive in ``directory``"""
+        if os.path.exists(os.path.join(directory, INDEX)):
+            archive = cls.open(directory)
+            archive.replay = False
+            return archive
+        return cls(directory)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'blobs', digest[:2], digest)
+
+    def put_listing(self, platform: str, source: str, limit: int, posts: List[ScrapedPost]):
+        self.listings.append({
+            'platform': platform,
+            'source': source,
+            'limit': limit,
+            'posts': [_post_to_json(post) for post in posts]
+        })
+
+    def iter_listings(self) -> Iterator[Tuple[str, str, List[ScrapedPost]]]:
+        """Every recorded listing as (platform, source, posts), in scrape order"""
+        for listing in self.listings:
+            yield listing['platform'], listing['source'], [_post_from_json(row) for row in listing['posts']]
+
+    def next_listing(self, platform: str, source: str, limit: int) -> List[ScrapedPost]:
+        """Recorded listings for a source in the order they were scraped; empty once exhausted"""
+        key = (platform, source)
+        matches = [listing for listing in self.listings
+                   if listing['platform'] == platform and listing['source'] == source]
+        cursor = self._cursors.get(key, 0)
+        if cursor >= len(matches):
+            return []
+        self._cursors[key] = cursor + 1
+        return [_post_from_json(row) for row in matches[cursor]['posts'][:limit]]
+
+    def put_media(self, url: str, data: Optional[bytes]):
+        if data is None:
+            self.media.setdefault(url, None)
+            return
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self.media[url] = digest
+
+    def get_media(self, url: str) -> Optional[bytes]:
+        """Recorded bytes for a URL; None if it failed or was never downloaded"""
+        digest = self.media.get(url)
+        if digest is None:
+            return None
+        with open(self._blob_path(digest), 'rb') as f:
+            return f.read()
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        index = {
+            'format_version': FORMAT_VERSION,
+            'created_at': self.created_at,
+            'saved_at': datetime.now().isoformat(),
+            'listings': self.listings,
+            'media': self.media
+        }
+        tmp_path = os.path.join(self.directory, f"{INDEX}.{os.getpid()}.tmp")
+        with gzip.open(tmp_path, 'wt') as f:
+            json.dump(index, f, default=str)
+        os.replace(tmp_path, os.path.join(self.directory, INDEX))
+
+    def info(self) -> Dict[str, Any]:
+        blobs = set(digest for digest in self.media.values() if digest)
+        return {
+            'directory': self.directory,
+            'created_at': self.created_at,
+            'listings': len(self.listings),
+            'posts': sum(len(listing['posts']) for listing in self.listings),
+            'urls': len(self.media),
+            'blobs': len(blobs),
+            'blob_bytes': sum(os.path.getsize(self._blob_path(digest)) for digest in blobs)
+        }
+
+
+class RecordingScraper:
+    """Scraper wrapper that records every listing into an archive"""
+
+    def __init__(self, scraper, archive: RunArchive):
+        self.scraper = scraper
+        self.archive = archive
+
+    def __getattr__(self, name):
+        return getattr(self.scraper, name)
+
+    def scrape_posts(self, source: str, limit: int = 100, **kwargs) -> List[ScrapedPost]:
+        posts = self.scraper.scrape_posts(source, limit=limit, **kwargs)
+        self.archive.put_listing(self.scraper.platform_name, source, limit, posts)
+        return posts
+
+
+class ReplayScraper(BaseScraper):
+    """Serves recorded listings instead of calling the platform API"""
+
+    def __init__(self, archive: RunArchive, platform_name: str = 'reddit'):
+        super().__init__({'platform_name': platform_name})
+        self.archive = archive
+
+    def authenticate(self) -> bool:
+        return True
+
+    def scrape_posts(self, source: str, limit: int = 100, **kwargs) -> List[ScrapedPost]:
+        return self.archive.next_listing(self.platform_name, source, limit)
+
+    def get_post_details(self, post_id: str) -> Optional[ScrapedPost]:
+        return None
+
+    def is_media_post(self, post_data: Any) -> bool:
+        return True
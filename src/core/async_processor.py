@@ -1,20 +1,35 @@
 import asyncio
 import aiohttp
-from typing import List, Dict, Any, Optional
+import statistics
+from collections import deque
+from typing import List, Dict, Any, Optional, Union
 from concurrent.futures import ThreadPoolExecutor
 import time
+from ..processors.media_sampler import max_bytes_for, url_media_type
 from ..scrapers.base_scraper import ScrapedPost
+from .metrics import in_flight, queue_depth, shed_posts, stage_items, track_stage
+from .post_batch import PostBatch
+
+# Successful posts per incremental upsert
+FLUSH_SIZE = 50
 
 class AsyncProcessor:
-    """Async pipeline for parallel processing of scraped posts"""
+    """Async pipeline for parallel processing of scraped posts.
+
+    With an ``archive`` (a RunArchive) downloads are recorded into it, or,
+    for a replay archive, served from it without opening any connection.
+    """
 
-    def __init__(self, max_workers: int = 10, max_concurrent_downloads: int = 5):
+    def __init__(self, max_workers: int = 10, max_concurrent_downloads: int = 5, archive=None):
         self.max_workers = max_workers
         self.max_concurrent_downloads = max_concurrent_downloads
+        self.archive = archive
         self.session: Optional[aiohttp.ClientSession] = None
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
 
     async def __aenter__(self):
+        if self.archive is not None and self.archive.replay:
+            return self
         connector = aiohttp.TCPConnector(limit=self.max_concurrent_downloads)
         timeout = aiohttp.ClientTimeout(total=30, connect=10)
         self.session = aiohttp.ClientSession(
@@ -29,112 +44,194 @@ class AsyncProcessor:
             await self.session.close()
         self.executor.shutdown(wait=True)
 
-    async def process_posts_batch(self, posts: List[ScrapedPost], image_analyzer, db_client) -> Dict[str, int]:
-        """Process posts in parallel batches"""
+    async def process_posts_batch(self, posts: Union[PostBatch, List[ScrapedPost]], image_analyzer, db_client,
+                                  template_clusterer=None, content_filter=None,
+                                  title_minhasher=None, deadline: Optional[float] = None,
+                                  flush_size: int = FLUSH_SIZE) -> Dict[str, int]:
+        """Process posts highest expected value first, persisting as results arrive.
+
+        Posts are ordered by score, recency and (under a ``deadline``) whether
+        they are already stored. Successful features are upserted every
+        ``flush_size`` posts, so a failure late in the batch keeps what came
+        before. ``deadline`` is a ``time.monotonic()`` value: once the time
+        left is below a typical successful post's processing time no new post
+        is started, in-flight posts are cut off at the deadline, and everything
+        not processed is counted as shed. ``written`` counts upserted rows and
+        ``new_posts`` only those that were not stored before.
+        """
         start_time = time.time()
+        batch = posts if isinstance(posts, PostBatch) else PostBatch.from_posts(posts)
+
+        # Filtered posts never reach the downloader
+        if content_filter:
+            indices = content_filter.accepted_indices(batch, stage='download')
+        else:
+            indices = range(len(batch))
+
+        known_post_ids = set()
+        if len(indices):
+            # Orders posts under a deadline and tells new rows from rewritten ones
+            loop = asyncio.get_event_loop()
+            known_post_ids = await loop.run_in_executor(
+                self.executor, db_client.get_known_post_ids,
+                batch.platform[indices[0]], [batch.post_id[i] for i in indices]
+            )
+        queue = deque(batch.priority_order(indices, known_post_ids))
 
         # Create semaphore to limit concurrent operations
         semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
-
-        # Process all posts concurrently
-        tasks = [
-            self._process_single_post(post, image_analyzer, semaphore)
-            for post in posts
-        ]
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Batch database operations
-        successful_posts = []
-        for post, result in zip(posts, results):
-            if isinstance(result, dict) and result.get('success'):
-                successful_posts.append({
-                    'post': post,
-                    'features': result.get('features', {})
-                })
-
-        # Bulk insert to database
-        new_count = await self._bulk_insert_posts(successful_posts, db_client)
-
+        pending: Dict[int, Dict] = {}
+        counts = {'successful': 0, 'written': 0, 'new_posts': 0, 'timed_out': 0}
+        post_seconds: List[float] = []
+
+        async def flush(force: bool = False):
+            if pending and (force or len(pending) >= flush_size):
+                chunk = dict(pending)
+                pending.clear()
+                written = await self._bulk_insert_posts(
+                    batch, chunk, db_client, template_clusterer, title_minhasher)
+                counts['written'] += written
+                # Upserts rewrite already stored posts too; those are not new
+                unseen = sum(1 for i in chunk if batch.post_id[i] not in known_post_ids)
+                counts['new_posts'] += min(written, unseen)
+
+        async def worker():
+            while queue:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    typical = statistics.median(post_seconds) if post_seconds else 0.0
+                    if remaining <= typical:
+                        return
+                i = queue.popleft()
+                started = time.monotonic()
+                try:
+                    result = await asyncio.wait_for(
+                        self._process_single_post(batch.media_url[i] or batch.url[i], image_analyzer, semaphore), remaining)
+                except asyncio.TimeoutError:
+                    counts['timed_out'] += 1
+                    continue
+                if result.get('success'):
+                    # Failed downloads return early and would skew the cut-off down
+                    post_seconds.append(time.monotonic() - started)
+                    pending[i] = result.get('features', {})
+                    counts['successful'] += 1
+                    await flush()
+
+        await asyncio.gather(*(worker() for _ in range(self.max_concurrent_downloads)))
+        await flush(force=True)
+
+        shed = len(queue) + counts['timed_out']
+        if shed:
+            shed_posts.inc(shed, reason='deadline')
         processing_time = time.time() - start_time
 
         return {
-            'total_processed': len(posts),
-            'successful': len(successful_posts),
-            'new_posts': new_count,
+            'total_processed': len(batch),
+            'successful': counts['successful'],
+            'filtered': len(batch) - len(indices),
+            'shed': shed,
+            'written': counts['written'],
+            'new_posts': counts['new_posts'],
             'processing_time': processing_time,
-            'posts_per_second': len(posts) / processing_time if processing_time > 0 else 0
+            'posts_per_second': len(batch) / processing_time if processing_time > 0 else 0
         }
 
-    async def _process_single_post(self, post: ScrapedPost, image_analyzer, semaphore) -> Dict[str, Any]:
+    async def _process_single_post(self, url: str, image_analyzer, semaphore) -> Dict[str, Any]:
         """Process a single post with feature extraction"""
-        async with semaphore:
-            try:
-                # Download image asynchronously
-                image_data = await self._download_image(post.url)
-                if not image_data:
-                    return {'success': False, 'error': 'Failed to download image'}
-
-                # Extract features in thread pool (CPU-bound)
-                loop = asyncio.get_event_loop()
-                features = await loop.run_in_executor(
-                    self.executor,
-                    image_analyzer.extract_features_from_bytes,
-                    image_data
-                )
-
-                return {
-                    'success': True,
-                    'features': features or {}
-                }
-
-            except Exception as e:
-                return {
-                    'success': False,
-                    'error': str(e)
-                }
+        queue_depth.inc(stage='process')
+        try:
+            await semaphore.acquire()
+        finally:
+            # Also when cancelled while still queued (deadline cut-off)
+            queue_depth.dec(stage='process')
+        in_flight.inc(stage='process')
+        try:
+            # Download image asynchronously
+            image_data = await self._download_image(url)
+            if not image_data:
+                return {'success': False, 'error': 'Failed to download image'}
+            stage_items.inc(len(image_data), stage='download', unit='bytes')
+
+            # Extract features in thread pool (CPU-bound)
+            loop = asyncio.get_event_loop()
+            features = await loop.run_in_executor(
+                self.executor,
+                image_analyzer.extract_features_from_bytes,
+                image_data
+            )
+
+            return {
+                'success': True,
+                'features': features or {}
+            }
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        finally:
+            in_flight.dec(stage='process')
+            semaphore.release()
 
     async def _download_image(self, url: str) -> Optional[bytes]:
-        """Download image with connection pooling"""
+        """Download media with connection pooling, reading at most ``max_bytes_for(url)``.
+
+        Animations and videos are range-fetched: only their first bytes are
+        requested, and frames are sampled from that prefix. A still image
+        over the cap is skipped, since a truncated still would not decode.
+        """
+        if self.archive is not None and self.archive.replay:
+            with track_stage('download'):
+                return self.archive.get_media(url)
+        max_bytes = max_bytes_for(url)
+        partial_ok = url_media_type(url) != 'image'
+        headers = {'Range': f"bytes=0-{max_bytes - 1}"} if partial_ok else None
         try:
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    return await response.read()
-                return None
+            with track_stage('download'):
+                async with self.session.get(url, headers=headers) as response:
+                    data = await self._read_capped(response, max_bytes, partial_ok)
+            if self.archive is not None:
+                self.archive.put_media(url, data)
+            return data
         except Exception:
             return None
 
-    async def _bulk_insert_posts(self, posts_with_features: List[Dict], db_client) -> int:
+    @staticmethod
+    async def _read_capped(response, max_bytes: int, partial_ok: bool) -> Optional[bytes]:
+        if response.status not in (200, 206) or (response.status == 206 and not partial_ok):
+            return None
+        if not partial_ok and (response.content_length or 0) > max_bytes:
+            return None
+        # Servers may ignore Range; stop reading at the cap either way
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if partial_ok and size >= max_bytes:
+                break
+            if size > max_bytes:
+                return None
+        return b''.join(chunks)[:max_bytes]
+
+    async def _bulk_insert_posts(self, batch: PostBatch, features: Dict[int, Dict], db_client,
+                                 template_clusterer=None, title_minhasher=None) -> int:
         """Bulk insert posts to database"""
-        if not posts_with_features:
+        if not features:
             return 0
 
-        # Prepare batch data
-        batch_data = []
-        for item in posts_with_features:
-            post = item['post']
-            features = item['features']
-
-            post_data = {
-                'platform': post.platform,
-                'post_id': post.post_id,
-                'title': post.title,
-                'url': post.url,
-                'score': post.score,
-                'timestamp': post.timestamp.isoformat() if post.timestamp else None,
-                'template_hash': features.get('phash'),
-                'phash': features.get('phash'),
-                'dhash': features.get('dhash'),
-                'whash': features.get('whash'),
-                'colorhash': features.get('colorhash'),
-                'template_structure': features.get('template_structure')
-            }
-            batch_data.append(post_data)
+        # Rows are built straight from the batch columns
+        batch_data = batch.to_upsert_rows(features, template_clusterer, title_minhasher)
 
         # Execute bulk upsert in thread pool
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            self.executor,
-            db_client.bulk_upsert_posts,
-            batch_data
-        )
\ No newline at end of file
+        with track_stage('upsert'):
+            written = await loop.run_in_executor(
+                self.executor,
+                db_client.bulk_upsert_posts,
+                batch_data
+            )
+        stage_items.inc(written, stage='upsert', unit='rows')
+        return written
\ No newline at end of file
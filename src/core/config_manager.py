@@ -1,12 +1,88 @@
 import json
 import os
-from typing import Dict, Any, Optional
-from dataclasses import dataclass
+import time
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
+from dataclasses import dataclass, field
 from pathlib import Path
-import hashlib
 import threading
+from .metrics import cache_events
 
-@dataclass
+# (mtime_ns, size, inode) - changes whenever a file is rewritten or replaced
+FileStat = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class ScrapingConfig:
+    """Listing options from the ``scraping_config`` section"""
+    default_limit: int = 100
+    sort_types: Tuple[str, ...] = ('hot', 'new', 'top')
+    default_sort: str = 'hot'
+    time_filters: Tuple[str, ...] = ('hour', 'day', 'week', 'month', 'year', 'all')
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> 'ScrapingConfig':
+        config = cls(
+            default_limit=raw.get('default_limit', cls.default_limit),
+            sort_types=tuple(raw.get('sort_types', cls.sort_types)),
+            default_sort=raw.get('default_sort', cls.default_sort),
+            time_filters=tuple(raw.get('time_filters', cls.time_filters))
+        )
+        if not isinstance(config.default_limit, int) or config.default_limit <= 0:
+            raise ValueError("'scraping_config.default_limit' must be positive integer")
+        if config.default_sort not in config.sort_types:
+            raise ValueError(f"'scraping_config.default_sort' must be one of {config.sort_types}")
+        return config
+
+
+@dataclass(frozen=True)
+class ContentFilters:
+    """Post filters from the ``content_filters`` section"""
+    min_score: int = 0
+    require_media: bool = True
+    exclude_nsfw: bool = False
+    max_title_length: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> 'ContentFilters':
+        config = cls(
+            min_score=raw.get('min_score', cls.min_score),
+            require_media=raw.get('require_media', cls.require_media),
+            exclude_nsfw=raw.get('exclude_nsfw', cls.exclude_nsfw),
+            max_title_length=raw.get('max_title_length', cls.max_title_length)
+        )
+        if not isinstance(config.min_score, int):
+            raise ValueError("'content_filters.min_score' must be integer")
+        if not isinstance(config.require_media, bool) or not isinstance(config.exclude_nsfw, bool):
+            raise ValueError("'content_filters.require_media' and 'exclude_nsfw' must be boolean")
+        if config.max_title_length is not None and (
+                not isinstance(config.max_title_length, int) or config.max_title_length <= 0):
+            raise ValueError("'content_filters.max_title_length' must be positive integer")
+        return config
+
+
+@dataclass(frozen=True)
+class RetryConfig:
+    """Retry policy from the ``retry_config`` section"""
+    max_retries: int = 3
+    backoff_factor: float = 2.0
+    timeout: float = 30.0
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> 'RetryConfig':
+        config = cls(
+            max_retries=raw.get('max_retries', cls.max_retries),
+            backoff_factor=float(raw.get('backoff_factor', cls.backoff_factor)),
+            timeout=float(raw.get('timeout', cls.timeout))
+        )
+        if not isinstance(config.max_retries, int) or config.max_retries < 0:
+            raise ValueError("'retry_config.max_retries' must be non-negative integer")
+        if config.backoff_factor < 1 or config.timeout <= 0:
+            raise ValueError("'retry_config.backoff_factor' must be >= 1 and 'timeout' positive")
+        return config
+
+
+@dataclass(frozen=True)
 class PlatformConfig:
     """Platform configuration structure"""
     platform_name: str
@@ -16,53 +92,145 @@ class PlatformConfig:
     retry_attempts: int = 3
     retry_delay: float = 1.0
     timeout: int = 30
-    custom_params: Dict[str, Any] = None
+    custom_params: Dict[str, Any] = field(default_factory=dict)
+    user_agent: Optional[str] = None
+    supported_subreddits: Tuple[str, ...] = ()
+    default_sources: Tuple[str, ...] = ()
+    scraping_config: ScrapingConfig = field(default_factory=ScrapingConfig)
+    content_filters: ContentFilters = field(default_factory=ContentFilters)
+    retry_config: RetryConfig = field(default_factory=RetryConfig)
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable view of every loaded platform config; replaced wholesale on reload"""
+    platforms: Mapping[str, PlatformConfig]
+    file_stats: Mapping[str, FileStat]
+    checked_at: float
 
-    def __post_init__(self):
-        if self.custom_params is None:
-            self.custom_params = {}
 
 class ConfigManager:
-    """Thread-safe configuration manager with caching and validation"""
+    """Configuration manager with lock-free reads and stat-based reloads.
 
-    def __init__(self, config_dir: str = "config/platforms"):
+    Readers take the current ``ConfigSnapshot`` reference and never block.
+    At most every ``check_interval`` seconds a reader stats the config files
+    (mtime, size and inode only; nothing is read or hashed unless they
+    changed) and rebuilds the snapshot under a lock. With ``start_watcher``
+    a background thread does those checks and pushes reloads instead, so
+    reads don't touch the filesystem at all.
+    """
+
+    def __init__(self, config_dir: str = "config/platforms", check_interval: float = 1.0):
         self.config_dir = Path(config_dir)
-        self._cache: Dict[str, PlatformConfig] = {}
-        self._cache_hashes: Dict[str, str] = {}
-        self._lock = threading.RLock()
+        self.check_interval = check_interval
+        self._snapshot = ConfigSnapshot(MappingProxyType({}), MappingProxyType({}), float('-inf'))
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watcher = threading.Event()
+        # Hits are the hot path, so they are counted per thread without a lock
+        self._hits = cache_events.per_thread(cache='platform_config', result='hit')
 
-        # Ensure config directory exists
-        self.config_dir.mkdir(parents=True, exist_ok=True)
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """Current snapshot, refreshed first if it is due for a stat check"""
+        snapshot = self._snapshot
+        if self._watcher is None and time.monotonic() - snapshot.checked_at >= self.check_interval:
+            snapshot = self._refresh()
+        return snapshot
 
     def get_platform_config(self, platform_name: str) -> PlatformConfig:
-        """Get platform configuration with caching"""
+        """Get platform configuration from the current snapshot"""
+        config = self.snapshot.platforms.get(platform_name)
+        if config is not None:
+            self._hits.inc()
+            return config
+
+        config_path = self.config_dir / f"{platform_name}.json"
+        if config_path.exists():
+            # Present but invalid and never loaded successfully
+            return self._create_default_config(platform_name, save=False)
+
+        default_config = self._create_default_config(platform_name)
+        self._refresh()
+        return default_config
+
+    def get_all_enabled_platforms(self) -> list[str]:
+        """Get list of all enabled platforms"""
+        return sorted(name for name, config in self.snapshot.platforms.items() if config.enabled)
+
+    def reload_config(self, platform_name: str) -> PlatformConfig:
+        """Force reload configuration from file"""
+        self._refresh(force={platform_name})
+        return self.get_platform_config(platform_name)
+
+    def start_watcher(self, interval: float = 1.0):
+        """Watch the config directory in a daemon thread and push reloads into the snapshot.
+
+        Polls file stats, which works everywhere without an inotify dependency.
+        """
+        if self._watcher is not None:
+            return
+        self._refresh()
+        self._stop_watcher.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name='memedoc-config-watcher', daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self):
+        if self._watcher is None:
+            return
+        self._stop_watcher.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def _watch(self, interval: float):
+        while not self._stop_watcher.wait(interval):
+            self._refresh()
+
+    def _scan(self) -> Dict[str, FileStat]:
+        stats = {}
+        try:
+            entries = os.scandir(self.config_dir)
+        except FileNotFoundError:
+            return stats
+        with entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and entry.is_file():
+                    st = entry.stat()
+                    stats[entry.name[:-5]] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return stats
+
+    def _refresh(self, force: frozenset = frozenset()) -> ConfigSnapshot:
+        """Re-stat config files and swap in a new snapshot if anything changed"""
         with self._lock:
-            config_path = self.config_dir / f"{platform_name}.json"
+            current = self._snapshot
+            stats = self._scan()
+            platforms = dict(current.platforms)
+            changed = False
+
+            for name in set(platforms) - set(stats):
+                del platforms[name]
+                changed = True
+
+            for name, file_stat in stats.items():
+                if current.file_stats.get(name) == file_stat and name not in force:
+                    continue
+                changed = True
+                cache_events.inc(cache='platform_config', result='miss')
+                try:
+                    platforms[name] = self._load_and_validate_config(self.config_dir / f"{name}.json")
+                except Exception:
+                    # Keep serving the last good version of a file that fails validation
+                    pass
 
-            # Check if file exists
-            if not config_path.exists():
-                return self._create_default_config(platform_name)
-
-            # Calculate file hash for cache invalidation
-            current_hash = self._get_file_hash(config_path)
-
-            # Return cached config if valid
-            if (platform_name in self._cache and
-                platform_name in self._cache_hashes and
-                self._cache_hashes[platform_name] == current_hash):
-                return self._cache[platform_name]
-
-            # Load and validate config
-            try:
-                config = self._load_and_validate_config(config_path)
-                self._cache[platform_name] = config
-                self._cache_hashes[platform_name] = current_hash
-                return config
-            except Exception as e:
-                # Return default config on error
-                default_config = self._create_default_config(platform_name)
-                self._cache[platform_name] = default_config
-                return default_config
+            snapshot = ConfigSnapshot(
+                MappingProxyType(platforms) if changed else current.platforms,
+                MappingProxyType(stats),
+                time.monotonic()
+            )
+            self._snapshot = snapshot
+            return snapshot
 
     def _load_and_validate_config(self, config_path: Path) -> PlatformConfig:
         """Load and validate configuration file"""
@@ -71,9 +239,9 @@ class ConfigManager:
 
         # Validate required fields
         required_fields = ['platform_name', 'enabled', 'rate_limit', 'daily_limit']
-        for field in required_fields:
-            if field not in raw_config:
-                raise ValueError(f"Missing required field: {field}")
+        for field_name in required_fields:
+            if field_name not in raw_config:
+                raise ValueError(f"Missing required field: {field_name}")
 
         # Validate types and ranges
         if not isinstance(raw_config['enabled'], bool):
@@ -93,10 +261,16 @@ class ConfigManager:
             retry_attempts=raw_config.get('retry_attempts', 3),
             retry_delay=raw_config.get('retry_delay', 1.0),
             timeout=raw_config.get('timeout', 30),
-            custom_params=raw_config.get('custom_params', {})
+            custom_params=raw_config.get('custom_params', {}),
+            user_agent=raw_config.get('user_agent'),
+            supported_subreddits=tuple(raw_config.get('supported_subreddits', ())),
+            default_sources=tuple(raw_config.get('default_sources', ())),
+            scraping_config=ScrapingConfig.from_dict(raw_config.get('scraping_config', {})),
+            content_filters=ContentFilters.from_dict(raw_config.get('content_filters', {})),
+            retry_config=RetryConfig.from_dict(raw_config.get('retry_config', {}))
         )
 
-    def _create_default_config(self, platform_name: str) -> PlatformConfig:
+    def _create_default_config(self, platform_name: str, save: bool = True) -> PlatformConfig:
         """Create default configuration for platform"""
         default_config = PlatformConfig(
             platform_name=platform_name,
@@ -109,13 +283,16 @@ class ConfigManager:
         )
 
         # Save default config to file
-        config_path = self.config_dir / f"{platform_name}.json"
-        self._save_config(default_config, config_path)
+        if save:
+            config_path = self.config_dir / f"{platform_name}.json"
+            self._save_config(default_config, config_path)
 
         return default_config
 
     def _save_config(self, config: PlatformConfig, config_path: Path):
         """Save configuration to file"""
+        # Created on first write rather than at import time
+        config_path.parent.mkdir(parents=True, exist_ok=True)
         config_dict = {
             'platform_name': config.platform_name,
             'enabled': config.enabled,
@@ -130,33 +307,5 @@ class ConfigManager:
         with open(config_path, 'w') as f:
             json.dump(config_dict, f, indent=2)
 
-    def _get_file_hash(self, file_path: Path) -> str:
-        """Calculate MD5 hash of file for cache invalidation"""
-        hash_md5 = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-
-    def reload_config(self, platform_name: str) -> PlatformConfig:
-        """Force reload configuration from file"""
-        with self._lock:
-            # Clear cache for this platform
-            self._cache.pop(platform_name, None)
-            self._cache_hashes.pop(platform_name, None)
-            return self.get_platform_config(platform_name)
-
-    def get_all_enabled_platforms(self) -> list[str]:
-        """Get list of all enabled platforms"""
-        enabled_platforms = []
-
-        for config_file in self.config_dir.glob("*.json"):
-            platform_name = config_file.stem
-            config = self.get_platform_config(platform_name)
-            if config.enabled:
-                enabled_platforms.append(platform_name)
-
-        return enabled_platforms
-
 # Global config manager instance
-config_manager = ConfigManager()
\ No newline at end of file
+config_manager = ConfigManager()
@@ -0,0 +1,77 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config_manager import ContentFilters
+from .metrics import filter_rejections
+
+MEDIA_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4', '.webm')
+MEDIA_DOMAINS = ('i.redd.it', 'v.redd.it', 'imgur.com')
+MEDIA_POST_HINTS = ('image', 'hosted:video', 'rich:video')
+
+# check(score, title, nsfw, url, post_hint) -> True when the post is rejected
+Check = Callable[[int, str, bool, str, Optional[str]], bool]
+
+
+def is_media_url(url: str, post_hint: Optional[str] = None) -> bool:
+    """Whether a post links to an image or video we can analyse"""
+    url = (url or '').lower()
+    if url.endswith(MEDIA_EXTENSIONS):
+        return True
+    if any(domain in url for domain in MEDIA_DOMAINS):
+        return True
+    return post_hint in MEDIA_POST_HINTS
+
+
+class ContentFilter:
+    """``content_filters`` compiled down to the checks that are switched on.
+
+    Checks run cheapest first and stop at the first rejection, which is
+    counted per stage and filter in ``memedoc_filter_rejections``.
+    """
+
+    def __init__(self, filters: ContentFilters):
+        self.filters = filters
+        checks: List[Tuple[str, Check]] = []
+
+        if filters.exclude_nsfw:
+            checks.append(('exclude_nsfw', lambda score, title, nsfw, url, hint: nsfw))
+        if filters.min_score > 0:
+            min_score = filters.min_score
+            checks.append(('min_score', lambda score, title, nsfw, url, hint: score < min_score))
+        if filters.max_title_length:
+            max_length = filters.max_title_length
+            checks.append(('max_title_length', lambda score, title, nsfw, url, hint: len(title or '') > max_length))
+        if filters.require_media:
+            checks.append(('require_media', lambda score, title, nsfw, url, hint: not is_media_url(url, hint)))
+
+        self.checks = tuple(checks)
+
+    @classmethod
+    def from_config(cls, raw: Dict[str, Any]) -> 'ContentFilter':
+        """Compile the raw ``content_filters`` section of a platform config"""
+        return cls(ContentFilters.from_dict(raw or {}))
+
+    def rejection(self, score: int, title: str, nsfw: bool, url: str,
+                  post_hint: Optional[str] = None) -> Optional[str]:
+        """Name of the first filter rejecting the post, or None"""
+        for name, check in self.checks:
+            if check(score, title, nsfw, url, post_hint):
+                return name
+        return None
+
+    def allows(self, score: int, title: str, nsfw: bool, url: str,
+               post_hint: Optional[str] = None, stage: str = 'scrape') -> bool:
+        rejected_by = self.rejection(score, title, nsfw, url, post_hint)
+        if rejected_by:
+            filter_rejections.inc(stage=stage, filter=rejected_by)
+            return False
+        return True
+
+    def accepted_indices(self, batch, stage: str = 'download') -> List[int]:
+        """Indices of the posts in a PostBatch that pass every filter"""
+        if not self.checks:
+            return list(range(len(batch)))
+        return [
+            i for i in range(len(batch))
+            if self.allows(batch.score[i], batch.title[i], bool(batch.nsfw[i]), batch.url[i],
+                           batch.post_hint[i], stage=stage)
+        ]
@@ -0,0 +1,97 @@
+import asyncio
+import signal
+import time
+from typing import Awaitable, Callable, Optional
+
+from .logging_config import MemeDocLogger
+
+
+class CollectorDaemon:
+    """Runs collection cycles on a fixed cadence inside one long-lived process.
+
+    ``cycle`` is called with the daemon's stop event and should stop taking
+    new work once it is set. SIGTERM/SIGINT set that event; the running
+    cycle then has ``drain_timeout`` seconds to finish its in-flight batch
+    before it is cancelled. ``finalize`` (rollups, export) runs in a thread
+    every ``finalize_interval`` seconds and once more on shutdown.
+    """
+
+    def __init__(self, cycle: Callable[[asyncio.Event], Awaitable], interval: float,
+                 drain_timeout: float = 120, finalize: Optional[Callable[[], None]] = None,
+                 finalize_interval: float = 6 * 3600):
+        self.cycle = cycle
+        self.interval = interval
+        self.drain_timeout = drain_timeout
+        self.finalize = finalize
+        self.finalize_interval = finalize_interval
+        self.logger = MemeDocLogger('daemon')
+        self.stopping: Optional[asyncio.Event] = None
+        self.cycles = 0
+
+    def stop(self):
+        if self.stopping and not self.stopping.is_set():
+            self.logger.logger.info("Stop requested, draining in-flight work")
+            self.stopping.set()
+
+    def _install_signal_handlers(self, loop):
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):  # Windows, or not the main thread
+                pass
+
+    async def _run_cycle(self) -> bool:
+        """One cycle; False when it had to be cancelled during the drain"""
+        task = asyncio.ensure_future(self.cycle(self.stopping))
+        stop_wait = asyncio.ensure_future(self.stopping.wait())
+        try:
+            await asyncio.wait({task, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+            if not task.done():
+                # Stop arrived mid-cycle: let the current batch land
+                await asyncio.wait({task}, timeout=self.drain_timeout)
+                if not task.done():
+                    self.logger.logger.warning(f"Cycle still running after {self.drain_timeout}s drain, cancelling")
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    return False
+            if task.exception():
+                self.logger.log_error(task.exception(), "Collection cycle")
+            return True
+        finally:
+            stop_wait.cancel()
+
+    async def _finalize(self):
+        if self.finalize:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.finalize)
+
+    async def run(self, max_cycles: Optional[int] = None):
+        self.stopping = asyncio.Event()
+        self._install_signal_handlers(asyncio.get_running_loop())
+        last_finalize = time.monotonic()
+        finalized_cycles = 0
+
+        while not self.stopping.is_set():
+            started = time.monotonic()
+            await self._run_cycle()
+            self.cycles += 1
+            self.logger.logger.info(f"Cycle {self.cycles} finished in {time.monotonic() - started:.1f}s")
+
+            if self.stopping.is_set() or (max_cycles and self.cycles >= max_cycles):
+                break
+            if time.monotonic() - last_finalize >= self.finalize_interval:
+                await self._finalize()
+                last_finalize = time.monotonic()
+                finalized_cycles = self.cycles
+
+            # Fixed cadence from cycle start; an overrunning cycle is followed immediately
+            delay = self.interval - (time.monotonic() - started)
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+        if self.cycles > finalized_cycles:
+            await self._finalize()
+        self.logger.logger.info(f"Daemon stopped after {self.cycles} cycles")
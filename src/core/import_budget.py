@@ -0,0 +1,63 @@
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Modules that must only be imported by the commands that use them
+HEAVY_MODULES = ('cv2', 'imagehash', 'praw', 'supabase', 'aiohttp', 'numpy', 'PIL', 'requests', 'asyncio')
+DEFAULT_BUDGET_MS = 50.0
+
+_IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)')
+
+
+def measure_import(module: str = 'main') -> Tuple[float, Dict[str, float]]:
+    """Import ``module`` in a fresh interpreter; return (total ms, cumulative ms per imported module)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True
+    )
+
+    # Children are printed before their parent; keep only the subtree under ``module``
+    subtree: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        name, ms = match.group(4), int(match.group(2)) / 1000
+        subtree[name] = ms
+        if len(match.group(3)) == 1:  # top level
+            if name == module:
+                return ms, subtree
+            subtree = {}
+    return 0.0, subtree
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the CLI import time against a budget")
+    parser.add_argument('--module', default='main')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    # Best of three: the first run also pays for cold .pyc and disk caches
+    runs = [measure_import(args.module) for _ in range(3)]
+    total, cumulative = min(runs, key=lambda run: run[0])
+
+    print(f"import {args.module}: {total:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, ms in sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    heavy = sorted(name for name in cumulative if name.split('.')[0] in HEAVY_MODULES)
+    if heavy:
+        print(f"Heavy modules imported eagerly: {', '.join(heavy)}")
+        failed = True
+    if total > args.budget_ms:
+        print(f"Import time {total:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,66 +1,157 @@
+import atexit
+import json
 import logging
 import logging.handlers
 import os
+import queue
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 
+# Fields every LogRecord carries; anything else came in through ``extra``
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+DEFAULT_LOG_FILE = os.path.join('logs', 'memedoc.log')
+
+_log_queue: Optional[queue.SimpleQueue] = None
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with typed fields from ``extra``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'func': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock ``prepare`` renders the message in the caller (i.e. on the
+    event loop); the queue here is in-process, so the record can be passed
+    through untouched and formatted only where it is written.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _stop_queue_listener():
+    global _queue_listener
+    if _queue_listener:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
 class MemeDocLogger:
-    """Structured logging for MemeDoc with performance tracking"""
+    """Structured logging for MemeDoc with performance tracking.
 
-    def __init__(self, name: str = 'memedoc', log_level: str = 'INFO'):
+    ``MEMEDOC_LOG_MODE=json`` switches to JSON lines written by a
+    QueueListener thread, so logging calls never block on disk I/O.
+    """
+
+    def __init__(self, name: str = 'memedoc', log_level: str = 'INFO', mode: Optional[str] = None):
         self.logger = logging.getLogger(name)
         self.logger.setLevel(getattr(logging, log_level.upper()))
+        self.mode = (mode or os.getenv('MEMEDOC_LOG_MODE', 'text')).lower()
 
         # Prevent duplicate handlers
         if not self.logger.handlers:
-            self._setup_handlers()
-
-    def _setup_handlers(self):
-        """Setup console and file handlers with structured formatting"""
-        formatter = logging.Formatter(
-            '%(asctime)s | %(levelname)-8s | %(name)s | %(funcName)s:%(lineno)d | %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+            if self.mode == 'json':
+                self._setup_queue_handler()
+            else:
+                self._setup_handlers()
 
+    def _create_handlers(self, formatter: logging.Formatter):
+        """Console and rotating file handlers sharing one formatter"""
         # Console handler
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
         console_handler.setLevel(logging.INFO)
 
-        # File handler with rotation
-        os.makedirs('logs', exist_ok=True)
+        # File handler with rotation; one file per process when several run at once
+        log_file = os.getenv('MEMEDOC_LOG_FILE', DEFAULT_LOG_FILE)
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
         file_handler = logging.handlers.RotatingFileHandler(
-            'logs/memedoc.log',
+            log_file,
             maxBytes=10*1024*1024,  # 10MB
             backupCount=5
         )
         file_handler.setFormatter(formatter)
         file_handler.setLevel(logging.DEBUG)
 
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
+        return console_handler, file_handler
+
+    def _setup_handlers(self):
+        """Setup console and file handlers with structured formatting"""
+        formatter = logging.Formatter(
+            '%(asctime)s | %(levelname)-8s | %(name)s | %(funcName)s:%(lineno)d | %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+
+        for handler in self._create_handlers(formatter):
+            self.logger.addHandler(handler)
+
+    def _setup_queue_handler(self):
+        """Route records through a process-wide queue drained by a listener thread"""
+        global _log_queue, _queue_listener
+        if _queue_listener is None:
+            _log_queue = queue.SimpleQueue()
+            _queue_listener = logging.handlers.QueueListener(
+                _log_queue, *self._create_handlers(JsonFormatter()), respect_handler_level=True
+            )
+            _queue_listener.start()
+            atexit.register(_stop_queue_listener)
+
+        self.logger.addHandler(LazyQueueHandler(_log_queue))
+        self.logger.propagate = False
 
     def log_scraping_start(self, platform: str, limit: int):
         """Log scraping session start"""
-        self.logger.info(f"Starting scraping session | Platform: {platform} | Limit: {limit}")
+        self.logger.info(
+            "Starting scraping session | Platform: %s | Limit: %s", platform, limit,
+            extra={'event': 'scraping_start', 'platform': platform, 'limit': limit}
+        )
 
     def log_scraping_result(self, platform: str, total: int, new: int, processing_time: float):
         """Log scraping results with performance metrics"""
         rate = total / processing_time if processing_time > 0 else 0
         self.logger.info(
-            f"Scraping completed | Platform: {platform} | "
-            f"Total: {total} | New: {new} | "
-            f"Time: {processing_time:.2f}s | Rate: {rate:.1f} posts/s"
+            "Scraping completed | Platform: %s | Total: %d | New: %d | Time: %.2fs | Rate: %.1f posts/s",
+            platform, total, new, processing_time, rate,
+            extra={'event': 'scraping_result', 'platform': platform, 'total': total, 'new': new,
+                   'processing_time_s': processing_time, 'posts_per_second': rate}
         )
 
     def log_image_processing(self, url: str, success: bool, processing_time: Optional[float] = None):
         """Log image processing results"""
         if success:
-            time_info = f" | Time: {processing_time:.2f}s" if processing_time else ""
-            self.logger.debug(f"Image processed successfully | URL: {url}{time_info}")
+            # Called per image: skip all work unless DEBUG is actually enabled
+            if not self.logger.isEnabledFor(logging.DEBUG):
+                return
+            self.logger.debug(
+                "Image processed successfully | URL: %s%s", url,
+                f" | Time: {processing_time:.2f}s" if processing_time else "",
+                extra={'event': 'image_processed', 'url': url, 'processing_time_s': processing_time}
+            )
         else:
-            self.logger.warning(f"Image processing failed | URL: {url}")
+            self.logger.warning(
+                "Image processing failed | URL: %s", url,
+                extra={'event': 'image_failed', 'url': url}
+            )
 
     def log_database_operation(self, operation: str, count: int, success: bool, execution_time: float):
         """Log database operations with performance"""
@@ -68,19 +159,25 @@ class MemeDocLogger:
         status = "SUCCESS" if success else "FAILED"
         self.logger.log(
             level,
-            f"Database {operation} | Count: {count} | "
-            f"Status: {status} | Time: {execution_time:.2f}s"
+            "Database %s | Count: %d | Status: %s | Time: %.2fs",
+            operation, count, status, execution_time,
+            extra={'event': 'database_operation', 'operation': operation, 'count': count,
+                   'success': success, 'execution_time_s': execution_time}
         )
 
     def log_error(self, error: Exception, context: str = ""):
         """Log errors with context"""
-        context_info = f" | Context: {context}" if context else ""
-        self.logger.error(f"Error occurred | {type(error).__name__}: {str(error)}{context_info}")
+        self.logger.error(
+            "Error occurred | %s: %s%s", type(error).__name__, error,
+            f" | Context: {context}" if context else "",
+            extra={'event': 'error', 'error_type': type(error).__name__, 'context': context}
+        )
 
     def log_performance_warning(self, metric: str, value: float, threshold: float):
         """Log performance warnings"""
         self.logger.warning(
-            f"Performance warning | {metric}: {value:.2f} | Threshold: {threshold:.2f}"
+            "Performance warning | %s: %.2f | Threshold: %.2f", metric, value, threshold,
+            extra={'event': 'performance_warning', 'metric': metric, 'value': value, 'threshold': threshold}
         )
 
 # Global logger instance
@@ -0,0 +1,373 @@
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional, Tuple
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Stage latencies span sub-millisecond hashes to multi-second uploads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class for labelled metrics"""
+
+    metric_type = 'unknown'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# TYPE {self.name} {self.metric_type}", f"# HELP {self.name} {self.documentation}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class PerThreadCount:
+    """Lock-free increments for hot paths: each thread bumps its own cell.
+
+    Only the owning thread writes a cell, so ``inc`` needs no lock (the lock
+    is taken once per thread, to register its cell); ``value`` sums the
+    cells and may trail increments still in progress.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._cells: List[List[int]] = []
+        self._lock = threading.Lock()
+
+    def inc(self):
+        cell = getattr(self._local, 'cell', None)
+        if cell is None:
+            cell = self._local.cell = [0]
+            with self._lock:
+                self._cells.append(cell)
+        cell[0] += 1
+
+    def value(self) -> int:
+        with self._lock:
+            cells = list(self._cells)
+        return sum(cell[0] for cell in cells)
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._per_thread: Dict[LabelValues, PerThreadCount] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def per_thread(self, **labels) -> PerThreadCount:
+        """Lock-free counter for one label set, added into this counter's values"""
+        key = self._key(labels)
+        with self._lock:
+            return self._per_thread.setdefault(key, PerThreadCount())
+
+    def get(self, **labels) -> float:
+        key = self._key(labels)
+        count = self._per_thread.get(key)
+        return self._values.get(key, 0) + (count.value() if count else 0)
+
+    def _items(self) -> List[Tuple[LabelValues, float]]:
+        with self._lock:
+            values = dict(self._values)
+            per_thread = list(self._per_thread.items())
+        for key, count in per_thread:
+            values[key] = values.get(key, 0) + count.value()
+        return sorted(values.items())
+
+    def snapshot(self) -> List[Tuple[Dict[str, str], float]]:
+        """(labels, value) pairs for every label set recorded so far"""
+        return [(dict(zip(self.labelnames, key)), value) for key, value in self._items()]
+
+    def _samples(self) -> List[str]:
+        items = self._items()
+        return [
+            f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down (queue depth, in-flight work)"""
+
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram.
+
+    A bounded reservoir of raw observations per label set backs exact-ish
+    quantiles for run reports without growing with run length.
+    """
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_samples: int = 1024):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.max_samples = max_samples
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+        self._samples_seen: Dict[LabelValues, int] = {}
+        self._reservoirs: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+            seen = self._samples_seen.get(key, 0) + 1
+            self._samples_seen[key] = seen
+            reservoir = self._reservoirs.setdefault(key, [])
+            if len(reservoir) < self.max_samples:
+                reservoir.append(value)
+            else:
+                slot = random.randrange(seen)
+                if slot < self.max_samples:
+                    reservoir[slot] = value
+
+    def label_sets(self) -> List[Dict[str, str]]:
+        with self._lock:
+            keys = sorted(self._counts)
+        return [dict(zip(self.labelnames, key)) for key in keys]
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def sum(self, **labels) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Quantile estimate from the sample reservoir (None if unobserved)"""
+        with self._lock:
+            samples = sorted(self._reservoirs.get(self._key(labels), ()))
+        if not samples:
+            return None
+        index = min(int(q * len(samples)), len(samples) - 1)
+        return samples[index]
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics rendered in OpenMetrics text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, tuple(labelnames), **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.metric_type}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Render every metric in OpenMetrics text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        """Atomically write metrics for a textfile collector"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Expose /metrics on a local HTTP endpoint from a daemon thread"""
+        if self._server:
+            return self._server
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def shutdown(self):
+        if self._server:
+            self._server.shutdown()
+            self._server = None
+
+
+# Global metrics registry and pipeline metrics
+metrics = MetricsRegistry()
+
+stage_duration = metrics.histogram(
+    'memedoc_stage_duration_seconds', 'Latency of each pipeline stage', ('stage',)
+)
+stage_events = metrics.counter(
+    'memedoc_stage_events', 'Pipeline stage executions by outcome', ('stage', 'outcome')
+)
+stage_items = metrics.counter(
+    'memedoc_stage_items', 'Items (posts, rows, bytes) handled per stage', ('stage', 'unit')
+)
+queue_depth = metrics.gauge(
+    'memedoc_queue_depth', 'Work items waiting for a pipeline slot', ('stage',)
+)
+in_flight = metrics.gauge(
+    'memedoc_in_flight', 'Work items currently being processed', ('stage',)
+)
+cache_events = metrics.counter(
+    'memedoc_cache_events', 'Cache lookups by result', ('cache', 'result')
+)
+credential_events = metrics.counter(
+    'memedoc_credential_events', 'API credential throttles, revocations and failovers', ('credential', 'event')
+)
+shed_posts = metrics.counter(
+    'memedoc_shed_posts', 'Accepted posts left unprocessed, e.g. when the run time budget ran out', ('reason',)
+)
+filter_rejections = metrics.counter(
+    'memedoc_filter_rejections', 'Posts dropped by content filters before any media work', ('stage', 'filter')
+)
+
+
+# Extra per-stage context managers (e.g. the profiler); empty in normal runs
+stage_hooks: List[Callable[[str], ContextManager]] = []
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Time a pipeline stage and count it as success or error"""
+    with ExitStack() as hooks:
+        for hook in stage_hooks:
+            hooks.enter_context(hook(stage))
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            stage_events.inc(stage=stage, outcome='error')
+            raise
+        else:
+            stage_events.inc(stage=stage, outcome='success')
+        finally:
+            stage_duration.observe(time.perf_counter() - start, stage=stage)
@@ -0,0 +1,155 @@
+import heapq
+import itertools
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+PAGE_SIZE = 100  # posts per Reddit listing request
+
+
+@dataclass
+class SourceState:
+    """Arrival estimate and polling history of one source"""
+    source: str
+    arrival_rate: float              # new posts per hour (EWMA)
+    last_polled: Optional[float] = None
+    watermark: Optional[float] = None  # newest post timestamp seen so far
+    due: float = 0.0
+    polls: int = 0
+    requests: int = 0
+    new_posts: int = 0
+
+    @property
+    def yield_per_request(self) -> float:
+        return self.new_posts / self.requests if self.requests else 0.0
+
+
+class PollScheduler:
+    """Chooses which sources to poll next, and how deep, from their post arrival rates.
+
+    Each source is due once enough new posts should have arrived to fill a
+    listing page, clamped to [min_interval, max_interval], so a fast mover
+    like r/memes is polled every few minutes while a niche subreddit is
+    visited a few times a day. Due sources come off a heap in due order
+    until the request budget is spent; whatever does not fit stays at the
+    front for the next plan. Rates start from stored hourly rollups and are
+    updated from the posts each poll actually returns.
+    """
+
+    def __init__(self, sources: Iterable[str], max_limit: int = PAGE_SIZE, min_limit: int = 25,
+                 min_interval: float = 120, max_interval: float = 6 * 3600,
+                 default_rate: float = 5.0, smoothing: float = 0.3):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_rate = default_rate
+        self.smoothing = smoothing
+        self.states: Dict[str, SourceState] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self.sync_sources(sources)
+
+    def sync_sources(self, sources: Iterable[str]):
+        """Track exactly ``sources``; new ones are due immediately"""
+        wanted = list(dict.fromkeys(sources))
+        for source in set(self.states) - set(wanted):
+            del self.states[source]  # its heap entries are skipped lazily
+        for source in wanted:
+            if source not in self.states:
+                self.states[source] = SourceState(source, self.default_rate)
+                self._push(self.states[source])
+
+    def seed(self, rollup_rows: Sequence[dict], hours: float):
+        """Initial arrival rates from ``subreddit_hourly_stats`` rows covering ``hours``"""
+        counts: Dict[str, int] = {}
+        for row in rollup_rows:
+            counts[row['subreddit']] = counts.get(row['subreddit'], 0) + (row.get('post_count') or 0)
+        for source, state in self.states.items():
+            if source in counts and state.polls == 0:
+                state.arrival_rate = max(counts[source] / hours, 0.01)
+
+    def _push(self, state: SourceState):
+        heapq.heappush(self._heap, (state.due, next(self._counter), state.source))
+
+    def _interval(self, state: SourceState) -> float:
+        """Seconds until a page's worth of new posts should be waiting"""
+        seconds = self.max_limit / max(state.arrival_rate, 1e-6) * 3600
+        return min(max(seconds, self.min_interval), self.max_interval)
+
+    def limit_for(self, state: SourceState, now: float) -> int:
+        """Listing depth covering the posts expected since the last poll, with headroom"""
+        if state.last_polled is None:
+            return self.max_limit
+        expected = state.arrival_rate * (now - state.last_polled) / 3600
+        return min(max(math.ceil(expected * 1.25) + 1, self.min_limit), self.max_limit)
+
+    def plan(self, now: float, request_budget: int) -> List[Tuple[str, int]]:
+        """Due sources in priority order with their listing limits, within ``request_budget``"""
+        planned = []
+        deferred = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            state = self.states.get(entry[2])
+            if state is None or state.due != entry[0]:
+                continue  # removed or rescheduled since it was pushed
+            limit = self.limit_for(state, now)
+            cost = math.ceil(limit / PAGE_SIZE)
+            if cost > request_budget:
+                deferred.append(entry)
+                break
+            request_budget -= cost
+            planned.append((state.source, limit))
+            deferred.append(entry)  # stays queued until record() reschedules it
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+        return planned
+
+    def record(self, source: str, timestamps: Iterable[float], limit: int, now: float) -> int:
+        """Update a source from the post timestamps one poll returned; returns the new-post count"""
+        state = self.states.get(source)
+        if state is None:
+            return 0
+        stamps = [ts for ts in timestamps if not math.isnan(ts)]
+        if state.watermark is None:
+            new = len(stamps)
+        else:
+            new = sum(1 for ts in stamps if ts > state.watermark)
+
+        if state.last_polled is None:
+            # First poll: the listing's time span gives a lower bound on the rate
+            if len(stamps) > 1 and max(stamps) > min(stamps):
+                spread_rate = len(stamps) / ((max(stamps) - min(stamps)) / 3600)
+                state.arrival_rate = max(state.arrival_rate, spread_rate)
+        else:
+            hours = max(now - state.last_polled, 1.0) / 3600
+            observed = new / hours
+            blended = (1 - self.smoothing) * state.arrival_rate + self.smoothing * observed
+            # Every returned post is newer than the watermark: the listing did not reach
+            # back to the previous poll, so the observed rate is only a lower bound
+            if stamps and state.watermark is not None and min(stamps) > state.watermark:
+                blended = max(blended, observed * 2)
+            state.arrival_rate = max(blended, 0.01)
+
+        if stamps:
+            state.watermark = max(stamps + ([state.watermark] if state.watermark is not None else []))
+        state.last_polled = now
+        state.polls += 1
+        state.requests += math.ceil(limit / PAGE_SIZE)
+        state.new_posts += new
+        state.due = now + self._interval(state)
+        self._push(state)
+        return new
+
+    def snapshot(self) -> List[dict]:
+        """Per-source estimates, fastest first"""
+        return [
+            {
+                'source': state.source,
+                'arrival_rate': round(state.arrival_rate, 2),
+                'polls': state.polls,
+                'yield_per_request': round(state.yield_per_request, 2),
+                'interval_s': round(state.due - state.last_polled, 1) if state.last_polled else 0.0
+            }
+            for state in sorted(self.states.values(), key=lambda s: s.arrival_rate, reverse=True)
+        ]
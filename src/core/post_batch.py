@@ -0,0 +1,139 @@
+import math
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, Iterable, List, Optional, Sequence
+
+from ..scrapers.base_scraper import ScrapedPost
+
+# Feature keys copied from ImageTemplateDetector output into each row
+FEATURE_COLUMNS = ('phash', 'dhash', 'whash', 'colorhash', 'template_structure', 'media_type', 'frame_phashes')
+
+NO_COMMENTS = -1  # sentinel for a missing num_comments in the int64 column
+
+# Expected-value ordering: a post's value halves every RECENCY_HALF_LIFE_H hours
+# of age, and posts already stored are only worth a score refresh
+RECENCY_HALF_LIFE_H = 12.0
+KNOWN_POST_WEIGHT = 0.2
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class PostBatch:
+    """Columnar batch of scraped posts holding only the columns the pipeline uses.
+
+    Numbers live in typed arrays (8 bytes per value, no per-post int/float
+    objects) and low-cardinality strings such as platform and subreddit are
+    interned, so a sweep of several hundred thousand posts costs a handful
+    of flat buffers instead of one object graph per post. ``to_upsert_rows``
+    builds the PostgREST payload directly from the columns.
+    """
+
+    __slots__ = ('platform', 'post_id', 'title', 'url', 'score', 'timestamp', 'timestamp_utc',
+                 'subreddit', 'num_comments', 'upvote_ratio', 'post_hint', 'nsfw',
+                 'media_url')
+
+    def __init__(self):
+        self.platform: List[str] = []
+        self.post_id: List[str] = []
+        self.title: List[str] = []
+        self.url: List[str] = []
+        self.score = array('q')
+        self.timestamp = array('d')       # epoch seconds, NaN when unknown
+        self.timestamp_utc = array('b')   # 1 when the source datetime was tz-aware
+        self.subreddit: List[Optional[str]] = []
+        self.num_comments = array('q')
+        self.upvote_ratio = array('d')    # NaN when unknown
+        self.post_hint: List[Optional[str]] = []
+        self.nsfw = array('b')            # only used by content filters, not persisted
+        self.media_url: List[Optional[str]] = []   # direct media file when ``url`` is a page, not persisted
+
+    @classmethod
+    def from_posts(cls, posts: Iterable[ScrapedPost]) -> 'PostBatch':
+        batch = cls()
+        for post in posts:
+            batch.append(post)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.post_id)
+
+    def append(self, post: ScrapedPost):
+        """Add one post; tags, author and the rest of metadata are not kept"""
+        metadata = post.metadata or {}
+        timestamp = post.timestamp
+
+        self.platform.append(_intern(post.platform))
+        self.post_id.append(post.post_id)
+        self.title.append(post.title)
+        self.url.append(post.url)
+        self.score.append(int(post.score or 0))
+        self.timestamp.append(timestamp.timestamp() if timestamp else math.nan)
+        self.timestamp_utc.append(1 if timestamp and timestamp.tzinfo else 0)
+        self.subreddit.append(_intern(metadata.get('subreddit')))
+        num_comments = metadata.get('num_comments')
+        self.num_comments.append(NO_COMMENTS if num_comments is None else int(num_comments))
+        upvote_ratio = metadata.get('upvote_ratio')
+        self.upvote_ratio.append(math.nan if upvote_ratio is None else float(upvote_ratio))
+        self.post_hint.append(_intern(metadata.get('post_hint')))
+        self.nsfw.append(1 if metadata.get('over_18') else 0)
+        self.media_url.append(metadata.get('media_url'))
+
+    def priority(self, i: int, now: float, known_post_ids: Collection[str] = ()) -> float:
+        """Expected value of processing post ``i``: score, decayed by age, discounted if stored"""
+        value = math.log1p(max(self.score[i], 0)) + 1.0
+        ts = self.timestamp[i]
+        if not math.isnan(ts):
+            value *= 0.5 ** (max(now - ts, 0.0) / 3600 / RECENCY_HALF_LIFE_H)
+        if self.post_id[i] in known_post_ids:
+            value *= KNOWN_POST_WEIGHT
+        return value
+
+    def priority_order(self, indices: Sequence[int], known_post_ids: Collection[str] = (),
+                       now: Optional[float] = None) -> List[int]:
+        """``indices`` sorted by descending priority"""
+        now = time.time() if now is None else now
+        return sorted(indices, key=lambda i: self.priority(i, now, known_post_ids), reverse=True)
+
+    def _isoformat(self, i: int) -> Optional[str]:
+        ts = self.timestamp[i]
+        if math.isnan(ts):
+            return None
+        # Naive datetimes round-trip through local time, as datetime.timestamp() assumed
+        if self.timestamp_utc[i]:
+            return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        return datetime.fromtimestamp(ts).isoformat()
+
+    def to_upsert_rows(self, features: Dict[int, Dict[str, Any]], template_clusterer=None,
+                       title_minhasher=None) -> List[Dict[str, Any]]:
+        """meme_posts rows for the posts in ``features`` (index -> extracted features)"""
+        rows = []
+        for i in sorted(features):
+            feature = features[i]
+            phash = feature.get('phash')
+            num_comments = self.num_comments[i]
+            upvote_ratio = self.upvote_ratio[i]
+
+            row = {
+                'platform': self.platform[i],
+                'post_id': self.post_id[i],
+                'title': self.title[i],
+                'url': self.url[i],
+                'score': self.score[i],
+                'timestamp': self._isoformat(i),
+                'subreddit': self.subreddit[i],
+                'num_comments': None if num_comments == NO_COMMENTS else num_comments,
+                'upvote_ratio': None if math.isnan(upvote_ratio) else upvote_ratio,
+                'post_hint': self.post_hint[i],
+                'template_hash': phash,
+                'template_cluster_id': template_clusterer.assign(phash) if template_clusterer is not None else None,
+            }
+            for column in FEATURE_COLUMNS:
+                row[column] = feature.get(column)
+            if title_minhasher:
+                row['title_minhash'] = title_minhasher.encode(self.title[i])
+            rows.append(row)
+        return rows
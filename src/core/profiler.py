@@ -0,0 +1,206 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter as TallyCounter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .metrics import stage_hooks
+
+DEFAULT_PROFILE_DIR = 'logs'
+NO_STAGE = 'no_stage'
+
+
+def _thread_cpu_time(thread_id: int) -> Optional[float]:
+    """CPU seconds used by a thread, or None where the platform can't tell"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+    except (AttributeError, OSError):
+        return None
+
+
+_STDLIB_DIR = os.path.dirname(os.__file__) + os.sep
+_SITE_PACKAGES = 'site-packages' + os.sep
+
+
+@lru_cache(maxsize=None)
+def _short_path(path: str) -> str:
+    """Package-relative path for libraries, repo-relative for our own code"""
+    if _SITE_PACKAGES in path:
+        return path.split(_SITE_PACKAGES, 1)[1]
+    if path.startswith(_STDLIB_DIR):
+        return path[len(_STDLIB_DIR):]
+    if os.path.isabs(path) and path.startswith(os.getcwd() + os.sep):
+        return os.path.relpath(path)
+    return path
+
+
+@lru_cache(maxsize=None)
+def _frame_label(code) -> str:
+    """Compact, flamegraph-safe frame name: function (file:line)"""
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+class StageProfiler:
+    """Sampling CPU profiler plus tracemalloc accounting scoped to pipeline stages.
+
+    A background thread samples every thread's stack at ``interval`` and
+    attributes the sample to the innermost ``track_stage`` active on that
+    thread. Threads whose CPU clock did not advance since the previous
+    sample are skipped, so blocked I/O waits don't drown out real work
+    (falls back to wall-clock sampling where per-thread CPU clocks are
+    unavailable). Stages that interleave on the event loop are attributed
+    to the most recently entered one.
+
+    The first ``snapshots_per_stage`` calls of each stage are bracketed by
+    tracemalloc snapshots and the growth is tabled by source line. The
+    process-wide heap is compared, so run with low concurrency when the
+    allocation tables need to be clean.
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_PROFILE_DIR, interval: float = 0.005,
+                 trace_frames: int = 1, snapshots_per_stage: int = 1, top_allocations: int = 25):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.trace_frames = trace_frames
+        self.snapshots_per_stage = snapshots_per_stage
+        self.top_allocations = top_allocations
+
+        self.samples: TallyCounter = TallyCounter()
+        self.stage_samples: TallyCounter = TallyCounter()
+        self.alloc_lines: Dict[str, TallyCounter] = {}
+        self._snapshots_taken: TallyCounter = TallyCounter()
+
+        self._thread_stages: Dict[int, List[str]] = {}
+        self._cpu_seen: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.started_at: Optional[datetime] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self.started_at = datetime.now()
+        tracemalloc.start(self.trace_frames)
+        stage_hooks.append(self._stage_hook)
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name='memedoc-profiler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+            self._sampler = None
+        if self._stage_hook in stage_hooks:
+            stage_hooks.remove(self._stage_hook)
+        tracemalloc.stop()
+
+    @contextmanager
+    def _stage_hook(self, stage: str):
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._thread_stages.setdefault(thread_id, []).append(stage)
+            take_snapshot = self._snapshots_taken[stage] < self.snapshots_per_stage
+            if take_snapshot:
+                self._snapshots_taken[stage] += 1
+
+        before = self._snapshot() if take_snapshot else None
+        try:
+            yield
+        finally:
+            lines = self._diff(before, self._snapshot()) if take_snapshot else None
+            with self._lock:
+                stack = self._thread_stages.get(thread_id, [])
+                # Remove the latest entry for this stage; coroutines may exit out of order
+                for i in range(len(stack) - 1, -1, -1):
+                    if stack[i] == stage:
+                        del stack[i]
+                        break
+                if lines:
+                    self.alloc_lines.setdefault(stage, TallyCounter()).update(lines)
+
+    def _snapshot(self):
+        # Grouping a snapshot costs seconds on a warm process, hence the per-stage cap
+        return tracemalloc.take_snapshot()
+
+    @staticmethod
+    def _diff(before, after) -> Dict[str, int]:
+        lines = {}
+        for stat in after.compare_to(before, 'lineno'):
+            frame = stat.traceback[0]
+            # Filtering the snapshots up front is slower than skipping our own lines here
+            if stat.size_diff > 0 and frame.filename not in (__file__, tracemalloc.__file__):
+                lines[f"{_short_path(frame.filename)}:{frame.lineno}"] = stat.size_diff
+        return lines
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                stages = {tid: stack[-1] for tid, stack in self._thread_stages.items() if stack}
+
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                cpu = _thread_cpu_time(thread_id)
+                if cpu is not None:
+                    previous = self._cpu_seen.get(thread_id)
+                    self._cpu_seen[thread_id] = cpu
+                    if previous is None or cpu <= previous:
+                        continue
+
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stage = stages.get(thread_id, NO_STAGE)
+                self.samples[(stage, ';'.join(reversed(stack)))] += 1
+                self.stage_samples[stage] += 1
+
+    def write(self) -> str:
+        """Write collapsed stacks, allocation tables and a JSON summary; return the directory"""
+        stamp = (self.started_at or datetime.now()).strftime('%Y%m%dT%H%M%S')
+        directory = os.path.join(self.output_dir, f"profile-{stamp}")
+        os.makedirs(directory, exist_ok=True)
+
+        # Brendan Gregg's collapsed format: flamegraph.pl / speedscope / inferno read it directly
+        with open(os.path.join(directory, 'cpu.collapsed'), 'w') as f:
+            for (stage, stack), count in self.samples.most_common():
+                f.write(f"{stage};{stack} {count}\n")
+
+        total_samples = sum(self.stage_samples.values())
+        summary = {'interval_s': self.interval, 'samples': total_samples, 'stages': {}}
+        with open(os.path.join(directory, 'allocations.txt'), 'w') as f:
+            for stage in sorted(set(self.stage_samples) | set(self._snapshots_taken)):
+                allocations = self.alloc_lines.get(stage, TallyCounter())
+                lines = allocations.most_common(self.top_allocations)
+                f.write(f"== {stage} | {sum(allocations.values()) / 1024:.1f} KiB allocated "
+                        f"over {self._snapshots_taken[stage]} sampled calls ==\n")
+                for line, size in lines:
+                    f.write(f"{size / 1024:12.1f} KiB  {line}\n")
+                f.write("\n")
+
+                summary['stages'][stage] = {
+                    'cpu_samples': self.stage_samples[stage],
+                    'cpu_share': self.stage_samples[stage] / total_samples if total_samples else 0,
+                    'sampled_calls': self._snapshots_taken[stage],
+                    'alloc_kib': sum(allocations.values()) / 1024,
+                    'top_allocations': [{'line': line, 'kib': size / 1024} for line, size in lines[:5]]
+                }
+
+        with open(os.path.join(directory, 'summary.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        return directory
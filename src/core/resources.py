@@ -0,0 +1,155 @@
+import asyncio
+import os
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+from .archive import RecordingScraper
+from .async_processor import AsyncProcessor
+from .logging_config import MemeDocLogger
+from .poll_scheduler import PollScheduler
+from .spool import SpoolDrainer, SpooledDatabase, WriteSpool, drain_spool_dir
+
+# Hours of subreddit rollups used to seed arrival rates
+SEED_HOURS = 48
+
+# Seconds spent draining the spool at startup and shutdown; the rest waits for the next run
+SPOOL_DRAIN_TIMEOUT = 60
+
+
+class CollectorResources:
+    """Everything a collection cycle needs that is expensive to build.
+
+    One-shot runs enter it once; the daemon keeps it open across cycles so
+    the detector and its caches, template clusters, the title MinHasher,
+    authenticated scrapers, the aiohttp session and the executor are built
+    once per process.
+
+    With ``spool_path`` post and cluster writes go to a local WriteSpool
+    that a background SpoolDrainer replays to ``db``; ``self.db`` is then
+    the spooled wrapper and ``self.direct_db`` the real client; with
+    ``drain_all_spools`` every other spool in its directory (left by another
+    shard layout) is replayed first, so only a process that is alone in that
+    directory should set it. A recording
+    RunArchive captures scraped listings and downloads and is saved on exit.
+    Without ``cluster_templates`` no fuzzy clusters are assigned (shards
+    leave that to the merge step, see ``cluster_new_templates``). Upcoming
+    partitions are created through ``partition_db``, a service-role client,
+    and not at all when it is None.
+    """
+
+    def __init__(self, db, scraper_factory: Optional[Callable] = None,
+                 max_workers: int = 10, max_concurrent_downloads: int = 5,
+                 spool_path: Optional[str] = None, archive=None, cluster_templates: bool = True,
+                 partition_db=None, drain_all_spools: bool = False):
+        self.db = db
+        self.partition_db = partition_db
+        self.archive = archive
+        self.direct_db = db
+        self.spool_path = spool_path
+        self.drain_all_spools = drain_all_spools
+        self.spool: Optional[WriteSpool] = None
+        self.drainer: Optional[SpoolDrainer] = None
+        self._drain_stop: Optional[asyncio.Event] = None
+        self._drain_task: Optional[asyncio.Future] = None
+        self.scraper_factory = scraper_factory
+        self.max_workers = max_workers
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self.cluster_templates = cluster_templates
+        self.image_analyzer = None
+        self.template_clusterer = None
+        self.title_minhasher = None
+        self.processor: Optional[AsyncProcessor] = None
+        self._scrapers: Dict[str, object] = {}
+        self._poll_schedulers: Dict[str, PollScheduler] = {}
+        self._partitions_checked: Optional[date] = None
+
+    async def __aenter__(self):
+        from ..processors.image_analyzer import ImageTemplateDetector
+        from ..processors.template_clustering import TemplateClusterer
+        from ..processors.text_similarity import TitleMinHasher
+
+        if self.scraper_factory is None:
+            from ..scrapers import get_scraper
+            self.scraper_factory = get_scraper
+
+        if self.spool_path:
+            await self._start_spool()
+
+        self.image_analyzer = ImageTemplateDetector()
+        if self.cluster_templates:
+            # Restore fuzzy template clusters so ids stay stable across runs
+            self.template_clusterer = TemplateClusterer.from_rows(self.db.get_template_clusters())
+        self.title_minhasher = TitleMinHasher()
+        self.processor = AsyncProcessor(max_workers=self.max_workers,
+                                        max_concurrent_downloads=self.max_concurrent_downloads,
+                                        archive=self.archive)
+        await self.processor.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.processor:
+            await self.processor.__aexit__(exc_type, exc_val, exc_tb)
+            self.processor = None
+        if self.archive is not None and not self.archive.replay:
+            self.archive.save()
+        if self.spool:
+            await self._stop_spool()
+
+    async def _start_spool(self):
+        loop = asyncio.get_running_loop()
+        if self.drain_all_spools:
+            await loop.run_in_executor(None, drain_spool_dir, self.direct_db, os.path.dirname(self.spool_path),
+                                       SPOOL_DRAIN_TIMEOUT, MemeDocLogger('spool'))
+        self.spool = WriteSpool(self.spool_path)
+        self.drainer = SpoolDrainer(self.spool, self.direct_db, logger=MemeDocLogger('spool'))
+        # Leftovers from an earlier run go first, so restored clusters include them
+        await loop.run_in_executor(None, self.drainer.drain, SPOOL_DRAIN_TIMEOUT)
+        self.db = SpooledDatabase(self.direct_db, self.spool)
+        self._drain_stop = asyncio.Event()
+        self._drain_task = asyncio.ensure_future(self.drainer.run(self._drain_stop))
+
+    async def _stop_spool(self):
+        loop = asyncio.get_running_loop()
+        self._drain_stop.set()
+        await self._drain_task
+        drained = await loop.run_in_executor(None, self.drainer.drain, SPOOL_DRAIN_TIMEOUT)
+        if not drained:
+            self.drainer.logger.logger.warning(
+                f"Spool {self.spool_path} still holds {sum(self.spool.pending().values())} rows; "
+                f"they are written by the next run or 'python main.py spool drain'")
+        self.spool.close()
+        self.spool = None
+        self.db = self.direct_db
+
+    def ensure_partitions(self):
+        """Create upcoming partitions at most once per day"""
+        today = date.today()
+        if self.partition_db is not None and self._partitions_checked != today:
+            self.partition_db.ensure_partitions()
+            self._partitions_checked = today
+
+    def scraper(self, platform_name: str):
+        """Scraper for a platform, kept (and authenticated) for later cycles"""
+        if platform_name not in self._scrapers:
+            scraper = self.scraper_factory(platform_name)
+            if not scraper:
+                return None
+            if self.archive is not None and not self.archive.replay:
+                scraper = RecordingScraper(scraper, self.archive)
+            self._scrapers[platform_name] = scraper
+        return self._scrapers[platform_name]
+
+    def poll_scheduler(self, platform_name: str, sources: List[str], max_limit: int) -> PollScheduler:
+        """Adaptive scheduler for a platform, seeded from stored rollups on first use"""
+        scheduler = self._poll_schedulers.get(platform_name)
+        if scheduler is None:
+            scheduler = PollScheduler(sources, max_limit=max_limit)
+            scheduler.seed(self.db.get_subreddit_stats(hours=SEED_HOURS), SEED_HOURS)
+            self._poll_schedulers[platform_name] = scheduler
+        else:
+            # Sources can change with a config reload
+            scheduler.sync_sources(sources)
+        return scheduler
+
+    def poll_snapshots(self) -> Dict[str, List[dict]]:
+        return {name: scheduler.snapshot() for name, scheduler in self._poll_schedulers.items()}
@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .metrics import cache_events, filter_rejections, shed_posts, stage_duration, stage_events, stage_items
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_VERSION = 1
+DEFAULT_REPORT_DIR = 'reports'
+
+# Metrics where a higher value is a regression, and where lower is
+HIGHER_IS_WORSE = ('p50', 'p95')
+LOWER_IS_WORSE = ('posts_per_second',)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def build_run_report(totals: Dict[str, Any], started_at: datetime,
+                     finished_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Summarise the global metrics registry into a machine-readable run report"""
+    finished_at = finished_at or datetime.now()
+
+    stages = {}
+    for labels in stage_duration.label_sets():
+        stage = labels['stage']
+        count = stage_duration.count(stage=stage)
+        stages[stage] = {
+            'count': count,
+            'errors': int(stage_events.get(stage=stage, outcome='error')),
+            'total_s': stage_duration.sum(stage=stage),
+            'mean': stage_duration.sum(stage=stage) / count if count else None,
+            'p50': stage_duration.quantile(0.5, stage=stage),
+            'p95': stage_duration.quantile(0.95, stage=stage)
+        }
+
+    caches: Dict[str, Dict[str, float]] = {}
+    for labels, value in cache_events.snapshot():
+        caches.setdefault(labels['cache'], {'hit': 0, 'miss': 0})[labels['result']] = value
+    cache_hit_rates = {
+        name: counts['hit'] / (counts['hit'] + counts['miss'])
+        for name, counts in caches.items()
+        if counts['hit'] + counts['miss'] > 0
+    }
+
+    rejections: Dict[str, float] = {}
+    for labels, value in filter_rejections.snapshot():
+        rejections[labels['filter']] = rejections.get(labels['filter'], 0) + value
+
+    total_time = totals.get('total_time') or 0
+    return {
+        'version': REPORT_VERSION,
+        'started_at': started_at.isoformat(),
+        'finished_at': finished_at.isoformat(),
+        'wall_time_s': (finished_at - started_at).total_seconds(),
+        'totals': {
+            **totals,
+            'posts_per_second': totals.get('total_processed', 0) / total_time if total_time > 0 else 0
+        },
+        'stages': stages,
+        'bytes_downloaded': int(stage_items.get(stage='download', unit='bytes')),
+        'rows_written': int(stage_items.get(stage='upsert', unit='rows')),
+        'cache_hit_rates': cache_hit_rates,
+        'filter_rejections': rejections,
+        'shed_posts': {labels['reason']: value for labels, value in shed_posts.snapshot()},
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def write_run_report(report: Dict[str, Any], report_dir: str = DEFAULT_REPORT_DIR,
+                     name: Optional[str] = None) -> str:
+    """Write a report as reports/run-<timestamp>.json (or ``name``) and return its path"""
+    os.makedirs(report_dir, exist_ok=True)
+    stamp = datetime.fromisoformat(report['started_at']).strftime('%Y%m%dT%H%M%S')
+    path = os.path.join(report_dir, name or f"run-{stamp}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def merge_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-shard reports of one sharded run into a single run report.
+
+    Counts, bytes and rows add up and the run spans the earliest start to the
+    latest finish. Shards only keep stage percentiles, so the merged p50 is
+    the count-weighted mean of shard p50s and p95 is the worst shard's p95.
+    """
+    started_at = min(datetime.fromisoformat(r['started_at']) for r in reports)
+    finished_at = max(datetime.fromisoformat(r['finished_at']) for r in reports)
+
+    totals: Dict[str, Any] = {}
+    for report in reports:
+        for key, value in report.get('totals', {}).items():
+            if key != 'posts_per_second':
+                totals[key] = totals.get(key, 0) + value
+    wall_time = (finished_at - started_at).total_seconds()
+    # Shards run side by side, so throughput is over wall time, not summed busy time
+    totals['posts_per_second'] = totals.get('total_processed', 0) / wall_time if wall_time > 0 else 0
+
+    stages: Dict[str, Dict[str, Any]] = {}
+    for report in reports:
+        for stage, stats in report.get('stages', {}).items():
+            merged = stages.setdefault(stage, {'count': 0, 'errors': 0, 'total_s': 0.0,
+                                               '_p50_weight': 0.0, 'p95': None})
+            merged['count'] += stats['count']
+            merged['errors'] += stats['errors']
+            merged['total_s'] += stats['total_s']
+            if stats.get('p50') is not None:
+                merged['_p50_weight'] += stats['p50'] * stats['count']
+            if stats.get('p95') is not None:
+                merged['p95'] = max(merged['p95'] or 0, stats['p95'])
+    for merged in stages.values():
+        weight = merged.pop('_p50_weight')
+        merged['mean'] = merged['total_s'] / merged['count'] if merged['count'] else None
+        merged['p50'] = weight / merged['count'] if merged['count'] else None
+
+    def summed(key):
+        combined: Dict[str, float] = {}
+        for report in reports:
+            for name, value in report.get(key, {}).items():
+                combined[name] = combined.get(name, 0) + value
+        return combined
+
+    hit_rates: Dict[str, List[float]] = {}
+    for report in reports:
+        for name, rate in report.get('cache_hit_rates', {}).items():
+            hit_rates.setdefault(name, []).append(rate)
+
+    rss = [r['peak_rss_mb'] for r in reports if r.get('peak_rss_mb') is not None]
+    return {
+        'version': REPORT_VERSION,
+        'started_at': started_at.isoformat(),
+        'finished_at': finished_at.isoformat(),
+        'wall_time_s': wall_time,
+        'totals': totals,
+        'stages': stages,
+        'bytes_downloaded': sum(r.get('bytes_downloaded', 0) for r in reports),
+        'rows_written': sum(r.get('rows_written', 0) for r in reports),
+        'cache_hit_rates': {name: statistics.fmean(rates) for name, rates in hit_rates.items()},
+        'filter_rejections': summed('filter_rejections'),
+        'shed_posts': summed('shed_posts'),
+        'peak_rss_mb': max(rss) if rss else None,
+        'shards': [r.get('shard') for r in reports]
+    }
+
+
+def load_reports(report_dir: str = DEFAULT_REPORT_DIR) -> List[Dict[str, Any]]:
+    """Load all run reports, oldest first"""
+    reports = []
+    for path in sorted(Path(report_dir).glob('run-*.json')):
+        with open(path) as f:
+            report = json.load(f)
+        report['_path'] = str(path)
+        reports.append(report)
+    return reports
+
+
+def _series(report: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten the comparable numbers in a report into metric -> value"""
+    values = {}
+    for stage, stats in report.get('stages', {}).items():
+        for key in HIGHER_IS_WORSE:
+            if stats.get(key) is not None:
+                values[f"{stage}.{key}"] = stats[key]
+    for key in LOWER_IS_WORSE:
+        value = report.get('totals', {}).get(key)
+        if value:
+            values[f"run.{key}"] = value
+    if report.get('peak_rss_mb') is not None:
+        values['run.peak_rss_mb'] = report['peak_rss_mb']
+    return values
+
+
+def compare_reports(current: Dict[str, Any], history: List[Dict[str, Any]],
+                    z_threshold: float = 3.0, min_change: float = 0.2) -> List[Dict[str, Any]]:
+    """Flag metrics in the current report that regressed against history.
+
+    With three or more historical runs a metric regresses when it is more
+    than ``z_threshold`` standard deviations worse than the historical mean
+    (the deviation is floored at 5% of the mean so near-constant stages do
+    not flag on noise). With fewer runs only the relative change is used.
+    Either way the change must exceed ``min_change`` of the baseline.
+    """
+    current_values = _series(current)
+    past_values: Dict[str, List[float]] = {}
+    for report in history:
+        for metric, value in _series(report).items():
+            past_values.setdefault(metric, []).append(value)
+
+    regressions = []
+    for metric, value in sorted(current_values.items()):
+        past = past_values.get(metric)
+        if not past:
+            continue
+
+        baseline = statistics.fmean(past)
+        if baseline <= 0:
+            continue
+        lower_is_worse = metric.split('.', 1)[1] in LOWER_IS_WORSE
+        change = (baseline - value) / baseline if lower_is_worse else (value - baseline) / baseline
+        if change <= min_change:
+            continue
+
+        z_score = None
+        if len(past) >= 3:
+            sigma = max(statistics.stdev(past), 0.05 * baseline)
+            z_score = abs(value - baseline) / sigma
+            if z_score < z_threshold:
+                continue
+
+        regressions.append({
+            'metric': metric,
+            'current': value,
+            'baseline': baseline,
+            'change_pct': change * 100,
+            'z_score': z_score,
+            'history': len(past)
+        })
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare a MemeDoc run report against previous runs")
+    parser.add_argument('--report', help="Report to check (default: newest in --dir)")
+    parser.add_argument('--dir', default=DEFAULT_REPORT_DIR, help="Directory of run reports")
+    parser.add_argument('--baseline', help="Compare against this single report instead of history")
+    parser.add_argument('--last', type=int, default=10, help="Number of previous runs to compare against")
+    parser.add_argument('--z-threshold', type=float, default=3.0)
+    parser.add_argument('--min-change', type=float, default=0.2)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--merge', nargs='+', metavar='SHARD_REPORT',
+                        help="Merge these per-shard reports into one run report in --dir and exit")
+    args = parser.parse_args(argv)
+
+    if args.merge:
+        shard_reports = []
+        for path in args.merge:
+            with open(path) as f:
+                shard_reports.append(json.load(f))
+        path = write_run_report(merge_reports(shard_reports), args.dir)
+        print(f"Merged {len(shard_reports)} shard reports into {path}")
+        return 0
+
+    reports = load_reports(args.dir)
+    if args.report:
+        with open(args.report) as f:
+            current = json.load(f)
+        current['_path'] = args.report
+        history = [r for r in reports if os.path.abspath(r['_path']) != os.path.abspath(args.report)]
+    elif reports:
+        current, history = reports[-1], reports[:-1]
+    else:
+        print(f"No run reports found in {args.dir}")
+        return 0
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            history = [json.load(f)]
+    else:
+        history = history[-args.last:]
+
+    if not history:
+        print("No previous runs to compare against")
+        return 0
+
+    regressions = compare_reports(current, history, args.z_threshold, args.min_change)
+    prefix = '::warning::' if os.getenv('GITHUB_ACTIONS') else ''
+    for r in regressions:
+        z_info = f", z={r['z_score']:.1f}" if r['z_score'] is not None else ""
+        print(
+            f"{prefix}Performance regression | {r['metric']}: {r['current']:.4g} "
+            f"vs {r['baseline']:.4g} over {r['history']} runs (+{r['change_pct']:.0f}% worse{z_info})"
+        )
+    if not regressions:
+        print(f"No regressions against {len(history)} previous runs")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
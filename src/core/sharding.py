@@ -0,0 +1,30 @@
+import hashlib
+from typing import Iterable, List
+
+
+def shard_for(key: str, shard_count: int) -> int:
+    """Stable shard of a key; unlike hash() it is the same in every process and run"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shard_count
+
+
+def shard_sources(platform: str, sources: Iterable[str], shard_index: int, shard_count: int) -> List[str]:
+    """Sources of a platform owned by one shard, in their configured order.
+
+    Every source belongs to exactly one of ``shard_count`` shards, so N
+    workers started with indices 0..N-1 cover the configured sources once
+    without coordinating.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"shard_index must be in [0, {shard_count}), got {shard_index}")
+    seen = set()
+    owned = []
+    for source in sources:
+        # Config lists can repeat a name with different casing (e.g. nukedmemes)
+        key = source.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        if shard_for(f"{platform}:{key}", shard_count) == shard_index:
+            owned.append(source)
+    return owned
@@ -0,0 +1,334 @@
+import asyncio
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import queue_depth, stage_items, track_stage
+
+DEFAULT_SPOOL_DIR = 'spool'
+
+# Spooled write kinds: database method and the columns identifying a row
+SPOOL_KINDS = {
+    'meme_posts': ('bulk_upsert_posts', ('platform', 'post_id', 'timestamp')),
+    'template_clusters': ('save_template_clusters', ('phash',)),
+}
+
+# Failed writes of a row before it is moved to the dead-letter table
+MAX_ATTEMPTS = 3
+
+# PostgREST/Postgres error codes that mean "try again later", not "bad row":
+# no connection to Postgres, statement timeout, serialization failure, deadlock
+TRANSIENT_ERROR_CODES = ('PGRST000', 'PGRST001', 'PGRST002', 'PGRST003', '57014', '40001', '40P01')
+
+SPOOL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    spooled_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_spool_kind_seq ON spool(kind, seq);
+CREATE TABLE IF NOT EXISTS dead_letter (
+    seq INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    spooled_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+def is_transient(error: Exception) -> bool:
+    """True for outages (network, timeouts, database unavailable), False for rejected rows"""
+    if isinstance(error, OSError):  # includes ConnectionError and TimeoutError
+        return True
+    if type(error).__module__.split('.')[0] in ('httpx', 'httpcore'):
+        return True
+    code = str(getattr(error, 'code', '') or '')
+    return code in TRANSIENT_ERROR_CODES or code.startswith('53')  # 53xxx: insufficient resources
+
+
+def spool_path(name: str = 'writes', spool_dir: str = DEFAULT_SPOOL_DIR) -> str:
+    return os.path.join(spool_dir, f"{name}.sqlite3")
+
+
+class WriteSpool:
+    """Local append-only queue of database writes, backed by SQLite.
+
+    Rows are committed here first (WAL mode, fsynced per append), so a slow
+    or unreachable database never blocks analysis and a crash or outage
+    loses nothing: whatever has not been acknowledged is replayed by the
+    next drainer, in this run or a later one. Rows the database keeps
+    rejecting are moved to ``dead_letter`` with the error, where they wait
+    for ``requeue``.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.executescript(SPOOL_SCHEMA)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(spool)')]
+        if 'attempts' not in columns:  # spool written before dead-lettering existed
+            self._conn.execute('ALTER TABLE spool ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+        # Rows left over from earlier runs are pending too
+        queue_depth.set(sum(self.pending().values()), stage='spool')
+
+    def append(self, kind: str, rows: List[dict]) -> int:
+        if not rows:
+            return 0
+        now = time.time()
+        payloads = [(kind, json.dumps(row, default=str), now) for row in rows]
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany('INSERT INTO spool (kind, payload, spooled_at) VALUES (?, ?, ?)', payloads)
+            self._conn.execute('COMMIT')
+        queue_depth.inc(len(rows), stage='spool')
+        return len(rows)
+
+    def read(self, kind: str, limit: int) -> List[Tuple[int, dict]]:
+        """Oldest pending rows of a kind as (seq, row)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT seq, payload FROM spool WHERE kind = ? ORDER BY seq LIMIT ?', (kind, limit))
+            return [(seq, json.loads(payload)) for seq, payload in cursor.fetchall()]
+
+    def ack(self, seqs: List[int]):
+        """Forget rows the database has accepted"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany('DELETE FROM spool WHERE seq = ?', [(seq,) for seq in seqs])
+            self._conn.execute('COMMIT')
+        queue_depth.dec(len(seqs), stage='spool')
+
+    def fail(self, seqs: List[int], error: str, max_attempts: int = MAX_ATTEMPTS) -> int:
+        """Count a rejected write of these rows; returns how many were dead-lettered"""
+        params = [(seq,) for seq in seqs]
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany('UPDATE spool SET attempts = attempts + 1 WHERE seq = ?', params)
+            dead = [seq for seq, in self._conn.execute(
+                f"SELECT seq FROM spool WHERE attempts >= ? AND seq IN ({','.join('?' * len(seqs))})",
+                (max_attempts, *seqs)).fetchall()]
+            if dead:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO dead_letter (seq, kind, payload, spooled_at, attempts, error, failed_at) '
+                    'SELECT seq, kind, payload, spooled_at, attempts, ?, ? FROM spool WHERE seq = ?',
+                    [(error, time.time(), seq) for seq in dead])
+                self._conn.executemany('DELETE FROM spool WHERE seq = ?', [(seq,) for seq in dead])
+            self._conn.execute('COMMIT')
+        queue_depth.dec(len(dead), stage='spool')
+        return len(dead)
+
+    def requeue(self) -> int:
+        """Move every dead-lettered row back into the spool with a fresh attempt count"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            # seq is never reused, so rows go back to their original position
+            moved = self._conn.execute(
+                'INSERT INTO spool (seq, kind, payload, spooled_at, attempts) '
+                'SELECT seq, kind, payload, spooled_at, 0 FROM dead_letter').rowcount
+            self._conn.execute('DELETE FROM dead_letter')
+            self._conn.execute('COMMIT')
+        queue_depth.inc(moved, stage='spool')
+        return moved
+
+    def dead_letters(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT kind, COUNT(*) FROM dead_letter GROUP BY kind').fetchall()
+        return dict(rows)
+
+    def pending(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT kind, COUNT(*) FROM spool GROUP BY kind').fetchall()
+        return dict(rows)
+
+    def oldest_age(self) -> Optional[float]:
+        """Seconds the oldest pending row has waited"""
+        with self._lock:
+            oldest = self._conn.execute('SELECT MIN(spooled_at) FROM spool').fetchone()[0]
+        return time.time() - oldest if oldest is not None else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SpooledDatabase:
+    """Database client whose post and template-cluster writes go to a spool.
+
+    Everything else (reads, RPCs) is passed through to the wrapped client,
+    so the pipeline uses it exactly like SupabaseClient.
+    """
+
+    def __init__(self, db, spool: WriteSpool):
+        self.db = db
+        self.spool = spool
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def bulk_upsert_posts(self, posts_data: list) -> int:
+        return self.spool.append('meme_posts', posts_data)
+
+    def save_template_clusters(self, assignments: list) -> int:
+        return self.spool.append('template_clusters', assignments)
+
+
+def _dedupe(rows: List[Tuple[int, dict]], key_columns: Tuple[str, ...]) -> List[dict]:
+    """Latest spooled version of each row; one upsert may not touch a row twice"""
+    latest: Dict[tuple, dict] = {}
+    for _, row in rows:
+        key = tuple(row.get(column) for column in key_columns)
+        latest.pop(key, None)
+        latest[key] = row
+    return list(latest.values())
+
+
+class SpoolDrainer:
+    """Replays a spool to the database in large batches, oldest first.
+
+    A batch is acknowledged only after the database call returns without
+    raising. On a transient failure (see ``is_transient``) the drainer backs
+    off exponentially (up to ``max_backoff`` seconds) and retries the same
+    rows, so an outage just grows the spool until the database is back. Any
+    other failure means some row is rejected: the batch is bisected, the
+    halves that succeed are acknowledged, and each rejected row is retried
+    up to ``max_attempts`` times before it is dead-lettered.
+    """
+
+    def __init__(self, spool: WriteSpool, db, batch_size: int = 500,
+                 idle_interval: float = 1.0, max_backoff: float = 300.0,
+                 max_attempts: int = MAX_ATTEMPTS, logger=None):
+        self.spool = spool
+        self.db = db
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.logger = logger
+        self.failures = 0
+        self.written = 0
+        self.dead_lettered = 0
+
+    def _write(self, kind: str, pending: List[Tuple[int, dict]]) -> Tuple[int, int]:
+        """Write rows, bisecting around rejected ones; returns (acknowledged, rejected).
+
+        Transient errors are raised so the caller backs off with the rows
+        still queued.
+        """
+        method, key_columns = SPOOL_KINDS[kind]
+        rows = _dedupe(pending, key_columns)
+        try:
+            with track_stage('drain'):
+                getattr(self.db, method)(rows, raise_errors=True)
+        except Exception as e:
+            if is_transient(e):
+                raise
+            if len(pending) > 1:
+                middle = len(pending) // 2
+                first = self._write(kind, pending[:middle])
+                second = self._write(kind, pending[middle:])
+                return first[0] + second[0], first[1] + second[1]
+            dead = self.spool.fail([pending[0][0]], f"{type(e).__name__}: {e}", self.max_attempts)
+            self.dead_lettered += dead
+            if dead and self.logger:
+                self.logger.logger.warning(f"Spool row {pending[0][0]} ({kind}) dead-lettered: {e}")
+            return 0, 1
+        self.spool.ack([seq for seq, _ in pending])
+        stage_items.inc(len(rows), stage='drain', unit='rows')
+        return len(pending), 0
+
+    def drain_once(self) -> int:
+        """Write at most one batch per kind; returns rows acknowledged or rejected.
+
+        Raises on a transient failure.
+        """
+        handled = 0
+        for kind in SPOOL_KINDS:
+            pending = self.spool.read(kind, self.batch_size)
+            if not pending:
+                continue
+            acknowledged, rejected = self._write(kind, pending)
+            self.written += acknowledged
+            handled += acknowledged + rejected
+        return handled
+
+    def _backoff(self) -> float:
+        return min(self.idle_interval * 2 ** self.failures, self.max_backoff)
+
+    def _attempt(self) -> int:
+        try:
+            written = self.drain_once()
+            self.failures = 0
+            return written
+        except Exception as e:
+            self.failures += 1
+            if self.logger:
+                self.logger.log_error(e, f"Spool drain (retry in {self._backoff():.0f}s)")
+            return -1
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Drain until the spool is empty; False if it failed or ran out of time first"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while deadline is None or time.monotonic() < deadline:
+            written = self._attempt()
+            if written == 0:
+                return True
+            if written < 0:
+                if self.failures >= 3 or (deadline is not None and time.monotonic() + self._backoff() > deadline):
+                    return False
+                time.sleep(self._backoff())
+        return False
+
+    async def run(self, stop_event: asyncio.Event):
+        """Drain in the background until ``stop_event`` is set"""
+        loop = asyncio.get_running_loop()
+        while not stop_event.is_set():
+            written = await loop.run_in_executor(None, self._attempt)
+            if written > 0:
+                continue
+            delay = self._backoff() if written < 0 else self.idle_interval
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+def spool_files(spool_dir: str = DEFAULT_SPOOL_DIR) -> List[str]:
+    return sorted(glob.glob(os.path.join(spool_dir, '*.sqlite3')))
+
+
+def drain_spool_dir(db, spool_dir: str = DEFAULT_SPOOL_DIR, timeout: Optional[float] = None,
+                    logger=None) -> int:
+    """Drain every spool file in ``spool_dir``; returns the rows still pending.
+
+    Spool files are named after the shard layout, so a run with another
+    shard count would never replay the old ones on its own. Only call this
+    while no other process writes to the directory. ``timeout`` bounds the
+    whole directory, not each file.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    pending = 0
+    for path in spool_files(spool_dir):
+        spool = WriteSpool(path)
+        try:
+            remaining = max(deadline - time.monotonic(), 0) if deadline is not None else None
+            SpoolDrainer(spool, db, logger=logger).drain(remaining)
+            pending += sum(spool.pending().values())
+        finally:
+            spool.close()
+    return pending
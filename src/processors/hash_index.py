@@ -0,0 +1,247 @@
+# processors/hash_index.py
+import json
+import os
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .template_clustering import DEFAULT_BANDS, DEFAULT_HAMMING_RADIUS, _band_layout, popcount64
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+DEFAULT_INDEX_DIR = os.path.join('snapshots', 'hash_index')
+HASH_COLUMNS = ('phash', 'dhash', 'whash')
+
+# Columns delta sync fetches from meme_posts
+SYNC_COLUMNS = 'id,platform,post_id,' + ','.join(HASH_COLUMNS)
+
+# Ids come from a sequence at insert time, but concurrent writers (shards,
+# spool replays) commit out of order: a row below the watermark can become
+# visible after a sync. Each sync re-reads this many ids below the
+# watermark and skips the ones already indexed.
+SYNC_OVERLAP = 5000
+
+
+def _band_dtype(mask: int):
+    if mask <= 0xFFFF:
+        return np.uint16
+    return np.uint32 if mask <= 0xFFFFFFFF else np.uint64
+
+
+class HashIndexSegment:
+    """One immutable segment of a snapshot, read through memory maps.
+
+    Each array is its own .npy file opened with ``mmap_mode='r'``, so
+    opening costs a header read and lookups touch only the pages they need.
+    Per hash column the segment stores the raw uint64 values plus, for
+    each band, the band values in sorted order with their row numbers, so
+    candidates come from ``searchsorted`` instead of a scan.
+    """
+
+    def __init__(self, directory: str, name: str, columns: Iterable[str], bands: int):
+        self.name = name
+        self._layout = _band_layout(bands)
+        self.row_id = self._load(directory, 'row_id')
+        self.post_key = self._load(directory, 'post_key')
+        self.hashes: Dict[str, np.ndarray] = {}
+        self.band_index: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        for column in columns:
+            self.hashes[column] = self._load(directory, column)
+            self.band_index[column] = [
+                (self._load(directory, f"{column}.band{b}.keys"), self._load(directory, f"{column}.band{b}.rows"))
+                for b in range(bands)
+            ]
+
+    def _load(self, directory: str, array: str) -> np.ndarray:
+        return np.load(os.path.join(directory, f"{self.name}.{array}.npy"), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.row_id)
+
+    @staticmethod
+    def write(directory: str, name: str, row_id: np.ndarray, post_key: np.ndarray,
+              hashes: Dict[str, np.ndarray], bands: int):
+        """Write one segment; a hash value of 0 means the post has no such hash"""
+        def save(array: str, values: np.ndarray):
+            np.save(os.path.join(directory, f"{name}.{array}.npy"), values)
+
+        save('row_id', row_id)
+        save('post_key', post_key)
+        for column, values in hashes.items():
+            save(column, values)
+            # Rows without this hash are left out of its band index
+            indexed = np.flatnonzero(values).astype(np.uint32)
+            for b, (shift, mask) in enumerate(_band_layout(bands)):
+                keys = ((values[indexed] >> np.uint64(shift)) & np.uint64(mask)).astype(_band_dtype(mask))
+                order = np.argsort(keys, kind='stable')
+                save(f"{column}.band{b}.keys", keys[order])
+                save(f"{column}.band{b}.rows", indexed[order])
+
+    def near(self, column: str, value: int, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows whose hash is within ``radius`` bits of ``value`` and their distances"""
+        candidates = []
+        for (shift, mask), (keys, rows) in zip(self._layout, self.band_index[column]):
+            key = (value >> shift) & mask
+            lo = np.searchsorted(keys, key, side='left')
+            hi = np.searchsorted(keys, key, side='right')
+            if hi > lo:
+                candidates.append(rows[lo:hi])
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        rows = np.unique(np.concatenate(candidates)).astype(np.int64)
+        distances = popcount64(self.hashes[column][rows] ^ np.uint64(value)).astype(np.int64)
+        close = distances <= radius
+        return rows[close], distances[close]
+
+
+class HashIndex:
+    """Versioned, append-only on-disk snapshot of stored post hashes.
+
+    The snapshot is a list of immutable segments named in ``manifest.json``.
+    ``sync`` fetches only meme_posts rows whose id is above the manifest's
+    watermark (less ``SYNC_OVERLAP``, for late commits) and writes the
+    unindexed ones as a new segment; the manifest is replaced
+    atomically afterwards, so a crashed sync leaves the previous version
+    intact. ``compact`` merges segments once appends pile up. Candidate
+    recall matches TemplateClusterer: exact up to ``bands - 1`` differing
+    bits, probabilistic beyond.
+    """
+
+    def __init__(self, directory: str = DEFAULT_INDEX_DIR, columns: Iterable[str] = HASH_COLUMNS,
+                 bands: int = DEFAULT_BANDS):
+        self.directory = directory
+        self.columns = tuple(columns)
+        self.bands = bands
+        self.version = 0
+        self.watermark = 0  # highest meme_posts.id in the snapshot
+        self.segments: List[HashIndexSegment] = []
+
+    @classmethod
+    def open(cls, directory: str = DEFAULT_INDEX_DIR) -> 'HashIndex':
+        """Map an existing snapshot; an empty index if there is none or its format is outdated"""
+        index = cls(directory)
+        manifest_path = os.path.join(directory, MANIFEST)
+        if not os.path.exists(manifest_path):
+            return index
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != FORMAT_VERSION:
+            return index  # rebuilt from scratch by the next sync
+
+        index.columns = tuple(manifest['columns'])
+        index.bands = manifest['bands']
+        index.version = manifest['version']
+        index.watermark = manifest['watermark']
+        index.segments = [
+            HashIndexSegment(directory, name, index.columns, index.bands) for name in manifest['segments']
+        ]
+        return index
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments)
+
+    def _write_manifest(self):
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'version': self.version,
+            'watermark': self.watermark,
+            'columns': list(self.columns),
+            'bands': self.bands,
+            'rows': len(self),
+            'segments': [segment.name for segment in self.segments]
+        }
+        tmp_path = os.path.join(self.directory, f"{MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.directory, MANIFEST))
+
+    def _publish(self, row_id: np.ndarray, post_key: np.ndarray, hashes: Dict[str, np.ndarray]):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"seg-{self.version + 1:06d}"
+        HashIndexSegment.write(self.directory, name, row_id, post_key, hashes, self.bands)
+        segment = HashIndexSegment(self.directory, name, self.columns, self.bands)
+        self.version += 1
+        return segment
+
+    def _indexed_ids(self, above: int) -> set:
+        """Ids in the snapshot greater than ``above``"""
+        indexed = set()
+        for segment in self.segments:
+            row_id = segment.row_id
+            indexed.update(row_id[row_id > above].tolist())
+        return indexed
+
+    def append(self, rows: List[dict]) -> int:
+        """Add meme_posts rows (id, platform, post_id, hex hashes) that are not indexed
+        yet as a new segment and publish a new snapshot version"""
+        if not rows:
+            return 0
+        indexed = self._indexed_ids(min(row['id'] for row in rows) - 1)
+        rows = list({row['id']: row for row in rows if row['id'] not in indexed}.values())
+        if not rows:
+            return 0
+
+        row_id = np.array([row['id'] for row in rows], dtype=np.int64)
+        post_key = np.array([f"{row['platform']}:{row['post_id']}".encode() for row in rows])
+        hashes = {
+            column: np.array([int(row[column], 16) if row.get(column) else 0 for row in rows], dtype=np.uint64)
+            for column in self.columns
+        }
+        self.segments.append(self._publish(row_id, post_key, hashes))
+        self.watermark = max(self.watermark, int(row_id.max()))
+        self._write_manifest()
+        return len(rows)
+
+    def sync(self, db, page_size: int = 1000) -> int:
+        """Append every stored post not yet indexed, re-reading ``SYNC_OVERLAP`` ids
+        below the watermark. A failed read raises and leaves the snapshot as it was."""
+        since = max(self.watermark - SYNC_OVERLAP, 0)
+        return self.append(list(db.get_posts_since(since, SYNC_COLUMNS, page_size)))
+
+    def compact(self) -> int:
+        """Merge all segments into one; returns the number of segments merged"""
+        if len(self.segments) <= 1:
+            return 0
+
+        old = self.segments
+        width = max(segment.post_key.dtype.itemsize for segment in old)
+        segment = self._publish(
+            np.concatenate([s.row_id for s in old]),
+            np.concatenate([s.post_key.astype(f"S{width}") for s in old]),
+            {column: np.concatenate([s.hashes[column] for s in old]) for column in self.columns}
+        )
+        self.segments = [segment]
+        self._write_manifest()
+
+        # Only unlink files once the new manifest no longer names them
+        for merged in old:
+            for filename in os.listdir(self.directory):
+                if filename.startswith(f"{merged.name}."):
+                    os.remove(os.path.join(self.directory, filename))
+        return len(old)
+
+    def near(self, hash_hex: str, column: str = 'phash',
+             radius: int = DEFAULT_HAMMING_RADIUS) -> List[Dict[str, object]]:
+        """Stored posts whose ``column`` hash is within ``radius`` bits, closest first"""
+        value = int(hash_hex, 16)
+        matches = []
+        for segment in self.segments:
+            rows, distances = segment.near(column, value, radius)
+            for row, distance in zip(rows.tolist(), distances.tolist()):
+                matches.append({
+                    'id': int(segment.row_id[row]),
+                    'post_key': segment.post_key[row].decode(),
+                    'distance': distance
+                })
+        return sorted(matches, key=lambda match: match['distance'])
+
+    def info(self) -> Dict[str, object]:
+        return {
+            'directory': self.directory,
+            'version': self.version,
+            'watermark': self.watermark,
+            'rows': len(self),
+            'segments': len(self.segments)
+        }
@@ -5,6 +5,9 @@ import requests
 from io import BytesIO
 import cv2
 import numpy as np
+from ..core.metrics import stage_items, track_stage
+from .media_sampler import is_video_container, majority_hash, sample_animation_frames, sample_video_frames
+from .text_similarity import DEFAULT_TITLE_THRESHOLD, TitleMinHasher
 
 class ImageTemplateDetector:
     def __init__(self):
@@ -18,35 +21,62 @@ class ImageTemplateDetector:
     def extract_features(self, image_url):
         """Extract multiple hash for robustness (sync version)"""
         try:
-            response = requests.get(image_url, timeout=10)
-            image = Image.open(BytesIO(response.content)).convert('RGB')
+            with track_stage('download'):
+                response = requests.get(image_url, timeout=10)
+            return self.extract_features_from_bytes(response.content)
+        except Exception as e:
+            return None
 
-            features = {}
-            for name, hash_func in self.hash_functions.items():
-                features[name] = str(hash_func(image))
+    def extract_features_from_bytes(self, image_bytes: bytes):
+        """Extract features from image, GIF or video bytes (for async processing)"""
+        try:
+            if is_video_container(image_bytes):
+                with track_stage('frames'):
+                    frames = sample_video_frames(image_bytes)
+                return self._extract_frame_features(frames, 'video')
 
-            # Template structure detection
-            features['template_structure'] = self._detect_text_regions(image)
+            with track_stage('decode'):
+                source = Image.open(BytesIO(image_bytes))
+                animated = getattr(source, 'is_animated', False)
+                if not animated:
+                    image = source.convert('RGB')
+            if animated:
+                with track_stage('frames'):
+                    frames = sample_animation_frames(source)
+                return self._extract_frame_features(frames, 'animation')
 
+            features = self._extract_image_features(image)
+            features['media_type'] = 'image'
             return features
         except Exception as e:
             return None
 
-    def extract_features_from_bytes(self, image_bytes: bytes):
-        """Extract features from image bytes (for async processing)"""
-        try:
-            image = Image.open(BytesIO(image_bytes)).convert('RGB')
-
-            features = {}
-            for name, hash_func in self.hash_functions.items():
+    def _extract_image_features(self, image):
+        features = {}
+        for name, hash_func in self.hash_functions.items():
+            with track_stage(name):
                 features[name] = str(hash_func(image))
 
-            # Template structure detection
+        # Template structure detection
+        with track_stage('mser'):
             features['template_structure'] = self._detect_text_regions(image)
 
-            return features
-        except Exception as e:
+        return features
+
+    def _extract_frame_features(self, frames, media_type: str):
+        """Per-frame phashes plus their majority-vote phash as the item's signature"""
+        if not frames:
             return None
+        stage_items.inc(len(frames), stage='frames', unit='frames')
+        with track_stage('phash'):
+            frame_phashes = [str(imagehash.phash(frame)) for frame in frames]
+
+        # The middle frame stands in for the item in the single-image columns
+        features = self._extract_image_features(frames[len(frames) // 2])
+        features['phash'] = majority_hash(frame_phashes)
+        features['media_type'] = media_type
+        features['frame_phashes'] = frame_phashes
+        return features
     
     def _detect_text_regions(self, pil_image):
         """Detect text boxes positions - crude template detection"""
@@ -87,9 +117,23 @@ class ImageTemplateDetector:
         
         return "_".join(structure) if structure else "scattered"
 
-    def find_similar_templates(self, target_features, db_features, threshold=5):
-        """Find templates with similar structure"""
+    @staticmethod
+    def _parse_hash(hash_type, value):
+        """Parse a stored hex hash (colorhash uses a flat, non-square layout)"""
+        if hash_type == 'colorhash':
+            return imagehash.hex_to_flathash(value, hashsize=3)
+        return imagehash.hex_to_hash(value)
+
+    def find_similar_templates(self, target_features, db_features, threshold=5,
+                               title_threshold=DEFAULT_TITLE_THRESHOLD):
+        """Find templates with similar structure.
+
+        A candidate whose title similarity reaches ``title_threshold`` (the
+        title LSH threshold) is kept even when its image score misses
+        ``threshold``, so re-crops with a reused caption still match.
+        """
         similar = []
+        target_title = TitleMinHasher.decode(target_features.get('title_minhash'))
         
         for db_item in db_features:
             similarity_score = 0
@@ -97,16 +141,23 @@ class ImageTemplateDetector:
             # Compare hashes
             for hash_type in self.hash_functions.keys():
                 if hash_type in target_features and hash_type in db_item:
-                    hash1 = imagehash.hex_to_hash(target_features[hash_type])
-                    hash2 = imagehash.hex_to_hash(db_item[hash_type])
+                    hash1 = self._parse_hash(hash_type, target_features[hash_type])
+                    hash2 = self._parse_hash(hash_type, db_item[hash_type])
                     similarity_score += (64 - (hash1 - hash2)) / 64
             
             # Template structure bonus
             if (target_features.get('template_structure') == 
                 db_item.get('template_structure')):
                 similarity_score += 1
+
+            # Near-identical titles catch re-crops the image hashes miss
+            title_similarity = 0.0
+            if target_title is not None and db_item.get('title_minhash'):
+                title_similarity = TitleMinHasher.similarity(
+                    target_title, TitleMinHasher.decode(db_item['title_minhash']))
+                similarity_score += title_similarity
             
-            if similarity_score > threshold:
+            if similarity_score > threshold or title_similarity >= title_threshold:
                 similar.append({
                     'item': db_item,
                     'similarity': similarity_score
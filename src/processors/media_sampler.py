@@ -0,0 +1,172 @@
+# processors/media_sampler.py
+import os
+import tempfile
+import time
+from typing import List, Optional, Sequence
+
+import cv2
+from PIL import Image
+
+# Upper bounds on the work spent on one animated or video post
+MAX_FRAMES = 8                       # frames sampled per item
+MAX_FRAME_SIDE = 512                 # sampled frames are downscaled to fit this box
+MAX_SOURCE_PIXELS = 1920 * 1080      # larger sources are skipped, not decoded
+MAX_SCANNED_FRAMES = 2000            # GIF frames walked to find the frame count
+MEDIA_TIME_BUDGET = 3.0              # seconds of decoding before sampling stops
+
+# Bytes downloaded per kind; animations and videos are range-fetched as a prefix
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+MAX_ANIMATION_BYTES = 8 * 1024 * 1024
+MAX_VIDEO_BYTES = 8 * 1024 * 1024
+
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mov', '.gifv')
+VIDEO_DOMAINS = ('v.redd.it',)
+
+
+def url_media_type(url: str) -> str:
+    """'video', 'animation' or 'image', guessed from the URL before downloading"""
+    path = (url or '').lower().split('?')[0]
+    if path.endswith(VIDEO_EXTENSIONS) or any(domain in path for domain in VIDEO_DOMAINS):
+        return 'video'
+    if path.endswith('.gif'):
+        return 'animation'
+    return 'image'
+
+
+def max_bytes_for(url: str) -> int:
+    return {'video': MAX_VIDEO_BYTES, 'animation': MAX_ANIMATION_BYTES}.get(url_media_type(url), MAX_IMAGE_BYTES)
+
+
+def is_video_container(data: bytes) -> bool:
+    """MP4/MOV (ftyp box) or Matroska/WebM (EBML header)"""
+    return data[4:8] == b'ftyp' or data[:4] == b'\x1a\x45\xdf\xa3'
+
+
+def sample_indices(total: int, count: int = MAX_FRAMES) -> List[int]:
+    """``count`` frame indices spread evenly over ``total`` frames, centred in each slice"""
+    if total <= count:
+        return list(range(total))
+    return [int((k + 0.5) * total / count) for k in range(count)]
+
+
+def _bounded(frame: Image.Image) -> Image.Image:
+    frame = frame.convert('RGB')
+    frame.thumbnail((MAX_FRAME_SIDE, MAX_FRAME_SIDE))
+    return frame
+
+
+def _count_frames(image: Image.Image, deadline: float) -> int:
+    """Frames available, tolerating a truncated (range-fetched) file.
+
+    Never reads ``n_frames``: for GIFs it decodes every frame with no
+    bound. Walking forward stops at the end of the data, at
+    ``MAX_SCANNED_FRAMES`` or at the deadline, whichever comes first.
+    """
+    count = 1
+    while count < MAX_SCANNED_FRAMES and time.monotonic() < deadline:
+        try:
+            image.seek(count)
+        except Exception:
+            break
+        count += 1
+    return count
+
+
+def sample_animation_frames(image: Image.Image, max_frames: int = MAX_FRAMES,
+                            time_budget: float = MEDIA_TIME_BUDGET) -> List[Image.Image]:
+    """Evenly spaced, downscaled frames of an animated GIF/WebP/PNG"""
+    if image.width * image.height > MAX_SOURCE_PIXELS:
+        return []
+    deadline = time.monotonic() + time_budget
+    frames = []
+    for index in sample_indices(_count_frames(image, deadline), max_frames):
+        # Keep the first frame even when the budget is already gone
+        if frames and time.monotonic() > deadline:
+            break
+        try:
+            image.seek(index)
+            frames.append(_bounded(image))
+        except Exception:
+            break  # truncated or corrupt from here on
+    return frames
+
+
+def _read_frame(capture, index: int):
+    capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+    ok, frame = capture.read()
+    return frame if ok else None
+
+
+def _decodable_frames(capture, deadline: float, max_frames: int = MAX_FRAMES) -> int:
+    """Frames the downloaded bytes actually cover.
+
+    The container header reports the full video's frame count even for a
+    prefix, and FFmpeg derives the bitrate from the prefix's own size, so
+    neither tells where the data ends. When the last frame does not decode,
+    bisect for the last one that does, to within a fraction of a sample
+    interval.
+    """
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total <= 1 or _read_frame(capture, total - 1) is not None:
+        return max(total, 1)
+    readable, unreadable = 0, total - 1
+    tolerance = max(total // (4 * max_frames), 1)
+    while unreadable - readable > tolerance and time.monotonic() < deadline:
+        middle = (readable + unreadable) // 2
+        if _read_frame(capture, middle) is not None:
+            readable = middle
+        else:
+            unreadable = middle
+    return readable + 1
+
+
+def sample_video_frames(data: bytes, max_frames: int = MAX_FRAMES,
+                        time_budget: float = MEDIA_TIME_BUDGET) -> List[Image.Image]:
+    """Evenly spaced, downscaled frames of an MP4/WebM (possibly a prefix of one).
+
+    FFmpeg needs a seekable file, so the bytes go to a temporary file and
+    are decoded with one thread. A prefix only decodes when the container
+    index comes first (faststart or fragmented MP4, WebM); otherwise no
+    frames are returned. Samples are spread over the frames the prefix
+    covers, and an index that still fails to decode is skipped.
+    """
+    fd, path = tempfile.mkstemp(suffix='.media')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        capture = cv2.VideoCapture(path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_N_THREADS, 1])
+        try:
+            if not capture.isOpened():
+                return []
+            width = capture.get(cv2.CAP_PROP_FRAME_WIDTH)
+            height = capture.get(cv2.CAP_PROP_FRAME_HEIGHT)
+            if width * height > MAX_SOURCE_PIXELS:
+                return []
+
+            deadline = time.monotonic() + time_budget
+            frames = []
+            for index in sample_indices(_decodable_frames(capture, deadline, max_frames), max_frames):
+                if frames and time.monotonic() > deadline:
+                    break
+                frame = _read_frame(capture, index)
+                if frame is None:
+                    continue  # undecodable; later indices may still read
+                frames.append(_bounded(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))))
+            return frames
+        finally:
+            capture.release()
+    finally:
+        os.remove(path)
+
+
+def majority_hash(hashes: Sequence[str]) -> Optional[str]:
+    """Bitwise majority vote of equal-length hex hashes: one signature for all frames"""
+    if not hashes:
+        return None
+    width = len(hashes[0]) * 4
+    values = [int(value, 16) for value in hashes]
+    result = 0
+    for bit in range(width):
+        if 2 * sum((value >> bit) & 1 for value in values) > len(values):
+            result |= 1 << bit
+    return f"{result:0{len(hashes[0])}x}"
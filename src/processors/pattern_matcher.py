@@ -1,120 +1,175 @@
 # processors/pattern_matcher.py
-from collections import defaultdict
-from datetime import datetime, timedelta
-import math
+from datetime import datetime
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+MOMENTUM_DECAY_HOURS = 24
+EMERGING_THRESHOLD = 0.7
+MAX_MOMENTUM_SCORE = 5.0
+
+
+def _to_epoch(value) -> float:
+    """Convert a datetime or ISO string from any backend to epoch seconds"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+
+class PostFrame:
+    """Columnar in-memory view of posts: one NumPy array per field"""
+
+    def __init__(self, template_hashes: np.ndarray, platforms: np.ndarray,
+                 scores: np.ndarray, timestamps: np.ndarray):
+        self.template_hashes = template_hashes
+        self.platforms = platforms
+        self.scores = scores
+        self.timestamps = timestamps  # epoch seconds
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'PostFrame':
+        """Build a frame from backend rows, grouping by fuzzy cluster when assigned"""
+        rows = [r for r in records if r.get('template_cluster_id') or r.get('template_hash')]
+        return cls(
+            template_hashes=np.array([r.get('template_cluster_id') or r['template_hash'] for r in rows],
+                                     dtype=str),
+            platforms=np.array([r['platform'] for r in rows], dtype=str),
+            scores=np.array([r.get('score') or 0 for r in rows], dtype=np.float64),
+            timestamps=np.array([_to_epoch(r['timestamp']) for r in rows], dtype=np.float64)
+        )
+
 
 class MemePatternMatcher:
-    def __init__(self, neo4j_client):
-        self.db = neo4j_client
-    
-    def detect_emerging_patterns(self, time_window_hours=48):
+    """Cross-platform momentum detection over a columnar post frame.
+
+    The backend only needs to expose ``get_recent_posts(hours)`` and
+    ``get_posts_by_template(template_hash)`` returning row dicts, so the
+    matcher works with SupabaseClient or any other store. Backends that
+    maintain streaming momentum state also expose
+    ``get_emerging_templates(k, window_hours)``.
+    """
+
+    def __init__(self, db_client):
+        self.db = db_client
+
+    def load_frame(self, time_window_hours=48) -> PostFrame:
+        """Load recent posts from the backend into a columnar frame"""
+        return PostFrame.from_records(self.db.get_recent_posts(hours=time_window_hours))
+
+    def detect_emerging_patterns(self, time_window_hours=48, frame: Optional[PostFrame] = None):
         """Trova meme che mostrano momentum cross-platform"""
-        
-        # Query Neo4j per meme recenti
-        query = """
-        MATCH (p:MemePost)
-        WHERE p.timestamp > datetime() - duration({hours: $hours})
-        RETURN p.platform, p.template_hash, p.title, p.score, p.timestamp
-        ORDER BY p.timestamp DESC
-        """
-        
-        results = self.db.run_query(query, hours=time_window_hours)
-        
-        # Group by template
-        template_activity = defaultdict(lambda: {
-            'platforms': set(),
-            'posts': [],
-            'momentum_score': 0,
-            'first_seen': None,
-            'platform_sequence': []
-        })
-        
-        for record in results:
-            template_hash = record['template_hash']
-            platform = record['platform']
-            timestamp = record['timestamp']
-            
-            template_data = template_activity[template_hash]
-            template_data['platforms'].add(platform)
-            template_data['posts'].append(record)
-            
-            if not template_data['first_seen'] or timestamp < template_data['first_seen']:
-                template_data['first_seen'] = timestamp
-            
-            # Track platform sequence
-            template_data['platform_sequence'].append((platform, timestamp))
-        
-        # Calculate momentum scores
+        if frame is None:
+            frame = self.load_frame(time_window_hours)
+        if len(frame) == 0:
+            return []
+
+        stats = self._template_stats(frame, now=time.time())
+        emerging = np.flatnonzero(stats['momentum_score'] > EMERGING_THRESHOLD)
+
+        # Only the (few) emerging templates need per-post sequence analysis
+        order = np.argsort(stats['inverse'], kind='stable')
+        boundaries = np.searchsorted(stats['inverse'][order], emerging)
+
+        emerging_patterns = []
+        for idx, start in zip(emerging, boundaries):
+            members = order[start:start + stats['counts'][idx]]
+            platforms = set(np.unique(frame.platforms[members]).tolist())
+            platform_sequence = list(zip(frame.platforms[members].tolist(),
+                                         frame.timestamps[members].tolist()))
+            emerging_patterns.append({
+                'template_hash': str(stats['templates'][idx]),
+                'momentum_score': float(stats['momentum_score'][idx]),
+                'platforms': list(platforms),
+                'cross_platform': len(platforms) > 1,
+                'platform_sequence': self._analyze_platform_sequence(platform_sequence),
+                'prediction': self._predict_next_platform({'platforms': platforms})
+            })
+
+        return sorted(emerging_patterns,
+                      key=lambda x: x['momentum_score'], reverse=True)
+
+    def get_top_emerging(self, k=20, time_window_hours=48):
+        """Top-K emerging templates from the ingest-time momentum state (no window rescan)"""
         emerging_patterns = []
-        for template_hash, data in template_activity.items():
-            score = self._calculate_momentum_score(data)
-            if score > 0.7:  # Threshold per "emerging"
-                emerging_patterns.append({
-                    'template_hash': template_hash,
-                    'momentum_score': score,
-                    'platforms': list(data['platforms']),
-                    'cross_platform': len(data['platforms']) > 1,
-                    'platform_sequence': self._analyze_platform_sequence(
-                        data['platform_sequence']
-                    ),
-                    'prediction': self._predict_next_platform(data)
-                })
-        
-        return sorted(emerging_patterns, 
-                     key=lambda x: x['momentum_score'], reverse=True)
-    
-    def _calculate_momentum_score(self, template_data):
-        """Calcola score basato su growth rate e cross-platform presence"""
-        posts = template_data['posts']
-        if len(posts) < 2:
-            return 0
-        
-        # Time-weighted score growth
-        now = datetime.now()
-        total_score = 0
-        time_penalty = 0
-        
-        for post in posts:
-            age_hours = (now - post['timestamp']).total_seconds() / 3600
-            # Newer posts get higher weight
-            time_weight = math.exp(-age_hours / 24)  # Decay over 24h
-            total_score += post['score'] * time_weight
-            time_penalty += time_weight
-        
-        if time_penalty == 0:
-            return 0
-        
-        avg_weighted_score = total_score / time_penalty
-        
-        # Cross-platform bonus
-        platform_bonus = len(template_data['platforms']) * 0.3
-        
-        # Velocity bonus (posts frequency)
-        time_span = (max(p['timestamp'] for p in posts) - 
-                    min(p['timestamp'] for p in posts)).total_seconds() / 3600
-        velocity_bonus = len(posts) / max(time_span, 1) if time_span > 0 else 0
-        
-        return min((avg_weighted_score / 1000) + platform_bonus + velocity_bonus, 5.0)
-    
+        for row in self.db.get_emerging_templates(k=k, window_hours=time_window_hours):
+            platforms = set(row['platforms'] or [])
+            emerging_patterns.append({
+                'template_hash': row['template_hash'],
+                'momentum_score': float(row['momentum_score']),
+                'platforms': list(platforms),
+                'cross_platform': len(platforms) > 1,
+                'prediction': self._predict_next_platform({'platforms': platforms})
+            })
+        return emerging_patterns
+
+    def _template_stats(self, frame: PostFrame, now: float) -> Dict[str, np.ndarray]:
+        """Grouped momentum components for every template in one pass"""
+        templates, inverse, counts = np.unique(
+            frame.template_hashes, return_inverse=True, return_counts=True
+        )
+        n_templates = len(templates)
+
+        # Time-weighted score: newer posts get higher weight
+        age_hours = (now - frame.timestamps) / 3600
+        time_weight = np.exp(-age_hours / MOMENTUM_DECAY_HOURS)
+        weighted_score = np.bincount(inverse, weights=frame.scores * time_weight, minlength=n_templates)
+        weight_sum = np.bincount(inverse, weights=time_weight, minlength=n_templates)
+        avg_weighted_score = np.divide(weighted_score, weight_sum,
+                                       out=np.zeros(n_templates), where=weight_sum > 0)
+
+        # Cross-platform bonus: distinct (template, platform) pairs per template
+        _, platform_codes = np.unique(frame.platforms, return_inverse=True)
+        pairs = np.unique(inverse * (platform_codes.max() + 1) + platform_codes)
+        platform_counts = np.bincount(pairs // (platform_codes.max() + 1), minlength=n_templates)
+        platform_bonus = platform_counts * 0.3
+
+        # Velocity bonus (posts frequency over the template's active span)
+        first_seen = np.full(n_templates, np.inf)
+        last_seen = np.full(n_templates, -np.inf)
+        np.minimum.at(first_seen, inverse, frame.timestamps)
+        np.maximum.at(last_seen, inverse, frame.timestamps)
+        time_span = (last_seen - first_seen) / 3600
+        velocity_bonus = np.where(time_span > 0, counts / np.maximum(time_span, 1), 0.0)
+
+        momentum = np.minimum(avg_weighted_score / 1000 + platform_bonus + velocity_bonus,
+                              MAX_MOMENTUM_SCORE)
+        momentum[counts < 2] = 0
+
+        return {
+            'templates': templates,
+            'inverse': inverse,
+            'counts': counts,
+            'platform_counts': platform_counts,
+            'first_seen': first_seen,
+            'last_seen': last_seen,
+            'momentum_score': momentum
+        }
+
     def _analyze_platform_sequence(self, platform_sequence):
         """Analizza la sequenza di platform per identificare pattern"""
         sequence = sorted(platform_sequence, key=lambda x: x[1])
         platforms = [p[0] for p in sequence]
-        
+
         # Common patterns
         if platforms == ['reddit', 'tiktok']:
             return "reddit_to_tiktok_migration"
         elif platforms == ['tiktok', 'instagram']:
-            return "tiktok_to_instagram_expansion" 
+            return "tiktok_to_instagram_expansion"
         elif platforms == ['reddit', 'tiktok', 'instagram']:
             return "full_viral_sequence"
         else:
             return "custom_sequence"
-    
+
     def _predict_next_platform(self, template_data):
         """Predici dove il meme apparirà successivamente"""
         current_platforms = template_data['platforms']
-        
+
         # Simple rule-based prediction
         if 'reddit' in current_platforms and 'tiktok' not in current_platforms:
             return {'next_platform': 'tiktok', 'confidence': 0.7}
@@ -125,20 +180,32 @@ class MemePatternMatcher:
 
     def find_template_evolution(self, template_hash):
         """Traccia come un template evolve nel tempo"""
-        query = """
-        MATCH (p:MemePost {template_hash: $template_hash})
-        RETURN p
-        ORDER BY p.timestamp ASC
-        """
-        
-        posts = self.db.run_query(query, template_hash=template_hash)
-        
+        posts = sorted(self.db.get_posts_by_template(template_hash),
+                       key=lambda p: _to_epoch(p['timestamp']))
+        frame = PostFrame.from_records(posts)
+
         evolution = {
             'original_post': posts[0] if posts else None,
             'variations': len(posts),
-            'platforms_reached': len(set(p['platform'] for p in posts)),
-            'peak_score': max(p['score'] for p in posts) if posts else 0,
-            'lifecycle_stage': self._determine_lifecycle_stage(posts)
+            'platforms_reached': len(np.unique(frame.platforms)),
+            'peak_score': int(frame.scores.max()) if len(frame) else 0,
+            'lifecycle_stage': self._determine_lifecycle_stage(frame)
         }
-        
-        return evolution
\ No newline at end of file
+
+        return evolution
+
+    def _determine_lifecycle_stage(self, frame: PostFrame, now: Optional[float] = None) -> str:
+        """Classify a template by when its posts appeared"""
+        if len(frame) == 0:
+            return 'unknown'
+
+        now = time.time() if now is None else now
+        age_hours = (now - frame.timestamps) / 3600
+
+        if age_hours.max() < 24:
+            return 'emerging'
+        if np.count_nonzero(age_hours < 24) * 2 >= len(frame):
+            return 'growing'
+        if age_hours.min() < 72:
+            return 'mature'
+        return 'declining'
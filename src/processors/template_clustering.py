@@ -0,0 +1,204 @@
+# processors/template_clustering.py
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_HAMMING_RADIUS = 8
+DEFAULT_BANDS = 4
+HASH_BITS = 64
+
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Number of set bits in each element of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _band_layout(bands: int) -> List[Tuple[int, int]]:
+    """(shift, mask) pairs splitting a 64-bit hash into near-equal bands"""
+    layout = []
+    shift = 0
+    for band in range(bands):
+        width = HASH_BITS // bands + (1 if band < HASH_BITS % bands else 0)
+        layout.append((shift, (1 << width) - 1))
+        shift += width
+    return layout
+
+
+class TemplateClusterer:
+    """Incremental union-find clustering of perceptual hashes.
+
+    Hashes within ``radius`` bits of each other share a cluster. Candidate
+    neighbours come from exact matches on one of ``bands`` bit bands, so a
+    lookup touches a bucket instead of every stored hash (recall is exact
+    up to ``bands - 1`` differing bits and probabilistic beyond). The
+    cluster id is the hex hash of the earliest member, which keeps ids
+    stable as clusters grow or merge. When two clusters merge, every member
+    of the absorbed one is re-emitted by ``drain_new_members`` with the
+    surviving id, so persisted assignments follow the merge.
+    """
+
+    def __init__(self, radius: int = DEFAULT_HAMMING_RADIUS, bands: int = DEFAULT_BANDS):
+        self.radius = radius
+        self._layout = _band_layout(bands)
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._layout]
+        self._parent: Dict[int, int] = {}
+        self._order: Dict[int, int] = {}
+        self._members: Dict[int, List[int]] = {}   # root -> every hash in its cluster
+        self._new_members: Dict[int, None] = {}     # hashes whose cluster id is new or changed
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, str]], **kwargs) -> 'TemplateClusterer':
+        """Restore persisted assignments (rows of phash/cluster_id, any order).
+
+        Roots are inserted first, oldest ``first_seen`` first when rows carry
+        it, then members are attached to their stored root, so row order
+        can never split a cluster.
+        """
+        clusterer = cls(**kwargs)
+        rows = list(rows)
+        roots = sorted((row for row in rows if row['phash'] == row['cluster_id']),
+                       key=lambda row: (str(row.get('first_seen') or ''), row['phash']))
+        for row in roots:
+            value = int(row['phash'], 16)
+            if value not in clusterer._parent:
+                clusterer._insert(value)
+        for row in rows:
+            value = int(row['phash'], 16)
+            if value in clusterer._parent:
+                continue
+            root = int(row['cluster_id'], 16)
+            if root not in clusterer._parent:
+                # Root row missing: the id still names the cluster
+                clusterer._insert(root)
+            root = clusterer._find(root)
+            clusterer._insert(value)
+            clusterer._parent[value] = root
+            clusterer._members[root].extend(clusterer._members.pop(value))
+        return clusterer
+
+    def assign(self, phash: Optional[str]) -> Optional[str]:
+        """Return the stable cluster id for a phash, clustering it if unseen"""
+        if not phash:
+            return None
+
+        value = int(phash, 16)
+        if value not in self._parent:
+            candidates = self._candidates(value)
+            self._insert(value)
+            self._new_members[value] = None
+            for candidate in candidates:
+                if bin(value ^ candidate).count('1') <= self.radius:
+                    self._union(value, candidate)
+
+        return self._format(self._find(value))
+
+    def drain_new_members(self) -> List[Dict[str, str]]:
+        """Rows for hashes clustered since the last drain, ready to persist"""
+        rows = [
+            {'phash': self._format(value), 'cluster_id': self._format(self._find(value))}
+            for value in self._new_members
+        ]
+        self._new_members.clear()
+        return rows
+
+    def _candidates(self, value: int) -> set:
+        candidates = set()
+        for buckets, (shift, mask) in zip(self._buckets, self._layout):
+            candidates.update(buckets.get((value >> shift) & mask, ()))
+        return candidates
+
+    def _insert(self, value: int):
+        self._parent[value] = value
+        self._order[value] = len(self._order)
+        self._members[value] = [value]
+        for buckets, (shift, mask) in zip(self._buckets, self._layout):
+            buckets.setdefault((value >> shift) & mask, []).append(value)
+
+    def _find(self, value: int) -> int:
+        root = value
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[value] != root:
+            self._parent[value], value = root, self._parent[value]
+        return root
+
+    def _union(self, a: int, b: int):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return
+        # The earliest-seen root survives so existing cluster ids never change
+        if self._order[root_b] < self._order[root_a]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        absorbed = self._members.pop(root_b)
+        self._members[root_a].extend(absorbed)
+        for member in absorbed:
+            self._new_members[member] = None
+
+    @staticmethod
+    def _format(value: int) -> str:
+        return f"{value:016x}"
+
+
+def bulk_cluster(hashes: np.ndarray, radius: int = DEFAULT_HAMMING_RADIUS,
+                 bands: int = DEFAULT_BANDS) -> np.ndarray:
+    """Offline clustering of unique uint64 hashes ordered by first-seen time.
+
+    Returns the index of each hash's cluster root (its earliest member).
+    Candidate pairs are generated per band by sorting on the band value and
+    pairing elements k positions apart inside equal-value runs, so work is
+    proportional to the number of same-band pairs rather than n^2.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    n = len(hashes)
+    edges_a, edges_b = [], []
+
+    for shift, mask in _band_layout(bands):
+        keys = (hashes >> np.uint64(shift)) & np.uint64(mask)
+        perm = np.argsort(keys, kind='stable')
+        sorted_keys = keys[perm]
+
+        run_start = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        run_length = np.diff(np.r_[run_start, n])
+        offset = np.arange(n) - np.repeat(run_start, run_length)
+        remaining = np.repeat(run_length, run_length) - offset - 1
+
+        positions = np.flatnonzero(remaining > 0)
+        k = 1
+        while len(positions):
+            a = perm[positions]
+            b = perm[positions + k]
+            close = popcount64(hashes[a] ^ hashes[b]) <= radius
+            edges_a.append(a[close])
+            edges_b.append(b[close])
+            k += 1
+            positions = positions[remaining[positions] >= k]
+
+    parent = list(range(n))
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    if edges_a:
+        for a, b in zip(np.concatenate(edges_a).tolist(), np.concatenate(edges_b).tolist()):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                # Lower index == seen earlier, so it stays the root
+                if root_b < root_a:
+                    root_a, root_b = root_b, root_a
+                parent[root_b] = root_a
+
+    return np.array([find(i) for i in range(n)], dtype=np.int64)
@@ -0,0 +1,152 @@
+# processors/text_similarity.py
+import base64
+import re
+import zlib
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_LSH_BANDS = 16   # 16 bands x 4 rows: pairs above ~0.5 Jaccard usually collide
+DEFAULT_SHINGLE_SIZE = 4
+DEFAULT_TITLE_THRESHOLD = 0.6
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _SPACES.sub(' ', _NON_WORD.sub('', title.lower())).strip()
+
+
+def shingles(title: str, size: int = DEFAULT_SHINGLE_SIZE) -> Set[str]:
+    """Character n-grams of the normalized title; short titles are one shingle"""
+    text = normalize_title(title)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class TitleMinHasher:
+    """MinHash signatures of post titles.
+
+    Each title becomes a set of character shingles; the signature keeps,
+    for each of ``num_perm`` universal hash functions, the minimum hash
+    over the set. The fraction of equal positions between two signatures
+    estimates the Jaccard similarity of the titles, so a reworded caption
+    ("when the code works" / "When the code WORKS!!") stays close while a
+    different title does not. Signatures are fixed-size uint32 arrays,
+    stored as base64 in ``meme_posts.title_minhash``.
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE,
+                 seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Odd multipliers keep multiply-add-mod-2^32 a permutation of uint32
+        self._a = rng.integers(1, 2 ** 32, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 32, num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+    def signature(self, title: Optional[str]) -> Optional[np.ndarray]:
+        if not title:
+            return None
+        grams = shingles(title, self.shingle_size)
+        if not grams:
+            return None
+        values = np.array([zlib.crc32(gram.encode('utf-8')) for gram in grams], dtype=np.uint64)
+        hashed = (self._a[:, None] * values[None, :] + self._b[:, None]) & np.uint64(0xFFFFFFFF)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def encode(self, title: Optional[str]) -> Optional[str]:
+        """Signature as stored in the database"""
+        signature = self.signature(title)
+        return base64.b64encode(signature.tobytes()).decode('ascii') if signature is not None else None
+
+    @staticmethod
+    def decode(value: Optional[str]) -> Optional[np.ndarray]:
+        if not value:
+            return None
+        return np.frombuffer(base64.b64decode(value), dtype=np.uint32)
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        if a is None or b is None or len(a) != len(b):
+            return 0.0
+        return float(np.count_nonzero(a == b)) / len(a)
+
+
+class TitleLSH:
+    """Banded LSH index over MinHash signatures.
+
+    Signatures are cut into ``bands`` slices; titles sharing any whole
+    slice land in the same bucket and become candidates, so a query looks
+    at a handful of buckets instead of every stored title. Candidates are
+    then checked against the estimated Jaccard ``threshold``.
+    """
+
+    def __init__(self, bands: int = DEFAULT_LSH_BANDS, threshold: float = DEFAULT_TITLE_THRESHOLD):
+        self.bands = bands
+        self.threshold = threshold
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], key: str = 'id', **kwargs) -> 'TitleLSH':
+        """Index stored posts that have a ``title_minhash``"""
+        index = cls(**kwargs)
+        for row in rows:
+            signature = TitleMinHasher.decode(row.get('title_minhash'))
+            if signature is not None:
+                index.add(row[key], signature)
+        return index
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in np.array_split(signature, self.bands)]
+
+    def add(self, key: Hashable, signature: np.ndarray):
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(band_key, []).append(key)
+
+    def query(self, signature: np.ndarray, threshold: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """Indexed keys whose estimated similarity reaches ``threshold``, most similar first"""
+        threshold = self.threshold if threshold is None else threshold
+        candidates = set()
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(buckets.get(band_key, ()))
+
+        matches = []
+        for key in candidates:
+            score = TitleMinHasher.similarity(signature, self._signatures[key])
+            if score >= threshold:
+                matches.append((key, score))
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+    def near_duplicate_groups(self, threshold: Optional[float] = None) -> List[List[Hashable]]:
+        """Connected groups of indexed titles that are near-duplicates of each other"""
+        parent = {key: key for key in self._signatures}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for key, signature in self._signatures.items():
+            for other, _ in self.query(signature, threshold):
+                root_a, root_b = find(key), find(other)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+
+        groups: Dict[Hashable, List[Hashable]] = {}
+        for key in self._signatures:
+            groups.setdefault(find(key), []).append(key)
+        return [group for group in groups.values() if len(group) > 1]
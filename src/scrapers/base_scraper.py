@@ -8,6 +8,9 @@ logger = logging.getLogger(__name__)
 class ScrapedPost:
     """Standardized post data structure across all platforms"""
 
+    __slots__ = ('platform', 'post_id', 'title', 'url', 'score', 'timestamp',
+                 'author', 'content', 'tags', 'metadata')
+
     def __init__(
         self,
         platform: str,
@@ -55,6 +58,9 @@ class BaseScraper(ABC):
         self.platform_name = config.get('platform_name', 'unknown')
         self.rate_limit = config.get('rate_limit', 60)  # requests per minute
         self.logger = logging.getLogger(f"{__name__}.{self.platform_name}")
+        # Creation times (epoch seconds) of every post the last listing returned,
+        # before any filtering; None when a scraper does not track them
+        self.last_listing_timestamps: Optional[List[float]] = None
 
     @abstractmethod
     def authenticate(self) -> bool:
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from ..core.metrics import credential_events
+
+HEALTHY = 'healthy'
+THROTTLED = 'throttled'
+REVOKED = 'revoked'
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` burst, refilled at ``rate`` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now: Optional[float] = None) -> float:
+        self._refill(time.monotonic() if now is None else now)
+        return self.tokens
+
+    def try_take(self, tokens: float = 1.0) -> bool:
+        if self.available() >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until ``tokens`` will be available"""
+        missing = tokens - self.available()
+        return max(missing / self.rate, 0.0) if self.rate > 0 else float('inf')
+
+
+@dataclass
+class Credential:
+    """One Reddit API app with its own request budget and health"""
+    name: str
+    client_id: str
+    client_secret: str
+    bucket: TokenBucket
+    state: str = HEALTHY
+    throttled_until: float = 0.0
+    client: Optional[object] = field(default=None, repr=False)
+
+    def usable(self, now: float) -> bool:
+        if self.state == THROTTLED and now >= self.throttled_until:
+            self.state = HEALTHY
+        return self.state == HEALTHY
+
+
+class CredentialPool:
+    """Spreads requests over several Reddit apps, each with its own per-minute quota.
+
+    ``acquire`` picks the healthy credential with the most tokens left, so
+    load drifts towards whichever app has headroom. Throttled credentials
+    sit out until their retry-after passes; revoked ones are dropped for
+    the rest of the process.
+    """
+
+    def __init__(self, credentials: List[Credential]):
+        if not credentials:
+            raise ValueError("Credential pool needs at least one credential")
+        self.credentials = credentials
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, requests_per_minute: int = 60) -> 'CredentialPool':
+        """Credentials from REDDIT_CREDENTIALS ("id:secret,id:secret") or the single
+        REDDIT_CLIENT_ID / REDDIT_CLIENT_SECRET pair"""
+        pairs = []
+        for entry in os.getenv('REDDIT_CREDENTIALS', '').split(','):
+            if ':' in entry:
+                client_id, client_secret = entry.strip().split(':', 1)
+                pairs.append((client_id, client_secret))
+        if not pairs:
+            pairs.append((os.getenv('REDDIT_CLIENT_ID'), os.getenv('REDDIT_CLIENT_SECRET')))
+
+        return cls([
+            Credential(
+                name=f"credential-{i}",
+                client_id=client_id,
+                client_secret=client_secret,
+                bucket=TokenBucket(rate=requests_per_minute / 60, capacity=requests_per_minute)
+            )
+            for i, (client_id, client_secret) in enumerate(pairs)
+        ])
+
+    def acquire(self, tokens: float = 1.0, timeout: float = 0.0) -> Optional[Credential]:
+        """Take ``tokens`` from the credential with the most budget left.
+
+        Returns at once by default; with ``timeout`` the calling thread
+        sleeps until the earliest refill or retry-after, for at most that
+        many seconds, so callers on an event loop must run it in an
+        executor. None when every credential is revoked or nothing frees up
+        in time."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                usable = [c for c in self.credentials if c.usable(now)]
+                if usable:
+                    best = max(usable, key=lambda c: c.bucket.available(now))
+                    if best.bucket.try_take(tokens):
+                        return best
+                    wait = min(c.bucket.wait_time(tokens) for c in usable)
+                else:
+                    throttled = [c.throttled_until for c in self.credentials if c.state == THROTTLED]
+                    if not throttled:
+                        return None  # all revoked
+                    wait = min(throttled) - now
+
+            if now + wait > deadline:
+                return None
+            time.sleep(max(wait, 0.01))
+
+    def report_throttled(self, credential: Credential, retry_after: Optional[float] = None):
+        with self._lock:
+            credential.state = THROTTLED
+            credential.throttled_until = time.monotonic() + (retry_after or 60.0)
+            credential.bucket.tokens = 0
+        credential_events.inc(credential=credential.name, event='throttled')
+
+    def report_revoked(self, credential: Credential):
+        with self._lock:
+            credential.state = REVOKED
+            credential.client = None
+        credential_events.inc(credential=credential.name, event='revoked')
+
+    def health(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                c.name: {
+                    'state': HEALTHY if c.usable(now) else c.state,
+                    'tokens': round(c.bucket.available(now), 1)
+                }
+                for c in self.credentials
+            }
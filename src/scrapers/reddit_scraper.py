@@ -1,33 +1,84 @@
 import praw
+from prawcore import exceptions as prawcore_exceptions
 from datetime import datetime
-import os
+import html
+import math
 from typing import List, Optional, Any, Dict
 from dotenv import load_dotenv
 from .base_scraper import BaseScraper, ScrapedPost
+from .credential_pool import Credential, CredentialPool
+from ..core.content_filter import ContentFilter, is_media_url
+from ..core.metrics import credential_events
 
 load_dotenv()
 
+# Errors meaning the app's credentials are no longer accepted
+REVOKED_ERRORS = (prawcore_exceptions.OAuthException, prawcore_exceptions.InvalidToken)
+
+# Seconds a credential sits out after an authentication error that is not a rejection
+AUTH_RETRY_AFTER = 30.0
+
+
+def media_url(post) -> Optional[str]:
+    """Direct media file to analyse when the post URL is a page or a heavy GIF.
+
+    Reads the already-fetched attributes only, so it never triggers a lazy
+    PRAW request.
+    """
+    data = vars(post)
+    media = data.get('secure_media') or data.get('media')
+    if isinstance(media, dict) and media.get('reddit_video'):
+        return media['reddit_video'].get('fallback_url')
+    # Reddit transcodes GIFs to an MP4 variant that is usually far smaller
+    try:
+        return html.unescape(data['preview']['images'][0]['variants']['mp4']['source']['url'])
+    except (KeyError, IndexError, TypeError):
+        return None
+
 class RedditScraper(BaseScraper):
     """Reddit platform scraper implementing BaseScraper interface"""
 
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.reddit = None
-
-    def authenticate(self) -> bool:
-        """Authenticate with Reddit API"""
-        try:
-            self.reddit = praw.Reddit(
-                client_id=os.getenv('REDDIT_CLIENT_ID'),
-                client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
+        self.content_filter = ContentFilter.from_config(config.get('content_filters'))
+        # rate_limit is per app, so every credential gets its own budget
+        self.credential_pool = CredentialPool.from_env(self.rate_limit)
+        # Longest a request waits for a credential's budget to refill
+        self.credential_wait = config.get('credential_wait', 30.0)
+
+    def _client(self, credential: Credential):
+        """praw client for a credential, created on first use"""
+        if credential.client is None:
+            credential.client = praw.Reddit(
+                client_id=credential.client_id,
+                client_secret=credential.client_secret,
                 user_agent=self.config.get('user_agent', 'MemeDetector/1.0')
             )
-            # Test connection
-            self.reddit.user.me()
-            return True
-        except Exception as e:
-            self.logger.error(f"Reddit authentication failed: {e}")
-            return False
+        return credential.client
+
+    def authenticate(self) -> bool:
+        """Authenticate every pooled credential; True if at least one works.
+
+        Only a rejection (REVOKED_ERRORS) drops a credential; throttling,
+        network errors and Reddit outages bench it for a while instead.
+        """
+        for credential in self.credential_pool.credentials:
+            try:
+                client = self._client(credential)
+                # Test connection
+                client.user.me()
+                self.reddit = self.reddit or client
+            except REVOKED_ERRORS as e:
+                self.logger.error(f"Reddit rejected {credential.name}: {e}")
+                self.credential_pool.report_revoked(credential)
+            except prawcore_exceptions.TooManyRequests as e:
+                self.logger.warning(f"{credential.name} throttled during authentication")
+                self.credential_pool.report_throttled(credential, float(e.retry_after) if e.retry_after else None)
+            except Exception as e:
+                self.logger.error(f"Reddit authentication failed for {credential.name}: {e}")
+                self.credential_pool.report_throttled(credential, AUTH_RETRY_AFTER)
+        return self.reddit is not None
 
     def scrape_posts(
         self,
@@ -36,60 +87,89 @@ class RedditScraper(BaseScraper):
         sort_type: str = 'hot',
         **kwargs
     ) -> List[ScrapedPost]:
-        """Scrape posts from a subreddit"""
+        """Scrape posts from a subreddit, failing over between pooled credentials"""
         if not self.reddit:
             if not self.authenticate():
                 return []
 
-        try:
-            subreddit = self.reddit.subreddit(source)
-            posts = []
-
-            # Get posts based on sort type
-            if sort_type == 'hot':
-                post_iterator = subreddit.hot(limit=limit)
-            elif sort_type == 'new':
-                post_iterator = subreddit.new(limit=limit)
-            elif sort_type == 'top':
-                time_filter = kwargs.get('time_filter', 'day')
-                post_iterator = subreddit.top(time_filter=time_filter, limit=limit)
-            else:
-                post_iterator = subreddit.hot(limit=limit)
-
-            posts_found = 0
-            posts_processed = 0
-
-            for post in post_iterator:
-                posts_found += 1
-
-                if self.is_media_post(post):
-                    scraped_post = ScrapedPost(
-                        platform='reddit',
-                        post_id=post.id,
-                        title=post.title,
-                        url=post.url,
-                        score=post.score,
-                        timestamp=datetime.fromtimestamp(post.created_utc),
-                        author=str(post.author) if post.author else None,
-                        content=post.selftext if hasattr(post, 'selftext') else None,
-                        tags=[source],  # subreddit as tag
-                        metadata={
-                            'subreddit': source,
-                            'num_comments': post.num_comments,
-                            'upvote_ratio': getattr(post, 'upvote_ratio', None),
-                            'post_hint': getattr(post, 'post_hint', None),
-                            'sort_type': sort_type
-                        }
-                    )
-                    posts.append(scraped_post)
-                    posts_processed += 1
-
-            self.log_scraping_stats(source, posts_found, posts_processed)
-            return posts
+        # Listings are paged 100 posts per request
+        requests_needed = max(1, math.ceil(limit / 100))
+        for _ in range(len(self.credential_pool.credentials)):
+            credential = self.credential_pool.acquire(requests_needed, timeout=self.credential_wait)
+            if credential is None:
+                self.logger.error(f"No Reddit credential available for r/{source}")
+                return []
 
-        except Exception as e:
-            self.logger.error(f"Failed to scrape r/{source}: {e}")
-            return []
+            try:
+                return self._scrape_listing(self._client(credential), source, limit, sort_type, **kwargs)
+            except prawcore_exceptions.TooManyRequests as e:
+                self.logger.warning(f"{credential.name} throttled on r/{source}, failing over")
+                self.credential_pool.report_throttled(credential, float(e.retry_after) if e.retry_after else None)
+            except REVOKED_ERRORS as e:
+                self.logger.error(f"{credential.name} rejected ({e}), failing over")
+                self.credential_pool.report_revoked(credential)
+            except Exception as e:
+                self.logger.error(f"Failed to scrape r/{source}: {e}")
+                return []
+            credential_events.inc(credential=credential.name, event='failover')
+
+        self.logger.error(f"Every Reddit credential failed for r/{source}")
+        return []
+
+    def _scrape_listing(self, reddit, source: str, limit: int, sort_type: str, **kwargs) -> List[ScrapedPost]:
+        """One listing with one client; API errors propagate for failover"""
+        subreddit = reddit.subreddit(source)
+        posts = []
+
+        # Get posts based on sort type
+        if sort_type == 'hot':
+            post_iterator = subreddit.hot(limit=limit)
+        elif sort_type == 'new':
+            post_iterator = subreddit.new(limit=limit)
+        elif sort_type == 'top':
+            time_filter = kwargs.get('time_filter', 'day')
+            post_iterator = subreddit.top(time_filter=time_filter, limit=limit)
+        else:
+            post_iterator = subreddit.hot(limit=limit)
+
+        posts_found = 0
+        posts_processed = 0
+        self.last_listing_timestamps = []
+
+        for post in post_iterator:
+            posts_found += 1
+            self.last_listing_timestamps.append(post.created_utc)
+
+            # Only media posts are collected; the content filter narrows further.
+            # Drop filtered posts before building anything for them
+            if self.is_media_post(post) and self.content_filter.allows(
+                    post.score, post.title, getattr(post, 'over_18', False),
+                    post.url, getattr(post, 'post_hint', None)):
+                scraped_post = ScrapedPost(
+                    platform='reddit',
+                    post_id=post.id,
+                    title=post.title,
+                    url=post.url,
+                    score=post.score,
+                    timestamp=datetime.fromtimestamp(post.created_utc),
+                    author=str(post.author) if post.author else None,
+                    content=post.selftext if hasattr(post, 'selftext') else None,
+                    tags=[source],  # subreddit as tag
+                    metadata={
+                        'subreddit': source,
+                        'num_comments': post.num_comments,
+                        'upvote_ratio': getattr(post, 'upvote_ratio', None),
+                        'post_hint': getattr(post, 'post_hint', None),
+                        'over_18': getattr(post, 'over_18', False),
+                        'sort_type': sort_type,
+                        'media_url': media_url(post)
+                    }
+                )
+                posts.append(scraped_post)
+                posts_processed += 1
+
+        self.log_scraping_stats(source, posts_found, posts_processed)
+        return posts
 
     def get_post_details(self, post_id: str) -> Optional[ScrapedPost]:
         """Get detailed information for a specific Reddit post"""
@@ -97,8 +177,13 @@ class RedditScraper(BaseScraper):
             if not self.authenticate():
                 return None
 
+        credential = self.credential_pool.acquire(timeout=self.credential_wait)
+        if credential is None:
+            self.logger.error(f"No Reddit credential available for post {post_id}")
+            return None
+
         try:
-            submission = self.reddit.submission(id=post_id)
+            submission = self._client(credential).submission(id=post_id)
 
             if self.is_media_post(submission):
                 return ScrapedPost(
@@ -115,9 +200,18 @@ class RedditScraper(BaseScraper):
                         'subreddit': submission.subreddit.display_name,
                         'num_comments': submission.num_comments,
                         'upvote_ratio': submission.upvote_ratio,
-                        'post_hint': getattr(submission, 'post_hint', None)
+                        'post_hint': getattr(submission, 'post_hint', None),
+                        'media_url': media_url(submission)
                     }
                 )
+        except prawcore_exceptions.TooManyRequests as e:
+            self.credential_pool.report_throttled(credential, float(e.retry_after) if e.retry_after else None)
+            self.logger.error(f"Failed to get Reddit post {post_id}: {e}")
+            return None
+        except REVOKED_ERRORS as e:
+            self.credential_pool.report_revoked(credential)
+            self.logger.error(f"Failed to get Reddit post {post_id}: {e}")
+            return None
         except Exception as e:
             self.logger.error(f"Failed to get Reddit post {post_id}: {e}")
             return None
@@ -125,16 +219,7 @@ class RedditScraper(BaseScraper):
     def is_media_post(self, post_data: Any) -> bool:
         """Check if Reddit post contains image/video content"""
         if hasattr(post_data, 'url'):
-            url = post_data.url.lower()
-            # Direct image/video links
-            if url.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4', '.webm')):
-                return True
-            # Reddit image/video domains
-            if any(domain in url for domain in ['i.redd.it', 'v.redd.it', 'imgur.com']):
-                return True
-            # Check post hint
-            if hasattr(post_data, 'post_hint'):
-                return post_data.post_hint in ['image', 'hosted:video', 'rich:video']
+            return is_media_url(post_data.url, getattr(post_data, 'post_hint', None))
 
         return False
 
@@ -1,17 +1,23 @@
 import os
+import argparse
+import gzip
+from pathlib import Path
 from supabase import create_client, Client
 from datetime import datetime, timedelta
 import json
 from dotenv import load_dotenv
+import numpy as np
+from src.processors.template_clustering import DEFAULT_BANDS, DEFAULT_HAMMING_RADIUS, TemplateClusterer, bulk_cluster
 
 load_dotenv()
 
 class SupabaseClient:
     """Free PostgreSQL alternative to Neo4j"""
 
-    def __init__(self):
+    def __init__(self, service_role: bool = False):
         url = os.getenv('SUPABASE_URL')
-        key = os.getenv('SUPABASE_ANON_KEY')
+        # Partition maintenance (DDL) needs the service role key
+        key = os.getenv('SUPABASE_SERVICE_KEY' if service_role else 'SUPABASE_ANON_KEY')
 
         if not url or not key:
             raise ValueError(f"Missing Supabase credentials. URL: {url}, Key: {'***' if key else None}")
@@ -50,7 +56,7 @@ class SupabaseClient:
             return None
 
     def get_recent_posts(self, hours=24):
-        """Get recent posts"""
+        """Get recent posts (the timestamp bound prunes to the newest partitions)"""
         try:
             result = self.supabase.table('meme_posts').select('*').gte(
                 'timestamp',
@@ -62,6 +68,30 @@ class SupabaseClient:
             print(f"Error fetching posts: {e}")
             return []
 
+    def get_posts_by_template(self, template_hash):
+        """Get all posts in a template cluster (or with that raw hash), oldest first"""
+        try:
+            # Rows stored before clustering have no cluster id, only the hash
+            result = self.supabase.table('meme_posts').select('*').or_(
+                f"template_cluster_id.eq.{template_hash},template_hash.eq.{template_hash}"
+            ).order('timestamp').execute()
+
+            return result.data
+        except Exception as e:
+            print(f"Error fetching template posts: {e}")
+            return []
+
+    def get_emerging_templates(self, k=20, window_hours=48):
+        """Get the top-K templates by current streaming momentum"""
+        try:
+            result = self.supabase.rpc(
+                'get_emerging_templates', {'k': k, 'window_hours': window_hours}
+            ).execute()
+            return result.data or []
+        except Exception as e:
+            print(f"Error fetching emerging templates: {e}")
+            return []
+
     def get_stats(self):
         """Get database statistics"""
         try:
@@ -85,8 +115,12 @@ class SupabaseClient:
             print(f"Error getting stats: {e}")
             return {'total_posts': 0, 'top_posts': [], 'templates': []}
 
-    def bulk_upsert_posts(self, posts_data: list) -> int:
-        """Bulk upsert posts using PostgreSQL UPSERT (ON CONFLICT)"""
+    def bulk_upsert_posts(self, posts_data: list, raise_errors: bool = False) -> int:
+        """Bulk upsert posts using PostgreSQL UPSERT (ON CONFLICT).
+
+        With ``raise_errors`` a failed upsert raises instead of falling back
+        to row-by-row inserts, so a spool drainer can retry the batch.
+        """
         if not posts_data:
             return 0
 
@@ -94,12 +128,14 @@ class SupabaseClient:
             # Use upsert with conflict resolution
             result = self.supabase.table('meme_posts').upsert(
                 posts_data,
-                on_conflict='platform,post_id'
+                on_conflict='platform,post_id,timestamp'
             ).execute()
 
             return len(result.data) if result.data else 0
 
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error bulk upserting posts: {e}")
             # Fallback to individual inserts if bulk fails
             success_count = 0
@@ -118,6 +154,234 @@ class SupabaseClient:
 
             return success_count
 
+    def refresh_subreddit_rollups(self, hours_back: int = 48) -> int:
+        """Recompute hourly per-subreddit rollups for recent hours"""
+        try:
+            result = self.supabase.rpc(
+                'refresh_subreddit_hourly_stats', {'hours_back': hours_back}
+            ).execute()
+            return result.data or 0
+        except Exception as e:
+            print(f"Error refreshing subreddit rollups: {e}")
+            return 0
+
+    def get_subreddit_stats(self, hours=24):
+        """Get hourly per-subreddit rollups for the given window"""
+        try:
+            result = self.supabase.table('subreddit_hourly_stats').select('*').gte(
+                'hour',
+                (datetime.now() - timedelta(hours=hours)).isoformat()
+            ).order('hour', desc=True).execute()
+
+            return result.data
+        except Exception as e:
+            print(f"Error fetching subreddit stats: {e}")
+            return []
+
+    def ensure_partitions(self, months_ahead: int = 3) -> int:
+        """Create upcoming monthly meme_posts partitions (service-role client only)"""
+        try:
+            result = self.supabase.rpc(
+                'ensure_meme_posts_partitions', {'months_back': 0, 'months_ahead': months_ahead}
+            ).execute()
+            return result.data or 0
+        except Exception as e:
+            print(f"Error creating partitions: {e}")
+            return 0
+
+    def archive_partitions(self, older_than_months: int = 6, archive_dir: str = 'archive',
+                           page_size: int = 1000) -> list:
+        """Export monthly partitions older than the cutoff to gzipped JSON lines, then detach them"""
+        now = datetime.now()
+        cutoff_month = now.year * 12 + now.month - 1 - older_than_months
+        cutoff = datetime(cutoff_month // 12, cutoff_month % 12 + 1, 1)
+
+        archived = []
+        try:
+            partitions = self.supabase.rpc('list_meme_posts_partitions', {}).execute().data or []
+        except Exception as e:
+            print(f"Error listing partitions: {e}")
+            return archived
+
+        Path(archive_dir).mkdir(parents=True, exist_ok=True)
+
+        for partition in partitions:
+            name = partition['partition_name']
+            if datetime.fromisoformat(partition['range_start']) >= cutoff:
+                continue
+
+            export_path = Path(archive_dir) / f"{name}.jsonl.gz"
+            try:
+                rows = 0
+                with gzip.open(export_path, 'wt', encoding='utf-8') as f:
+                    for row in self._paginate(name, '*', 'id', page_size):
+                        f.write(json.dumps(row, default=str) + '\n')
+                        rows += 1
+
+                # Only detach once the export is safely on disk
+                self.supabase.rpc(
+                    'detach_meme_posts_partition', {'partition_name': name, 'drop_table': True}
+                ).execute()
+                archived.append({'partition': name, 'rows': rows, 'path': str(export_path)})
+            except Exception as e:
+                print(f"Error archiving partition {name}: {e}")
+
+        return archived
+
+    def get_template_clusters(self, page_size: int = 1000) -> list:
+        """Get every persisted phash -> cluster assignment (TemplateClusterer.from_rows orders them)"""
+        try:
+            return list(self._paginate('template_clusters', 'phash,cluster_id,first_seen', 'phash', page_size))
+        except Exception as e:
+            print(f"Error fetching template clusters: {e}")
+            return []
+
+    def save_template_clusters(self, assignments: list, raise_errors: bool = False) -> int:
+        """Persist new or changed phash -> cluster assignments.
+
+        Goes through ``assign_template_clusters`` so that when a merge
+        re-roots existing hashes, their stored posts follow as well.
+        """
+        if not assignments:
+            return 0
+
+        try:
+            self.supabase.rpc('assign_template_clusters', {'assignments': assignments}).execute()
+            return len(assignments)
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Error saving template clusters: {e}")
+            return 0
+
+    def recluster_templates(self, radius: int = DEFAULT_HAMMING_RADIUS, bands: int = DEFAULT_BANDS,
+                            chunk_size: int = 5000) -> dict:
+        """Offline recluster of every stored phash, then rebuild momentum state"""
+        # meme_posts.id grows with insertion, so id order is first-seen order
+        first_seen = {}
+        for row in self.get_posts_since(0, 'id,template_hash'):
+            if row['template_hash']:
+                first_seen.setdefault(row['template_hash'], None)
+
+        phashes = list(first_seen)
+        hashes = np.array([int(h, 16) for h in phashes], dtype=np.uint64)
+        roots = bulk_cluster(hashes, radius=radius, bands=bands)
+
+        assignments = [
+            {'phash': phash, 'cluster_id': phashes[root]}
+            for phash, root in zip(phashes, roots.tolist())
+        ]
+
+        updated = 0
+        for start in range(0, len(assignments), chunk_size):
+            result = self.supabase.rpc(
+                'assign_template_clusters', {'assignments': assignments[start:start + chunk_size]}
+            ).execute()
+            updated += result.data or 0
+
+        self.supabase.rpc('rebuild_template_momentum', {}).execute()
+
+        return {
+            'hashes': len(phashes),
+            'clusters': len(np.unique(roots)),
+            'posts_updated': updated
+        }
+
+    def cluster_new_templates(self, page_size: int = 1000, chunk_size: int = 5000) -> int:
+        """Assign fuzzy clusters to stored posts that have none yet.
+
+        Sharded runs store posts without a cluster id, since independent
+        shards would mint conflicting ids for the same new template; the
+        merge step calls this once to cluster them against the stored
+        clusters. The momentum trigger moves each re-keyed post into its
+        cluster's momentum row. Returns the number of posts updated; a
+        failed page or chunk raises, and the posts it left unassigned are
+        picked up by the next call.
+        """
+        clusterer = TemplateClusterer.from_rows(self.get_template_clusters())
+        seen = {}
+        last_id = 0
+        # id order is first-seen order, so the oldest hash of a new cluster names it
+        while True:
+            page = self.supabase.table('meme_posts').select('id,template_hash').is_(
+                'template_cluster_id', 'null'
+            ).not_.is_('template_hash', 'null').gt('id', last_id).order('id').limit(page_size).execute().data
+            for row in page:
+                seen.setdefault(row['template_hash'], None)
+                clusterer.assign(row['template_hash'])
+            if len(page) < page_size:
+                break
+            last_id = page[-1]['id']
+
+        # New hashes and re-rooted members, plus known hashes whose new posts lack the id
+        assignments = {row['phash']: row for row in clusterer.drain_new_members()}
+        for phash in seen:
+            assignments.setdefault(phash, {'phash': phash, 'cluster_id': clusterer.assign(phash)})
+        assignments = list(assignments.values())
+
+        updated = 0
+        for start in range(0, len(assignments), chunk_size):
+            result = self.supabase.rpc(
+                'assign_template_clusters', {'assignments': assignments[start:start + chunk_size]}
+            ).execute()
+            updated += result.data or 0
+        return updated
+
+    def get_posts_since(self, last_id: int, columns: str = '*', page_size: int = 1000):
+        """Yield meme_posts rows with id above ``last_id`` in id order (keyset pages).
+
+        A failed page raises rather than ending the iteration early, so
+        callers never mistake a partial read for the complete tail.
+        """
+        while True:
+            page = self.supabase.table('meme_posts').select(columns).gt(
+                'id', last_id
+            ).order('id').limit(page_size).execute().data
+            yield from page
+            if len(page) < page_size:
+                break
+            last_id = page[-1]['id']
+
+    def get_known_post_ids(self, platform: str, post_ids: list, chunk_size: int = 200) -> set:
+        """The subset of ``post_ids`` already stored for a platform"""
+        known = set()
+        try:
+            for start in range(0, len(post_ids), chunk_size):
+                result = self.supabase.table('meme_posts').select('post_id').eq(
+                    'platform', platform
+                ).in_('post_id', post_ids[start:start + chunk_size]).execute()
+                known.update(row['post_id'] for row in result.data)
+        except Exception as e:
+            print(f"Error looking up stored posts: {e}")
+        return known
+
+    def get_posts_by_ids(self, ids: list, chunk_size: int = 200) -> list:
+        """Get posts by meme_posts.id"""
+        posts = []
+        try:
+            for start in range(0, len(ids), chunk_size):
+                result = self.supabase.table('meme_posts').select('*').in_(
+                    'id', ids[start:start + chunk_size]
+                ).execute()
+                posts.extend(result.data)
+            return posts
+        except Exception as e:
+            print(f"Error fetching posts by id: {e}")
+            return posts
+
+    def _paginate(self, table: str, columns: str, key: str, page_size: int = 1000):
+        """Yield every row of a table, keyset-paged on the unique column ``key``"""
+        last = None
+        while True:
+            query = self.supabase.table(table).select(columns)
+            if last is not None:
+                query = query.gt(key, last)
+            page = query.order(key).limit(page_size).execute().data
+            yield from page
+            if len(page) < page_size:
+                break
+            last = page[-1][key]
+
     def export_data(self):
         """Export all data to JSON"""
         try:
@@ -131,32 +395,379 @@ class SupabaseClient:
             print(f"Error exporting: {e}")
             return 0
 
+# Monthly partition management for meme_posts
+PARTITION_FUNCTIONS = """
+-- Create monthly partitions around the current month (idempotent).
+-- Rows inserted before their month existed sit in meme_posts_default, and
+-- attaching a range that matches them fails, so each new month is built as
+-- a standalone table, those rows are moved into it, and it is attached.
+CREATE OR REPLACE FUNCTION ensure_meme_posts_partitions(months_back INTEGER DEFAULT 1, months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    month_start DATE;
+    month_end DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    -- Serialise concurrent callers; the second one then finds the tables
+    PERFORM PG_ADVISORY_XACT_LOCK(HASHTEXT('ensure_meme_posts_partitions'));
+    FOR i IN -months_back..months_ahead LOOP
+        month_start := (DATE_TRUNC('month', NOW()) + MAKE_INTERVAL(months => i))::DATE;
+        month_end := (month_start + INTERVAL '1 month')::DATE;
+        partition_name := FORMAT('meme_posts_%s', TO_CHAR(month_start, 'YYYY_MM'));
+        IF TO_REGCLASS('public.' || partition_name) IS NULL THEN
+            -- Block inserts into the default partition until the month is attached
+            LOCK TABLE meme_posts_default IN ACCESS EXCLUSIVE MODE;
+            EXECUTE FORMAT(
+                'CREATE TABLE %I (LIKE meme_posts INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name
+            );
+            EXECUTE FORMAT(
+                'WITH moved AS (DELETE FROM meme_posts_default WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                month_start, month_end, partition_name
+            );
+            EXECUTE FORMAT(
+                'ALTER TABLE meme_posts ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_end
+            );
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- SECURITY DEFINER runs DDL as the owner, so only the service role may call it
+REVOKE EXECUTE ON FUNCTION ensure_meme_posts_partitions(INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION ensure_meme_posts_partitions(INTEGER, INTEGER) TO service_role;
+
+-- List monthly partitions with their range start and estimated size
+CREATE OR REPLACE FUNCTION list_meme_posts_partitions()
+RETURNS TABLE(partition_name TEXT, range_start DATE, row_estimate BIGINT)
+LANGUAGE SQL
+AS $$
+    SELECT
+        c.relname::TEXT,
+        TO_DATE(RIGHT(c.relname, 7), 'YYYY_MM'),
+        c.reltuples::BIGINT
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'meme_posts'::REGCLASS
+    AND c.relname ~ '^meme_posts_[0-9]{4}_[0-9]{2}$'
+    ORDER BY 2;
+$$;
+
+-- Detach (and optionally drop) an archived monthly partition
+CREATE OR REPLACE FUNCTION detach_meme_posts_partition(partition_name TEXT, drop_table BOOLEAN DEFAULT TRUE)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF partition_name !~ '^meme_posts_[0-9]{4}_[0-9]{2}$' THEN
+        RAISE EXCEPTION 'Not a meme_posts partition: %', partition_name;
+    END IF;
+    EXECUTE FORMAT('ALTER TABLE meme_posts DETACH PARTITION %I', partition_name);
+    IF drop_table THEN
+        EXECUTE FORMAT('DROP TABLE %I', partition_name);
+    END IF;
+    RETURN TRUE;
+END;
+$$;
+
+-- Retention is an operator task: only the service role may detach partitions
+REVOKE EXECUTE ON FUNCTION detach_meme_posts_partition(TEXT, BOOLEAN) FROM PUBLIC, anon, authenticated;
+"""
+
+# Fuzzy template clusters: every distinct phash maps to the stable id of
+# its cluster (see src/processors/template_clustering.py)
+TEMPLATE_CLUSTER_SQL = """
+CREATE TABLE template_clusters (
+    phash TEXT PRIMARY KEY,
+    cluster_id TEXT NOT NULL,
+    first_seen TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX idx_template_clusters_cluster ON template_clusters(cluster_id);
+
+-- Apply offline recluster results: [{"phash": ..., "cluster_id": ...}, ...]
+CREATE OR REPLACE FUNCTION assign_template_clusters(assignments JSONB)
+RETURNS INTEGER
+LANGUAGE SQL
+AS $$
+    INSERT INTO template_clusters (phash, cluster_id)
+    SELECT phash, cluster_id FROM JSONB_TO_RECORDSET(assignments) AS a(phash TEXT, cluster_id TEXT)
+    ON CONFLICT (phash) DO UPDATE SET cluster_id = EXCLUDED.cluster_id;
+
+    WITH updated AS (
+        UPDATE meme_posts mp SET template_cluster_id = a.cluster_id
+        FROM JSONB_TO_RECORDSET(assignments) AS a(phash TEXT, cluster_id TEXT)
+        WHERE mp.template_hash = a.phash
+        AND mp.template_cluster_id IS DISTINCT FROM a.cluster_id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
+"""
+
+# Momentum trigger, shared by the schema and its migration. A post that
+# changes template (a cluster assignment) moves between momentum rows;
+# first_seen/last_seen/platforms of the row it leaves are not shrunk, which
+# rebuild_template_momentum() corrects.
+TEMPLATE_MOMENTUM_TRIGGER = """
+CREATE OR REPLACE FUNCTION update_template_momentum()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    template_key TEXT := COALESCE(NEW.template_cluster_id, NEW.template_hash);
+    old_key TEXT;
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        old_key := COALESCE(OLD.template_cluster_id, OLD.template_hash);
+
+        IF old_key IS NOT DISTINCT FROM template_key THEN
+            IF template_key IS NOT NULL AND NEW.score IS DISTINCT FROM OLD.score THEN
+                -- Re-scraped post: fold the score delta in at the post's own age
+                UPDATE template_momentum SET
+                    decayed_score = decayed_score + (COALESCE(NEW.score, 0) - COALESCE(OLD.score, 0))
+                        * EXP(-GREATEST(EXTRACT(EPOCH FROM last_update - NEW.timestamp), 0) / 86400)
+                WHERE template_hash = template_key;
+            END IF;
+            RETURN NULL;
+        END IF;
+
+        -- Reclustered post: take it out of its old template at its old
+        -- score, then add it to the new one below as if freshly inserted
+        IF old_key IS NOT NULL THEN
+            UPDATE template_momentum SET
+                decayed_score = decayed_score - COALESCE(OLD.score, 0)
+                    * EXP(-GREATEST(EXTRACT(EPOCH FROM last_update - OLD.timestamp), 0) / 86400),
+                decayed_count = decayed_count
+                    - EXP(-GREATEST(EXTRACT(EPOCH FROM last_update - OLD.timestamp), 0) / 86400),
+                post_count = post_count - 1
+            WHERE template_hash = old_key;
+            DELETE FROM template_momentum WHERE template_hash = old_key AND post_count <= 0;
+        END IF;
+    END IF;
+
+    IF template_key IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO template_momentum AS tm
+        (template_hash, decayed_score, decayed_count, post_count, first_seen, last_seen, platforms, last_update)
+    VALUES
+        (template_key, COALESCE(NEW.score, 0), 1, 1, NEW.timestamp, NEW.timestamp, ARRAY[NEW.platform], NEW.timestamp)
+    ON CONFLICT (template_hash) DO UPDATE SET
+        decayed_score =
+            tm.decayed_score * EXP(-GREATEST(EXTRACT(EPOCH FROM EXCLUDED.last_update - tm.last_update), 0) / 86400)
+            + EXCLUDED.decayed_score * EXP(-GREATEST(EXTRACT(EPOCH FROM tm.last_update - EXCLUDED.last_update), 0) / 86400),
+        decayed_count =
+            tm.decayed_count * EXP(-GREATEST(EXTRACT(EPOCH FROM EXCLUDED.last_update - tm.last_update), 0) / 86400)
+            + EXCLUDED.decayed_count * EXP(-GREATEST(EXTRACT(EPOCH FROM tm.last_update - EXCLUDED.last_update), 0) / 86400),
+        post_count = tm.post_count + 1,
+        first_seen = LEAST(tm.first_seen, EXCLUDED.first_seen),
+        last_seen = GREATEST(tm.last_seen, EXCLUDED.last_seen),
+        platforms = CASE
+            WHEN NEW.platform = ANY(tm.platforms) THEN tm.platforms
+            ELSE tm.platforms || NEW.platform
+        END,
+        last_update = GREATEST(tm.last_update, EXCLUDED.last_update);
+
+    RETURN NULL;
+END;
+$$;
+
+-- Cluster assignments re-key posts, so the trigger watches the cluster id too
+DROP TRIGGER IF EXISTS trg_meme_posts_momentum ON meme_posts;
+CREATE TRIGGER trg_meme_posts_momentum
+AFTER INSERT OR UPDATE OF score, template_cluster_id ON meme_posts
+FOR EACH ROW EXECUTE FUNCTION update_template_momentum();
+
+"""
+
+# Streaming per-template momentum, maintained by triggers at ingest.
+# Sums are stored decayed to last_update (24h time constant); merging a
+# post rescales whichever side is older, so updates are O(1) and
+# tolerate out-of-order timestamps.
+TEMPLATE_MOMENTUM_SQL = """
+CREATE TABLE template_momentum (
+    template_hash TEXT PRIMARY KEY,
+    decayed_score DOUBLE PRECISION NOT NULL,
+    decayed_count DOUBLE PRECISION NOT NULL,
+    post_count INTEGER NOT NULL,
+    first_seen TIMESTAMP NOT NULL,
+    last_seen TIMESTAMP NOT NULL,
+    platforms TEXT[] NOT NULL,
+    last_update TIMESTAMP NOT NULL
+);
+
+CREATE INDEX idx_template_momentum_last_seen ON template_momentum(last_seen DESC);
+
+""" + TEMPLATE_MOMENTUM_TRIGGER + """
+-- Recompute momentum state from scratch (after backfills or reclustering)
+CREATE OR REPLACE FUNCTION rebuild_template_momentum()
+RETURNS INTEGER
+LANGUAGE SQL
+AS $$
+    DELETE FROM template_momentum;
+    INSERT INTO template_momentum
+        (template_hash, decayed_score, decayed_count, post_count, first_seen, last_seen, platforms, last_update)
+    SELECT
+        template_key,
+        SUM(COALESCE(score, 0) * EXP(-EXTRACT(EPOCH FROM last_ts - timestamp) / 86400)),
+        SUM(EXP(-EXTRACT(EPOCH FROM last_ts - timestamp) / 86400)),
+        COUNT(*),
+        MIN(timestamp),
+        MAX(timestamp),
+        ARRAY_AGG(DISTINCT platform),
+        MAX(timestamp)
+    FROM (
+        SELECT
+            COALESCE(template_cluster_id, template_hash) AS template_key,
+            score,
+            platform,
+            timestamp,
+            MAX(timestamp) OVER (PARTITION BY COALESCE(template_cluster_id, template_hash)) AS last_ts
+        FROM meme_posts
+        WHERE COALESCE(template_cluster_id, template_hash) IS NOT NULL
+    ) posts
+    GROUP BY template_key;
+    SELECT COUNT(*)::INTEGER FROM template_momentum;
+$$;
+
+-- Top-K emerging templates read straight from the momentum state
+CREATE OR REPLACE FUNCTION get_emerging_templates(k INTEGER DEFAULT 20, window_hours INTEGER DEFAULT 48, min_momentum DOUBLE PRECISION DEFAULT 0.7)
+RETURNS TABLE(template_hash TEXT, momentum_score DOUBLE PRECISION, post_count INTEGER, platforms TEXT[], first_seen TIMESTAMP, last_seen TIMESTAMP)
+LANGUAGE SQL
+STABLE
+AS $$
+    SELECT * FROM (
+        SELECT
+            tm.template_hash,
+            LEAST(
+                tm.decayed_score / NULLIF(tm.decayed_count, 0) / 1000
+                + CARDINALITY(tm.platforms) * 0.3
+                + CASE WHEN tm.last_seen > tm.first_seen THEN
+                    tm.decayed_count * EXP(-EXTRACT(EPOCH FROM NOW() - tm.last_update) / 86400)
+                    / GREATEST(LEAST(EXTRACT(EPOCH FROM tm.last_seen - tm.first_seen) / 3600, 24), 1)
+                  ELSE 0 END,
+                5.0
+            ) AS momentum_score,
+            tm.post_count,
+            tm.platforms,
+            tm.first_seen,
+            tm.last_seen
+        FROM template_momentum tm
+        WHERE tm.last_seen > NOW() - INTERVAL '1 hour' * window_hours
+        AND tm.post_count >= 2
+    ) scored
+    WHERE scored.momentum_score > min_momentum
+    ORDER BY scored.momentum_score DESC
+    LIMIT k;
+$$;
+"""
+
+# Per-subreddit hourly rollup refresh, shared by the schema and its migration
+SUBREDDIT_ROLLUP_FUNCTION = """
+-- Recompute rollups for the hours touched by recent posts. The window
+-- starts on an hour boundary: a mid-hour start would rewrite the oldest
+-- hour's rollup from only the posts after that instant.
+CREATE OR REPLACE FUNCTION refresh_subreddit_hourly_stats(hours_back INTEGER DEFAULT 48)
+RETURNS INTEGER
+LANGUAGE SQL
+AS $$
+    WITH upserted AS (
+        INSERT INTO subreddit_hourly_stats (subreddit, hour, post_count, avg_score, avg_comments, velocity, updated_at)
+        SELECT
+            subreddit,
+            DATE_TRUNC('hour', timestamp) AS hour,
+            COUNT(*) AS post_count,
+            AVG(score) AS avg_score,
+            AVG(num_comments) AS avg_comments,
+            AVG(score::NUMERIC / GREATEST(EXTRACT(EPOCH FROM (NOW() - timestamp)) / 3600, 1)) AS velocity,
+            NOW()
+        FROM meme_posts
+        WHERE subreddit IS NOT NULL
+        AND timestamp >= DATE_TRUNC('hour', NOW() - INTERVAL '1 hour' * hours_back)
+        GROUP BY subreddit, DATE_TRUNC('hour', timestamp)
+        ON CONFLICT (subreddit, hour) DO UPDATE SET
+            post_count = EXCLUDED.post_count,
+            avg_score = EXCLUDED.avg_score,
+            avg_comments = EXCLUDED.avg_comments,
+            velocity = EXCLUDED.velocity,
+            updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM upserted;
+$$;
+"""
+
 # SQL schema for Supabase
 SUPABASE_SCHEMA = """
--- Create meme_posts table
+-- Create meme_posts table, range-partitioned by month on timestamp.
+-- Partitioned tables need the partition key in every unique constraint,
+-- so upserts conflict on (platform, post_id, timestamp).
 CREATE TABLE meme_posts (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     platform TEXT NOT NULL,
     post_id TEXT NOT NULL,
     title TEXT,
     score INTEGER,
     url TEXT,
-    timestamp TIMESTAMP,
+    timestamp TIMESTAMP NOT NULL,
+    subreddit TEXT,
+    num_comments INTEGER,
+    upvote_ratio REAL,
+    post_hint TEXT,
     template_hash TEXT,
+    template_cluster_id TEXT,
     phash TEXT,
     dhash TEXT,
     whash TEXT,
     colorhash TEXT,
     template_structure TEXT,
+    title_minhash TEXT,
+    media_type TEXT,
+    frame_phashes TEXT[],
     created_at TIMESTAMP DEFAULT NOW(),
-    UNIQUE(platform, post_id)
-);
+    PRIMARY KEY (id, timestamp),
+    UNIQUE(platform, post_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Catch-all for rows outside the managed monthly range
+CREATE TABLE meme_posts_default PARTITION OF meme_posts DEFAULT;
+""" + PARTITION_FUNCTIONS + """
+SELECT ensure_meme_posts_partitions(1, 3);
 
--- Create index for faster queries
-CREATE INDEX idx_meme_posts_timestamp ON meme_posts(timestamp DESC);
+-- Indexes are created on every partition. Timestamps arrive in
+-- insertion order, so a BRIN index is enough for range pruning within
+-- a partition and costs almost nothing to maintain at ingest.
+CREATE INDEX idx_meme_posts_timestamp_brin ON meme_posts USING BRIN (timestamp) WITH (pages_per_range = 32);
 CREATE INDEX idx_meme_posts_score ON meme_posts(score DESC);
 CREATE INDEX idx_meme_posts_template ON meme_posts(template_hash);
+CREATE INDEX idx_meme_posts_cluster ON meme_posts(template_cluster_id);
+CREATE INDEX idx_meme_posts_subreddit_time ON meme_posts(subreddit, timestamp DESC);
+""" + TEMPLATE_CLUSTER_SQL + """
+-- Hourly per-subreddit rollups (refreshed after every collection run)
+CREATE TABLE subreddit_hourly_stats (
+    subreddit TEXT NOT NULL,
+    hour TIMESTAMP NOT NULL,
+    post_count INTEGER NOT NULL,
+    avg_score NUMERIC,
+    avg_comments NUMERIC,
+    velocity NUMERIC,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (subreddit, hour)
+);
 
+CREATE INDEX idx_subreddit_hourly_stats_hour ON subreddit_hourly_stats(hour DESC);
+""" + SUBREDDIT_ROLLUP_FUNCTION + """
+""" + TEMPLATE_MOMENTUM_SQL + """
 -- Function for template stats
 CREATE OR REPLACE FUNCTION get_template_stats()
 RETURNS TABLE(template_structure TEXT, count BIGINT, avg_score NUMERIC)
@@ -174,4 +785,123 @@ $$;
 
 -- Enable Row Level Security (optional)
 ALTER TABLE meme_posts ENABLE ROW LEVEL SECURITY;
-"""
\ No newline at end of file
+"""
+
+# Migration for databases created before engagement metadata was persisted
+SUBREDDIT_METADATA_MIGRATION = """
+ALTER TABLE meme_posts ADD COLUMN IF NOT EXISTS subreddit TEXT;
+ALTER TABLE meme_posts ADD COLUMN IF NOT EXISTS num_comments INTEGER;
+ALTER TABLE meme_posts ADD COLUMN IF NOT EXISTS upvote_ratio REAL;
+ALTER TABLE meme_posts ADD COLUMN IF NOT EXISTS post_hint TEXT;
+CREATE INDEX IF NOT EXISTS idx_meme_posts_subreddit_time ON meme_posts(subreddit, timestamp DESC);
+"""
+
+# Migration from the single heap meme_posts table to monthly partitions.
+# Views bind to the renamed legacy table, so re-run
+# sql/analytics_queries.sql afterwards; drop meme_posts_legacy once verified.
+PARTITIONING_MIGRATION = """
+BEGIN;
+
+ALTER TABLE meme_posts RENAME TO meme_posts_legacy;
+ALTER INDEX idx_meme_posts_timestamp RENAME TO idx_meme_posts_legacy_timestamp;
+ALTER INDEX idx_meme_posts_score RENAME TO idx_meme_posts_legacy_score;
+ALTER INDEX idx_meme_posts_template RENAME TO idx_meme_posts_legacy_template;
+ALTER INDEX IF EXISTS idx_meme_posts_subreddit_time RENAME TO idx_meme_posts_legacy_subreddit_time;
+
+CREATE TABLE meme_posts (LIKE meme_posts_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp);
+ALTER TABLE meme_posts ALTER COLUMN id TYPE BIGINT;
+ALTER TABLE meme_posts ALTER COLUMN id SET DEFAULT NEXTVAL('meme_posts_id_seq');
+ALTER TABLE meme_posts ALTER COLUMN timestamp SET NOT NULL;
+ALTER TABLE meme_posts ADD PRIMARY KEY (id, timestamp);
+ALTER TABLE meme_posts ADD UNIQUE (platform, post_id, timestamp);
+ALTER SEQUENCE meme_posts_id_seq OWNED BY meme_posts.id;
+CREATE TABLE meme_posts_default PARTITION OF meme_posts DEFAULT;
+""" + PARTITION_FUNCTIONS + """
+SELECT ensure_meme_posts_partitions(
+    COALESCE((
+        SELECT (EXTRACT(YEAR FROM AGE(DATE_TRUNC('month', NOW()), DATE_TRUNC('month', MIN(timestamp)))) * 12
+              + EXTRACT(MONTH FROM AGE(DATE_TRUNC('month', NOW()), DATE_TRUNC('month', MIN(timestamp)))))::INTEGER
+        FROM meme_posts_legacy
+    ), 1),
+    3
+);
+
+INSERT INTO meme_posts SELECT * FROM meme_posts_legacy WHERE timestamp IS NOT NULL;
+
+CREATE INDEX idx_meme_posts_timestamp_brin ON meme_posts USING BRIN (timestamp) WITH (pages_per_range = 32);
+CREATE INDEX idx_meme_posts_score ON meme_posts(score DESC);
+CREATE INDEX idx_meme_posts_template ON meme_posts(template_hash);
+CREATE INDEX idx_meme_posts_subreddit_time ON meme_posts(subreddit, timestamp DESC);
+
+ALTER TABLE meme_posts ENABLE ROW LEVEL SECURITY;
+
+COMMIT;
+"""
+
+# Add fuzzy clustering to existing databases, then run
+# 'python supabase_setup.py recluster' to assign ids to stored posts
+TEMPLATE_CLUSTER_MIGRATION = """
+ALTER TABLE meme_posts ADD COLUMN IF NOT EXISTS template_cluster_id TEXT;
+CREATE INDEX IF NOT EXISTS idx_meme_posts_cluster ON meme_posts(template_cluster_id);
+""" + TEMPLATE_CLUSTER_SQL
+
+# Backfill momentum state for databases created before the trigger existed
+# (apply TEMPLATE_CLUSTER_MIGRATION first)
+TEMPLATE_MOMENTUM_MIGRATION = TEMPLATE_MOMENTUM_SQL + """
+SELECT rebuild_template_momentum();
+"""
+
+# Databases whose momentum trigger ignored template_cluster_id changes:
+# reclustered posts kept counting toward their raw template_hash
+TEMPLATE_MOMENTUM_TRIGGER_MIGRATION = TEMPLATE_MOMENTUM_TRIGGER + """
+SELECT rebuild_template_momentum();
+"""
+
+# Title MinHash signatures for near-duplicate detection; older rows stay
+# NULL and are simply skipped by the title index
+TITLE_MINHASH_MIGRATION = """
+ALTER TABLE meme_posts ADD COLUMN IF NOT EXISTS title_minhash TEXT;
+"""
+
+# Media type and sampled frame hashes of GIF/video posts; older rows stay
+# NULL (stills analysed before this had no frames)
+MEDIA_FRAMES_MIGRATION = """
+ALTER TABLE meme_posts ADD COLUMN IF NOT EXISTS media_type TEXT;
+ALTER TABLE meme_posts ADD COLUMN IF NOT EXISTS frame_phashes TEXT[];
+"""
+
+# Databases created before ensure_meme_posts_partitions moved rows out of
+# the default partition and was restricted to the service role
+PARTITION_FUNCTIONS_MIGRATION = PARTITION_FUNCTIONS
+
+# Databases created before the rollup window was aligned to whole hours
+SUBREDDIT_ROLLUP_MIGRATION = SUBREDDIT_ROLLUP_FUNCTION
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MemeDoc database maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    partitions_parser = subparsers.add_parser('partitions', help="Create upcoming monthly partitions")
+    partitions_parser.add_argument('--months-ahead', type=int, default=3)
+
+    archive_parser = subparsers.add_parser('archive', help="Export and detach old monthly partitions")
+    archive_parser.add_argument('--older-than-months', type=int, default=6)
+    archive_parser.add_argument('--output-dir', default='archive')
+
+    recluster_parser = subparsers.add_parser('recluster', help="Rebuild fuzzy template clusters offline")
+    recluster_parser.add_argument('--radius', type=int, default=DEFAULT_HAMMING_RADIUS)
+    recluster_parser.add_argument('--bands', type=int, default=DEFAULT_BANDS)
+
+    args = parser.parse_args()
+    client = SupabaseClient(service_role=True)
+
+    if args.command == 'partitions':
+        print(f"Created {client.ensure_partitions(args.months_ahead)} partitions")
+    elif args.command == 'archive':
+        for entry in client.archive_partitions(args.older_than_months, args.output_dir):
+            print(f"Archived {entry['partition']}: {entry['rows']} rows -> {entry['path']}")
+    elif args.command == 'recluster':
+        result = client.recluster_templates(args.radius, args.bands)
+        print(f"Clustered {result['hashes']} hashes into {result['clusters']} templates "
+              f"({result['posts_updated']} posts updated)")
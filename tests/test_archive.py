@@ -0,0 +1,76 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from src.core.archive import RecordingScraper, ReplayScraper, RunArchive
+from src.scrapers.base_scraper import ScrapedPost
+
+
+def _post(post_id):
+    return ScrapedPost('reddit', post_id, f"title {post_id}", f"https://i.redd.it/{post_id}.jpg", 10,
+                       datetime(2026, 10, 1, 12, tzinfo=timezone.utc), metadata={'subreddit': 'memes'})
+
+
+class _Scraper:
+    platform_name = 'reddit'
+
+    def __init__(self):
+        self.calls = 0
+
+    def scrape_posts(self, source, limit=100, **kwargs):
+        self.calls += 1
+        return [_post(f"{source}-{self.calls}-{i}") for i in range(limit)]
+
+
+def test_recorded_listings_and_media_replay_in_order(tmp_path):
+    archive = RunArchive.record(str(tmp_path))
+    recording = RecordingScraper(_Scraper(), archive)
+    recording.scrape_posts('memes', limit=2)
+    recording.scrape_posts('memes', limit=1)
+    archive.put_media('https://i.redd.it/a.jpg', b'image bytes')
+    archive.put_media('https://i.redd.it/copy.jpg', b'image bytes')
+    archive.put_media('https://i.redd.it/broken.jpg', None)
+    archive.save()
+
+    replay = ReplayScraper(RunArchive.open(str(tmp_path)))
+    first = replay.scrape_posts('memes', limit=100)
+    assert [post.post_id for post in first] == ['memes-1-0', 'memes-1-1']
+    assert first[0].timestamp == datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+    assert first[0].metadata == {'subreddit': 'memes'}
+    assert [post.post_id for post in replay.scrape_posts('memes')] == ['memes-2-0']
+    assert replay.scrape_posts('memes') == []
+    assert replay.scrape_posts('dankmemes') == []
+
+    reopened = replay.archive
+    assert reopened.get_media('https://i.redd.it/copy.jpg') == b'image bytes'
+    assert reopened.get_media('https://i.redd.it/broken.jpg') is None
+    assert reopened.get_media('https://i.redd.it/never.jpg') is None
+    info = reopened.info()
+    assert (info['listings'], info['posts'], info['urls'], info['blobs']) == (2, 3, 3, 1)
+
+
+def test_recording_again_appends_to_the_archive(tmp_path):
+    archive = RunArchive.record(str(tmp_path))
+    archive.put_listing('reddit', 'memes', 1, [_post('a')])
+    archive.save()
+
+    archive = RunArchive.record(str(tmp_path))
+    assert not archive.replay
+    archive.put_listing('reddit', 'memes', 1, [_post('b')])
+    archive.save()
+    assert [posts[0].post_id for _, _, posts in RunArchive.open(str(tmp_path)).iter_listings()] == ['a', 'b']
+
+
+def test_open_rejects_other_format_versions(tmp_path):
+    archive = RunArchive.record(str(tmp_path))
+    archive.save()
+    index = tmp_path / 'index.json.gz'
+    with gzip.open(index, 'rt') as f:
+        data = json.load(f)
+    data['format_version'] = 0
+    with gzip.open(index, 'wt') as f:
+        json.dump(data, f)
+    with pytest.raises(ValueError):
+        RunArchive.open(str(tmp_path))
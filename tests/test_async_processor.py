@@ -0,0 +1,40 @@
+import asyncio
+from datetime import datetime
+
+from src.core.async_processor import AsyncProcessor
+from src.scrapers.base_scraper import ScrapedPost
+
+
+class _Storage:
+    def __init__(self, known):
+        self.known = set(known)
+
+    def get_known_post_ids(self, platform, post_ids):
+        return {post_id for post_id in post_ids if post_id in self.known}
+
+    def bulk_upsert_posts(self, rows):
+        return len(rows)
+
+
+class _Analyzer:
+    def extract_features_from_bytes(self, data):
+        return {'phash': '00000000000000ff'}
+
+
+def _posts(count):
+    return [ScrapedPost('reddit', f"p{i}", 'title', f"https://i.redd.it/{i}.jpg", 10, datetime(2026, 10, 1))
+            for i in range(count)]
+
+
+def test_known_posts_are_written_but_not_counted_as_new():
+    async def run():
+        async with AsyncProcessor(max_workers=2, max_concurrent_downloads=2) as processor:
+            async def download(url):
+                return b'media'
+            processor._download_image = download
+            return await processor.process_posts_batch(_posts(3), _Analyzer(), _Storage({'p1'}), flush_size=2)
+
+    stats = asyncio.run(run())
+    assert stats['successful'] == 3
+    assert stats['written'] == 3
+    assert stats['new_posts'] == 2
@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+import time
+
+from src.core.config_manager import ConfigManager
+from src.core.metrics import cache_events
+
+
+def _write(config_dir, name='reddit', **overrides):
+    config = {'platform_name': name, 'enabled': True, 'rate_limit': 60, 'daily_limit': 1000, **overrides}
+    path = config_dir / f"{name}.json"
+    path.write_text(json.dumps(config))
+    # A rewrite within the filesystem's mtime resolution must still be seen
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_refresh_publishes_a_new_snapshot_and_leaves_the_old_one_intact(tmp_path):
+    _write(tmp_path, rate_limit=60)
+    manager = ConfigManager(str(tmp_path), check_interval=3600)
+    old = manager.snapshot
+    assert old.platforms['reddit'].rate_limit == 60
+
+    _write(tmp_path, rate_limit=90, daily_limit=2000)
+    assert manager.snapshot is old  # not due for a stat check yet
+    new = manager._refresh()
+    assert new is not old and manager.snapshot is new
+    assert new.platforms['reddit'].rate_limit == 90
+    assert old.platforms['reddit'].rate_limit == 60
+
+
+def test_unchanged_files_keep_the_same_platform_mapping(tmp_path):
+    _write(tmp_path)
+    manager = ConfigManager(str(tmp_path), check_interval=3600)
+    first = manager._refresh()
+    assert manager._refresh().platforms is first.platforms
+
+
+def test_invalid_rewrite_keeps_serving_the_last_good_config(tmp_path):
+    _write(tmp_path, rate_limit=60)
+    manager = ConfigManager(str(tmp_path), check_interval=3600)
+    manager._refresh()
+    _write(tmp_path, rate_limit=-1)
+    assert manager._refresh().platforms['reddit'].rate_limit == 60
+
+
+def test_watcher_pushes_reloads_into_the_snapshot(tmp_path):
+    _write(tmp_path, enabled=True)
+    manager = ConfigManager(str(tmp_path), check_interval=3600)
+    manager.start_watcher(interval=0.01)
+    try:
+        assert manager.get_all_enabled_platforms() == ['reddit']
+        _write(tmp_path, enabled=False)
+        deadline = time.monotonic() + 5
+        while manager.get_all_enabled_platforms() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert manager.get_all_enabled_platforms() == []
+    finally:
+        manager.stop_watcher()
+    assert manager._watcher is None
+
+
+def test_hits_from_many_threads_are_all_counted(tmp_path):
+    _write(tmp_path)
+    manager = ConfigManager(str(tmp_path), check_interval=3600)
+    manager._refresh()
+    before = cache_events.get(cache='platform_config', result='hit')
+
+    def read():
+        for _ in range(1000):
+            manager.get_platform_config('reddit')
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache_events.get(cache='platform_config', result='hit') - before == 4000
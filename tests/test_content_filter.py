@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from src.core.content_filter import ContentFilter, is_media_url
+from src.core.post_batch import PostBatch
+from src.scrapers.base_scraper import ScrapedPost
+
+
+def test_media_urls_are_recognised_by_extension_domain_or_hint():
+    assert is_media_url('https://example.com/a.PNG')
+    assert is_media_url('https://v.redd.it/abc')
+    assert is_media_url('https://example.com/post', post_hint='image')
+    assert not is_media_url('https://example.com/post')
+
+
+def test_first_failing_check_names_the_rejection():
+    content_filter = ContentFilter.from_config({'min_score': 10, 'exclude_nsfw': True, 'max_title_length': 5})
+    media = 'https://i.redd.it/a.jpg'
+    assert content_filter.rejection(5, 'ok', True, media) == 'exclude_nsfw'
+    assert content_filter.rejection(5, 'ok', False, media) == 'min_score'
+    assert content_filter.rejection(50, 'too long', False, media) == 'max_title_length'
+    assert content_filter.rejection(50, 'ok', False, 'https://example.com') == 'require_media'
+    assert content_filter.rejection(50, 'ok', False, media) is None
+
+
+def test_accepted_indices_filters_a_batch():
+    posts = [
+        ScrapedPost('reddit', str(i), 'title', url, score, datetime(2026, 10, 1))
+        for i, (url, score) in enumerate([('https://i.redd.it/a.jpg', 20), ('https://example.com', 20),
+                                          ('https://i.redd.it/b.jpg', 1)])
+    ]
+    content_filter = ContentFilter.from_config({'min_score': 10})
+    assert content_filter.accepted_indices(PostBatch.from_posts(posts)) == [0]
+
+
+def test_no_checks_accepts_everything():
+    content_filter = ContentFilter.from_config({'require_media': False})
+    assert content_filter.checks == ()
+    assert content_filter.accepted_indices(PostBatch()) == []
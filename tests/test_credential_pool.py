@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.scrapers import credential_pool
+from src.scrapers.credential_pool import HEALTHY, REVOKED, THROTTLED, Credential, CredentialPool, TokenBucket
+
+
+class _Clock:
+    """Stands in for the time module: sleeping only advances the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(credential_pool, 'time', SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    return clock
+
+
+def _pool(*capacities):
+    return CredentialPool([
+        Credential(f"credential-{i}", f"id-{i}", 'secret', TokenBucket(rate=1.0, capacity=capacity))
+        for i, capacity in enumerate(capacities)
+    ])
+
+
+def test_bucket_refills_at_its_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4)
+    assert all(bucket.try_take() for _ in range(4))
+    assert not bucket.try_take()
+    assert bucket.wait_time() == 0.5
+    clock.now += 1.0
+    assert bucket.available() == 2.0
+    clock.now += 60
+    assert bucket.available() == 4
+
+
+def test_acquire_prefers_the_credential_with_the_most_tokens(clock):
+    pool = _pool(2, 5)
+    assert pool.acquire().name == 'credential-1'
+    pool.credentials[1].bucket.tokens = 1
+    assert pool.acquire().name == 'credential-0'
+
+
+def test_acquire_waits_for_a_refill_only_within_the_timeout(clock):
+    pool = _pool(1)
+    assert pool.acquire() is not None
+    assert pool.acquire() is None and clock.slept == []
+    assert pool.acquire(timeout=0.5) is None
+    assert pool.acquire(timeout=2.0) is not None
+    assert clock.slept == [1.0]
+
+
+def test_throttled_credential_sits_out_until_its_retry_after(clock):
+    pool = _pool(5, 5)
+    throttled = pool.credentials[0]
+    pool.report_throttled(throttled, retry_after=30)
+    assert pool.health()['credential-0'] == {'state': THROTTLED, 'tokens': 0}
+    assert all(pool.acquire().name == 'credential-1' for _ in range(5))
+
+    pool.report_throttled(pool.credentials[1], retry_after=60)
+    assert pool.acquire() is None
+    assert pool.acquire(timeout=45) is throttled
+    assert clock.slept == [30.0]
+    assert throttled.state == HEALTHY
+
+
+def test_revoked_credentials_are_dropped_for_good(clock):
+    pool = _pool(5, 1)
+    pool.credentials[0].client = object()
+    pool.report_revoked(pool.credentials[0])
+    assert pool.credentials[0].state == REVOKED and pool.credentials[0].client is None
+    assert pool.acquire().name == 'credential-1'
+    pool.report_revoked(pool.credentials[1])
+    assert pool.acquire(timeout=60) is None
+    assert clock.slept == []
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from src.processors.hash_index import HashIndex
+
+
+def _row(row_id, phash):
+    return {'id': row_id, 'platform': 'reddit', 'post_id': f"p{row_id}",
+            'phash': phash, 'dhash': phash, 'whash': None}
+
+
+class _Posts:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_posts_since(self, last_id, columns='*', page_size=1000):
+        return [row for row in self.rows if row['id'] > last_id]
+
+
+def test_near_finds_hashes_within_the_radius_closest_first(tmp_path):
+    index = HashIndex(str(tmp_path))
+    index.append([_row(1, '00000000000000ff'), _row(2, '00000000000000fe'), _row(3, 'ffffffff00000000')])
+    matches = index.near('00000000000000fe', radius=4)
+    assert [(match['id'], match['distance']) for match in matches] == [(2, 0), (1, 1)]
+    assert matches[0]['post_key'] == 'reddit:p2'
+
+
+def test_sync_appends_only_rows_above_the_watermark_and_reopens(tmp_path):
+    posts = _Posts([_row(1, '00000000000000ff')])
+    index = HashIndex(str(tmp_path))
+    assert index.sync(posts) == 1
+    assert index.sync(posts) == 0
+    posts.rows.append(_row(2, '00000000000000fe'))
+    assert index.sync(posts) == 1
+
+    reopened = HashIndex.open(str(tmp_path))
+    assert reopened.info() == {'directory': str(tmp_path), 'version': 2, 'watermark': 2,
+                               'rows': 2, 'segments': 2}
+    assert {match['id'] for match in reopened.near('00000000000000ff', radius=2)} == {1, 2}
+
+
+def test_compact_merges_segments_and_removes_their_files(tmp_path):
+    index = HashIndex(str(tmp_path))
+    index.append([_row(1, '00000000000000ff')])
+    index.append([_row(2, '00000000000000fe')])
+    assert index.compact() == 2
+    assert index.compact() == 0
+    assert not any(name.startswith(('seg-000001.', 'seg-000002.')) for name in os.listdir(tmp_path))
+
+    reopened = HashIndex.open(str(tmp_path))
+    assert len(reopened) == 2 and len(reopened.segments) == 1
+    assert {match['id'] for match in reopened.near('00000000000000ff', radius=2)} == {1, 2}
+
+
+def test_open_without_a_snapshot_is_empty(tmp_path):
+    index = HashIndex.open(str(tmp_path / 'missing'))
+    assert len(index) == 0 and index.near('00000000000000ff') == []
+
+
+def test_sync_picks_up_rows_that_commit_below_the_watermark(tmp_path):
+    posts = _Posts([_row(1, '00000000000000ff'), _row(3, '00000000000000fe')])
+    index = HashIndex(str(tmp_path))
+    assert index.sync(posts) == 2
+    posts.rows.append(_row(2, '000000000000f000'))  # id 2's transaction committed after id 3
+    assert index.sync(posts) == 1
+    assert index.sync(posts) == 0
+    assert len(index) == 3 and index.watermark == 3
+
+
+def test_failed_sync_keeps_the_watermark_and_snapshot(tmp_path):
+    class _Failing(_Posts):
+        def get_posts_since(self, last_id, columns='*', page_size=1000):
+            yield from super().get_posts_since(last_id, columns, page_size)[:1]
+            raise ConnectionError('page 2 failed')
+
+    index = HashIndex(str(tmp_path))
+    with pytest.raises(ConnectionError):
+        index.sync(_Failing([_row(1, '00000000000000ff'), _row(2, '00000000000000fe')]))
+    assert index.watermark == 0 and len(index) == 0
+    assert not os.path.exists(tmp_path / 'manifest.json')
@@ -0,0 +1,65 @@
+import io
+import time
+
+from PIL import Image
+
+from src.processors.media_sampler import (MAX_ANIMATION_BYTES, MAX_IMAGE_BYTES, _count_frames, is_video_container,
+                                          majority_hash, max_bytes_for, sample_animation_frames, sample_indices,
+                                          url_media_type)
+
+
+def test_majority_hash_votes_each_bit():
+    assert majority_hash(['0f', '0e', '1f']) == '0f'
+    assert majority_hash(['00ff', '00ff']) == '00ff'
+    # A tie is not a majority
+    assert majority_hash(['01', '00']) == '00'
+    assert majority_hash([]) is None
+
+
+def test_sample_indices_are_centred_in_even_slices():
+    assert sample_indices(3, 8) == [0, 1, 2]
+    assert sample_indices(80, 8) == [5, 15, 25, 35, 45, 55, 65, 75]
+
+
+def test_media_type_and_byte_caps_come_from_the_url():
+    assert url_media_type('https://v.redd.it/abc/DASH_720.mp4?source=fallback') == 'video'
+    assert url_media_type('https://i.imgur.com/a.gifv') == 'video'
+    assert url_media_type('https://i.redd.it/a.GIF') == 'animation'
+    assert url_media_type('https://i.redd.it/a.jpg') == 'image'
+    assert max_bytes_for('https://i.redd.it/a.gif') == MAX_ANIMATION_BYTES
+    assert max_bytes_for('https://i.redd.it/a.png') == MAX_IMAGE_BYTES
+
+
+def test_video_containers_are_sniffed_from_magic_bytes():
+    assert is_video_container(b'\x00\x00\x00\x18ftypmp42')
+    assert is_video_container(b'\x1a\x45\xdf\xa3\x01\x00')
+    assert not is_video_container(b'GIF89a\x00\x00')
+
+
+def _gif(frames, size=(64, 48)):
+    images = [Image.new('RGB', size, (i * 20 % 256, 0, 0)) for i in range(frames)]
+    buffer = io.BytesIO()
+    images[0].save(buffer, format='GIF', save_all=True, append_images=images[1:], duration=40)
+    return buffer.getvalue()
+
+
+def test_animation_frames_are_sampled_and_bounded():
+    frames = sample_animation_frames(Image.open(io.BytesIO(_gif(12, size=(640, 400)))))
+    assert len(frames) == 8
+    assert all(max(frame.size) <= 512 and frame.mode == 'RGB' for frame in frames)
+
+
+def test_truncated_animation_still_yields_its_first_frames():
+    data = _gif(20)
+    frames = sample_animation_frames(Image.open(io.BytesIO(data[:len(data) // 2])))
+    assert 1 <= len(frames) <= 8
+
+
+def test_oversized_sources_are_not_decoded():
+    assert sample_animation_frames(Image.open(io.BytesIO(_gif(2, size=(2000, 1100))))) == []
+
+
+def test_frame_count_walks_the_file_only_until_the_deadline():
+    image = Image.open(io.BytesIO(_gif(30)))
+    assert _count_frames(image, time.monotonic() + 5) == 30
+    assert _count_frames(image, time.monotonic() - 1) == 1
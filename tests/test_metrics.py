@@ -0,0 +1,38 @@
+from src.core.metrics import MetricsRegistry
+
+
+def test_render_matches_the_openmetrics_text_format():
+    registry = MetricsRegistry()
+    events = registry.counter('demo_events', 'Events by source', ('source',))
+    depth = registry.gauge('demo_queue_depth', 'Items waiting')
+    latency = registry.histogram('demo_latency_seconds', 'Stage latency', ('stage',), buckets=(0.5, 1.0))
+
+    events.inc(source='plain')
+    events.inc(2.5, source='say "hi"\\now\nthen')
+    depth.inc(3)
+    depth.dec()
+    for value in (0.25, 0.5, 4.0):
+        latency.observe(value, stage='download')
+
+    assert registry.render() == (
+        '# TYPE demo_events counter\n'
+        '# HELP demo_events Events by source\n'
+        'demo_events_total{source="plain"} 1\n'
+        'demo_events_total{source="say \\"hi\\"\\\\now\\nthen"} 2.5\n'
+        '# TYPE demo_queue_depth gauge\n'
+        '# HELP demo_queue_depth Items waiting\n'
+        'demo_queue_depth 2\n'
+        '# TYPE demo_latency_seconds histogram\n'
+        '# HELP demo_latency_seconds Stage latency\n'
+        'demo_latency_seconds_bucket{stage="download",le="0.5"} 2\n'
+        'demo_latency_seconds_bucket{stage="download",le="1.0"} 2\n'
+        'demo_latency_seconds_bucket{stage="download",le="+Inf"} 3\n'
+        'demo_latency_seconds_count{stage="download"} 3\n'
+        'demo_latency_seconds_sum{stage="download"} 4.75\n'
+        '# EOF\n'
+    )
+
+
+def test_empty_registry_renders_only_the_terminator():
+    assert MetricsRegistry().render() == '# EOF\n'
+
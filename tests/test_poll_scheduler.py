@@ -0,0 +1,45 @@
+from src.core.poll_scheduler import PollScheduler
+
+HOUR = 3600.0
+
+
+def test_new_sources_are_due_at_full_depth():
+    scheduler = PollScheduler(['memes', 'niche'])
+    assert scheduler.plan(0.0, request_budget=10) == [('memes', 100), ('niche', 100)]
+
+
+def test_plan_stops_at_the_request_budget_and_keeps_the_rest_queued():
+    scheduler = PollScheduler(['a', 'b', 'c'])
+    assert [source for source, _ in scheduler.plan(0.0, request_budget=2)] == ['a', 'b']
+    # Nothing was recorded, so every source is still due
+    assert [source for source, _ in scheduler.plan(0.0, request_budget=3)] == ['a', 'b', 'c']
+
+
+def test_fast_sources_come_back_sooner_with_shallower_listings():
+    scheduler = PollScheduler(['fast', 'slow'], min_interval=60, max_interval=24 * HOUR)
+    scheduler.plan(0.0, 10)
+    # 100 posts over one hour vs. 5 posts over ten hours
+    scheduler.record('fast', [i * 36.0 for i in range(100)], 100, now=HOUR)
+    scheduler.record('slow', [i * 2 * HOUR for i in range(5)], 100, now=HOUR)
+    fast, slow = scheduler.states['fast'], scheduler.states['slow']
+    assert fast.arrival_rate > slow.arrival_rate
+    assert fast.due < slow.due
+    assert scheduler.plan(fast.due, 10) == [('fast', scheduler.limit_for(fast, fast.due))]
+    assert scheduler.limit_for(slow, HOUR + 60) == scheduler.min_limit
+
+
+def test_record_counts_only_posts_above_the_watermark():
+    scheduler = PollScheduler(['memes'])
+    assert scheduler.record('memes', [100.0, 200.0], 100, now=300.0) == 2
+    assert scheduler.record('memes', [150.0, 200.0, 250.0, float('nan')], 100, now=600.0) == 1
+    assert scheduler.states['memes'].watermark == 250.0
+    assert scheduler.record('gone', [1.0], 100, now=600.0) == 0
+
+
+def test_seed_and_sync_sources():
+    scheduler = PollScheduler(['memes', 'old'])
+    scheduler.seed([{'subreddit': 'memes', 'post_count': 48}, {'subreddit': 'memes', 'post_count': 48}], hours=48)
+    assert scheduler.states['memes'].arrival_rate == 2.0
+    scheduler.sync_sources(['memes', 'new'])
+    assert set(scheduler.states) == {'memes', 'new'}
+    assert [source for source, _ in scheduler.plan(0.0, 10)] == ['memes', 'new']
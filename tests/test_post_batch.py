@@ -0,0 +1,54 @@
+import math
+from datetime import datetime, timezone
+
+from src.core.post_batch import PostBatch
+from src.processors.template_clustering import TemplateClusterer
+from src.scrapers.base_scraper import ScrapedPost
+
+
+def _post(post_id, score=10, timestamp=None, **metadata):
+    return ScrapedPost(
+        platform='reddit', post_id=post_id, title=f"title {post_id}", url=f"https://i.redd.it/{post_id}.jpg",
+        score=score, timestamp=timestamp or datetime(2026, 10, 1, 12, tzinfo=timezone.utc), metadata=metadata
+    )
+
+
+def test_columns_keep_metadata_and_missing_values():
+    batch = PostBatch.from_posts([
+        _post('a', subreddit='memes', num_comments=3, upvote_ratio=0.9, over_18=True),
+        _post('b'),
+    ])
+    assert len(batch) == 2
+    assert batch.subreddit == ['memes', None]
+    assert batch.nsfw.tolist() == [1, 0]
+    assert math.isnan(batch.upvote_ratio[1])
+
+
+def test_upsert_rows_carry_features_clusters_and_utc_timestamps():
+    batch = PostBatch.from_posts([_post('a', num_comments=3), _post('b')])
+    rows = batch.to_upsert_rows({1: {'phash': '00000000000000ff', 'template_structure': 'top_bottom'}},
+                                TemplateClusterer())
+    assert len(rows) == 1
+    row = rows[0]
+    assert row['post_id'] == 'b'
+    assert row['timestamp'] == '2026-10-01T12:00:00+00:00'
+    assert row['num_comments'] is None and row['upvote_ratio'] is None
+    assert row['template_hash'] == row['template_cluster_id'] == '00000000000000ff'
+    assert row['template_structure'] == 'top_bottom'
+    assert row['dhash'] is None
+
+
+def test_empty_clusterer_still_assigns_cluster_ids():
+    # An empty TemplateClusterer has len() == 0; it must not be treated as absent
+    rows = PostBatch.from_posts([_post('a')]).to_upsert_rows({0: {'phash': '00000000000000ff'}},
+                                                             TemplateClusterer())
+    assert rows[0]['template_cluster_id'] == '00000000000000ff'
+
+
+def test_priority_prefers_high_score_recent_and_unknown_posts():
+    now = datetime(2026, 10, 1, 12, tzinfo=timezone.utc).timestamp()
+    old = datetime(2026, 9, 29, 12, tzinfo=timezone.utc)
+    batch = PostBatch.from_posts([_post('low', score=1), _post('high', score=1000),
+                                  _post('old', score=1000, timestamp=old), _post('known', score=1000)])
+    # Two days old is four half-lives; a stored post keeps a fifth of its value
+    assert batch.priority_order(range(4), known_post_ids={'known'}, now=now) == [1, 0, 3, 2]
@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from src.scrapers.reddit_scraper import RedditScraper
+
+
+def _submission(post_id, url, score=100):
+    return SimpleNamespace(id=post_id, title='title', url=url, score=score, created_utc=1790000000,
+                           author=None, selftext='', num_comments=0, over_18=False)
+
+
+class _Reddit:
+    def __init__(self, submissions):
+        self.submissions = submissions
+
+    def subreddit(self, name):
+        return SimpleNamespace(hot=lambda limit: iter(self.submissions))
+
+
+def test_listing_keeps_only_media_posts_even_when_require_media_is_off():
+    scraper = RedditScraper({'content_filters': {'require_media': False}})
+    reddit = _Reddit([_submission('a', 'https://i.redd.it/a.jpg'),
+                      _submission('b', 'https://www.reddit.com/r/memes/comments/b/text_post/')])
+    assert [post.post_id for post in scraper._scrape_listing(reddit, 'memes', 10, 'hot')] == ['a']
+
+
+def test_content_filters_narrow_the_media_posts_further():
+    scraper = RedditScraper({'content_filters': {'min_score': 50}})
+    reddit = _Reddit([_submission('a', 'https://i.redd.it/a.jpg', score=10),
+                      _submission('b', 'https://i.redd.it/b.jpg', score=90)])
+    assert [post.post_id for post in scraper._scrape_listing(reddit, 'memes', 10, 'hot')] == ['b']
@@ -0,0 +1,52 @@
+import pytest
+
+from src.core.run_report import merge_reports
+
+
+def _shard(index, started_at, finished_at, processed, stage):
+    return {
+        'started_at': started_at,
+        'finished_at': finished_at,
+        'totals': {'total_processed': processed, 'total_new': processed // 2, 'posts_per_second': 99.0},
+        'stages': {'download': stage},
+        'bytes_downloaded': 1000,
+        'rows_written': processed,
+        'cache_hit_rates': {'platform_config': 1.0 if index else 0.5},
+        'filter_rejections': {'min_score': 2},
+        'shed_posts': {},
+        'peak_rss_mb': 100.0 + index,
+        'shard': {'index': index, 'count': 2},
+    }
+
+
+def test_merge_adds_counts_and_spans_the_whole_run():
+    merged = merge_reports([
+        _shard(0, '2026-10-01T12:00:00', '2026-10-01T12:00:10', 40,
+               {'count': 10, 'errors': 1, 'total_s': 2.0, 'p50': 0.1, 'p95': 0.5}),
+        _shard(1, '2026-10-01T12:00:05', '2026-10-01T12:00:20', 60,
+               {'count': 30, 'errors': 0, 'total_s': 6.0, 'p50': 0.3, 'p95': 0.4}),
+    ])
+    assert merged['wall_time_s'] == 20.0
+    assert merged['totals']['total_processed'] == 100
+    assert merged['totals']['total_new'] == 50
+    # Throughput over wall time, not the shards' own rates summed
+    assert merged['totals']['posts_per_second'] == 5.0
+    assert merged['bytes_downloaded'] == 2000 and merged['rows_written'] == 100
+    assert merged['filter_rejections'] == {'min_score': 4}
+    assert merged['cache_hit_rates'] == {'platform_config': 0.75}
+    assert merged['peak_rss_mb'] == 101.0
+    assert [shard['index'] for shard in merged['shards']] == [0, 1]
+
+
+def test_merge_weights_p50_by_count_and_keeps_the_worst_p95():
+    merged = merge_reports([
+        _shard(0, '2026-10-01T12:00:00', '2026-10-01T12:00:10', 1,
+               {'count': 10, 'errors': 1, 'total_s': 2.0, 'p50': 0.1, 'p95': 0.5}),
+        _shard(1, '2026-10-01T12:00:00', '2026-10-01T12:00:10', 1,
+               {'count': 30, 'errors': 0, 'total_s': 6.0, 'p50': 0.3, 'p95': 0.4}),
+    ])
+    download = merged['stages']['download']
+    assert download['count'] == 40 and download['errors'] == 1
+    assert download['mean'] == pytest.approx(0.2)
+    assert download['p50'] == pytest.approx(0.25)
+    assert download['p95'] == 0.5
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.core.sharding import shard_for, shard_sources
+
+SOURCES = ['memes', 'dankmemes', 'wholesomememes', 'me_irl', 'NukedMemes', 'nukedmemes', 'comedyheaven',
+           'AdviceAnimals', 'PrequelMemes', 'terriblefacebookmemes', 'historymemes']
+
+
+def test_shard_for_is_pinned_across_processes_and_hash_seeds():
+    assert [shard_for(key, 4) for key in ('reddit:memes', 'reddit:dankmemes', 'reddit:wholesomememes')] == [1, 0, 1]
+    assert shard_for('reddit:memes', 1000003) == 208382
+
+    # str hashing is salted per process; shard_for must not be
+    code = "from src.core.sharding import shard_for; print(shard_for('reddit:memes', 1000003))"
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            env={**os.environ, 'PYTHONHASHSEED': '12345'}).stdout
+    assert output.strip() == '208382'
+
+
+@pytest.mark.parametrize('shard_count', [1, 2, 3, 7])
+def test_every_source_is_owned_by_exactly_one_shard(shard_count):
+    owned = [source for index in range(shard_count) for source in shard_sources('reddit', SOURCES, index, shard_count)]
+    assert sorted(source.lower() for source in owned) == sorted({source.lower() for source in SOURCES})
+
+
+def test_sources_differing_only_in_case_are_collected_once_in_configured_order():
+    owned = [shard_sources('reddit', SOURCES, index, 2) for index in range(2)]
+    assert sum(source.lower() == 'nukedmemes' for shard in owned for source in shard) == 1
+    assert 'nukedmemes' not in owned[0] + owned[1]  # the first spelling wins
+    for shard in owned:
+        assert shard == [source for source in SOURCES if source in shard]
+
+
+def test_shard_index_out_of_range_is_rejected():
+    with pytest.raises(ValueError):
+        shard_sources('reddit', SOURCES, 2, 2)
@@ -0,0 +1,129 @@
+import pytest
+
+from src.core.spool import SpoolDrainer, SpooledDatabase, WriteSpool, drain_spool_dir, is_transient, spool_path
+
+
+class Rejected(Exception):
+    """Stands in for a PostgREST error about the data itself"""
+
+
+class _Database:
+    def __init__(self):
+        self.posts = {}
+        self.clusters = {}
+        self.down = False
+        self.calls = 0
+
+    def bulk_upsert_posts(self, rows, raise_errors=False):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError('database unreachable')
+        if any(row['post_id'] == 'bad' for row in rows):
+            raise Rejected('violates check constraint')
+        for row in rows:
+            self.posts[row['post_id']] = row
+        return len(rows)
+
+    def save_template_clusters(self, rows, raise_errors=False):
+        for row in rows:
+            self.clusters[row['phash']] = row['cluster_id']
+        return len(rows)
+
+    def get_stats(self):
+        return {'total_posts': len(self.posts)}
+
+
+def _posts(*post_ids, score=1):
+    return [{'platform': 'reddit', 'post_id': post_id, 'timestamp': '2026-10-01T12:00:00', 'score': score}
+            for post_id in post_ids]
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = WriteSpool(str(tmp_path / 'writes.sqlite3'))
+    yield spool
+    spool.close()
+
+
+def test_spooled_database_queues_writes_and_passes_reads_through(spool):
+    db = _Database()
+    spooled = SpooledDatabase(db, spool)
+    assert spooled.bulk_upsert_posts(_posts('a', 'b')) == 2
+    assert spooled.save_template_clusters([{'phash': 'ff', 'cluster_id': 'ff'}]) == 1
+    assert spool.pending() == {'meme_posts': 2, 'template_clusters': 1}
+    assert db.posts == {}
+    assert spooled.get_stats() == {'total_posts': 0}
+
+
+def test_drain_writes_the_latest_version_of_each_row(spool):
+    db = _Database()
+    spool.append('meme_posts', _posts('a', score=1))
+    spool.append('meme_posts', _posts('a', score=5) + _posts('b'))
+    drainer = SpoolDrainer(spool, db)
+    assert drainer.drain(timeout=5)
+    assert db.posts['a']['score'] == 5 and set(db.posts) == {'a', 'b'}
+    assert drainer.written == 3
+    assert spool.pending() == {}
+
+
+def test_pending_rows_survive_reopening(tmp_path):
+    path = str(tmp_path / 'writes.sqlite3')
+    spool = WriteSpool(path)
+    spool.append('meme_posts', _posts('a'))
+    spool.close()
+    spool = WriteSpool(path)
+    assert spool.pending() == {'meme_posts': 1}
+    assert spool.oldest_age() is not None
+    spool.close()
+
+
+def test_transient_failures_keep_every_row_queued(spool):
+    db = _Database()
+    db.down = True
+    spool.append('meme_posts', _posts('a', 'b'))
+    drainer = SpoolDrainer(spool, db, idle_interval=0.01)
+    assert not drainer.drain(timeout=1)
+    assert drainer.failures == 3
+    assert spool.pending() == {'meme_posts': 2} and spool.dead_letters() == {}
+
+    db.down = False
+    assert drainer.drain(timeout=5)
+    assert set(db.posts) == {'a', 'b'}
+
+
+def test_rejected_rows_are_bisected_out_and_dead_lettered(spool):
+    db = _Database()
+    spool.append('meme_posts', _posts(*'abcdefg') + _posts('bad') + _posts('h'))
+    drainer = SpoolDrainer(spool, db, max_attempts=3)
+    assert drainer.drain(timeout=5)
+    assert set(db.posts) == set('abcdefgh')
+    assert spool.pending() == {}
+    assert spool.dead_letters() == {'meme_posts': 1}
+    assert drainer.dead_lettered == 1
+
+    assert spool.requeue() == 1
+    assert spool.pending() == {'meme_posts': 1} and spool.dead_letters() == {}
+
+
+def test_is_transient_separates_outages_from_rejected_rows():
+    class APIError(Exception):
+        def __init__(self, code):
+            super().__init__(code)
+            self.code = code
+
+    assert is_transient(ConnectionError())
+    assert is_transient(TimeoutError())
+    assert is_transient(APIError('PGRST001'))
+    assert is_transient(APIError('57014'))
+    assert not is_transient(APIError('23514'))
+    assert not is_transient(Rejected())
+
+
+def test_drain_spool_dir_replays_files_of_any_shard_layout(tmp_path):
+    for name, post_id in [('writes', 'a'), ('writes-shard-0-of-4', 'b'), ('writes-shard-3-of-4', 'c')]:
+        spool = WriteSpool(spool_path(name, str(tmp_path)))
+        spool.append('meme_posts', _posts(post_id))
+        spool.close()
+    db = _Database()
+    assert drain_spool_dir(db, str(tmp_path), timeout=5) == 0
+    assert set(db.posts) == {'a', 'b', 'c'}
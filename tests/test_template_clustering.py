@@ -0,0 +1,81 @@
+import numpy as np
+
+from src.processors.template_clustering import TemplateClusterer, bulk_cluster
+
+
+def test_assign_groups_near_hashes_under_the_first_seen_id():
+    clusterer = TemplateClusterer(radius=4)
+    root = clusterer.assign('00000000000000ff')
+    assert root == '00000000000000ff'
+    assert clusterer.assign('00000000000000fe') == root
+    assert clusterer.assign('ffffffff00000000') == 'ffffffff00000000'
+    assert clusterer.assign(None) is None
+    assert len(clusterer) == 3
+
+
+def test_drain_returns_each_new_member_once():
+    clusterer = TemplateClusterer(radius=4)
+    clusterer.assign('00000000000000ff')
+    clusterer.assign('00000000000000fe')
+    assert clusterer.drain_new_members() == [
+        {'phash': '00000000000000ff', 'cluster_id': '00000000000000ff'},
+        {'phash': '00000000000000fe', 'cluster_id': '00000000000000ff'},
+    ]
+    assert clusterer.drain_new_members() == []
+
+
+def test_merge_re_emits_members_of_the_absorbed_cluster():
+    clusterer = TemplateClusterer(radius=4)
+    clusterer.assign('0000000000000000')   # A
+    clusterer.assign('000000000000003f')   # B: 6 bits from A, its own cluster
+    clusterer.assign('000000000000007f')   # B's member
+    clusterer.drain_new_members()
+
+    # 3 bits from A and 3 from B: bridges both, A's id survives
+    assert clusterer.assign('0000000000000007') == '0000000000000000'
+    assigned = {row['phash']: row['cluster_id'] for row in clusterer.drain_new_members()}
+    assert assigned == {
+        '0000000000000007': '0000000000000000',
+        '000000000000003f': '0000000000000000',
+        '000000000000007f': '0000000000000000',
+    }
+
+
+def test_from_rows_restores_clusters_whatever_the_row_order():
+    rows = [
+        {'phash': '00000000000000fe', 'cluster_id': '00000000000000ff'},
+        {'phash': '00000000000000ff', 'cluster_id': '00000000000000ff'},
+        {'phash': '0000000000000f00', 'cluster_id': '00000000000000ff'},
+    ]
+    clusterer = TemplateClusterer.from_rows(rows)
+    assert clusterer.assign('00000000000000fe') == '00000000000000ff'
+    assert clusterer.assign('0000000000000f00') == '00000000000000ff'
+    assert clusterer.drain_new_members() == []
+
+
+def test_from_rows_keeps_the_cluster_id_when_the_root_row_is_missing():
+    rows = [
+        {'phash': '00000000000000fe', 'cluster_id': '00000000000000ff'},
+        {'phash': '0000000000000f00', 'cluster_id': '00000000000000ff'},
+    ]
+    clusterer = TemplateClusterer.from_rows(rows)
+    assert clusterer.assign('00000000000000fe') == '00000000000000ff'
+    assert clusterer.assign('0000000000000f00') == '00000000000000ff'
+    assert clusterer.assign('00000000000000ff') == '00000000000000ff'
+    assert clusterer.drain_new_members() == []
+
+
+def test_from_rows_keeps_the_oldest_root_when_clusters_later_merge():
+    rows = [
+        {'phash': '000000000000003f', 'cluster_id': '000000000000003f', 'first_seen': '2026-02-01'},
+        {'phash': '0000000000000000', 'cluster_id': '0000000000000000', 'first_seen': '2026-01-01'},
+    ]
+    clusterer = TemplateClusterer.from_rows(rows, radius=4)
+    assert clusterer.assign('0000000000000007') == '0000000000000000'
+
+
+def test_bulk_cluster_matches_incremental_roots():
+    hashes = np.array([0x0, 0x3f, 0x7, 0xffffffff00000000], dtype=np.uint64)
+    roots = bulk_cluster(hashes, radius=4).tolist()
+    assert roots[0] == roots[1] == roots[2] == 0
+    assert roots[3] == 3
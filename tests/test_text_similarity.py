@@ -0,0 +1,39 @@
+from src.processors.text_similarity import TitleLSH, TitleMinHasher, normalize_title
+
+
+def test_normalize_title_drops_case_punctuation_and_extra_spaces():
+    assert normalize_title("  When the CODE   works!!! ") == 'when the code works'
+
+
+def test_signatures_round_trip_and_estimate_similarity():
+    hasher = TitleMinHasher()
+    a = hasher.signature('when the code works on the first try')
+    encoded = hasher.encode('When the code works on the first try!')
+    assert TitleMinHasher.similarity(a, TitleMinHasher.decode(encoded)) == 1.0
+    assert TitleMinHasher.similarity(a, hasher.signature('cats are liquid, change my mind')) < 0.3
+    assert hasher.encode(None) is None and TitleMinHasher.decode(None) is None
+
+
+def test_lsh_query_returns_near_duplicates_above_the_threshold():
+    hasher = TitleMinHasher()
+    rows = [
+        {'id': 1, 'title_minhash': hasher.encode('when the code works on the first try')},
+        {'id': 2, 'title_minhash': hasher.encode('when the code works on the first try!!')},
+        {'id': 3, 'title_minhash': hasher.encode('cats are liquid, change my mind')},
+        {'id': 4, 'title_minhash': None},
+    ]
+    lsh = TitleLSH.from_rows(rows)
+    assert len(lsh) == 3
+    hits = lsh.query(hasher.signature('When the code works on the first try'))
+    assert sorted(key for key, _ in hits) == [1, 2]
+    assert all(score >= lsh.threshold for _, score in hits)
+
+
+def test_near_duplicate_groups_cluster_reposts():
+    hasher = TitleMinHasher()
+    lsh = TitleLSH()
+    for key, title in [('a', 'nobody: absolutely nobody: me at 3am'), ('b', 'Nobody: absolutely nobody: me at 3am'),
+                       ('c', 'my cat judging my life choices')]:
+        lsh.add(key, hasher.signature(title))
+    groups = lsh.near_duplicate_groups()
+    assert sorted(sorted(group) for group in groups if len(group) > 1) == [['a', 'b']]